@@ -426,6 +426,12 @@ class VendorAdmin(AdminDynamicPaginationMixin, admin.ModelAdmin):
 
     vendor_order_count.admin_order_field = "_vendor_order_count"
 
+
+@admin.register(m.VendorRequestRate)
+class VendorRequestRateAdmin(admin.ModelAdmin):
+    model = m.VendorRequestRate
+    list_display = ("vendor", "rate", "request_count", "error_count", "throttled_count", "last_throttled_at")
+
 @admin.register(m.Region)
 class RegionAdmin(admin.ModelAdmin):
     model = m.Region
@@ -1,10 +1,13 @@
+import asyncio
 import json
 import logging
 from collections import defaultdict
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import List, Literal, Optional, Union
+from typing import List, Literal, Optional, Tuple, Union
 
+from asgiref.sync import async_to_sync
+from django.db import transaction
 from django.db.models import (
     Case,
     DurationField,
@@ -39,7 +42,8 @@ from apps.common.month import Month
 from apps.common.utils import bulk_create
 from apps.orders.models import Order, VendorOrderProduct
 from config.constants import ALL_VENDORS
-from services.opendental import OpenDentalClient
+from services.opendental import AsyncOpenDentalClient
+from services.opendental import make_session as make_opendental_session
 
 logger = logging.getLogger(__name__)
 
@@ -164,21 +168,19 @@ class OfficeBudgetHelper:
             .prefetch_related(Prefetch("budget_set", queryset=prev_month_office_budgets, to_attr="previous_budget"))
         )
 
+        offices_with_key = [office for office in offices if office.dental_api_key]
+        results = OfficeBudgetHelper.load_production_collections(
+            [(office.dental_api_key, start_day_of_prev_month, last_day_of_prev_month) for office in offices_with_key]
+        )
         opendental_data = {}
-        for office in offices:
-            if not office.dental_api_key:
+        for office, result in zip(offices_with_key, results):
+            if result is None:
                 continue
-            try:
-                prev_adjusted_production, prev_collections = OfficeBudgetHelper.load_prev_month_production_collection(
-                    start_day_of_prev_month, last_day_of_prev_month, office.dental_api_key
-                )
-            except Exception:
-                pass
-            else:
-                opendental_data[office.pk] = {
-                    "adjusted_production": prev_adjusted_production,
-                    "collection": prev_collections,
-                }
+            prev_adjusted_production, prev_collections = result
+            opendental_data[office.pk] = {
+                "adjusted_production": prev_adjusted_production,
+                "collection": prev_collections,
+            }
         budgets_to_clone = [office.previous_budget[0] for office in offices if office.previous_budget]
         OfficeBudgetHelper.clone_prev_month_budget(budgets_to_clone, opendental_data)
 
@@ -192,18 +194,44 @@ class OfficeBudgetHelper:
 
     @staticmethod
     def load_prev_month_production_collection(day1, day2, api_key):
-        with open("query/production.sql") as f:
-            product_query = f.read()
-        query = product_query.format(day_from=day1, day_to=day2)
-        od_client = OpenDentalClient(api_key)
-        json_production, status = od_client.query(query)
-        if status != HTTP_200_OK:
-            return 0, 0
-        adjusted_production, collections = (
-            json_production[0]["Adjusted_Production"],
-            json_production[0]["Collections"],
-        )
-        return adjusted_production, collections
+        (result,) = OfficeBudgetHelper.load_production_collections([(api_key, day1, day2)])
+        if result is None:
+            raise ValueError("Loading production and collection from Open Dental failed")
+        return result
+
+    @staticmethod
+    async def aload_production_collections(periods: List[Tuple[str, date, date]]) -> List[Optional[Tuple]]:
+        async with make_opendental_session() as session:
+            od_client = AsyncOpenDentalClient(session)
+            responses = await asyncio.gather(
+                *(
+                    od_client.query_template(api_key, "production", day_from=day1, day_to=day2)
+                    for api_key, day1, day2 in periods
+                ),
+                return_exceptions=True,
+            )
+        results = []
+        for (_, day1, day2), response in zip(periods, responses):
+            if isinstance(response, BaseException):
+                logger.warning("Loading production for %s - %s failed: %r", day1, day2, response)
+                results.append(None)
+                continue
+            json_production, status = response
+            if status != HTTP_200_OK:
+                results.append((0, 0))
+            else:
+                results.append((json_production[0]["Adjusted_Production"], json_production[0]["Collections"]))
+        return results
+
+    @staticmethod
+    def load_production_collections(periods: List[Tuple[str, date, date]]) -> List[Optional[Tuple]]:
+        """
+        Load adjusted production and collections of (Open Dental key, first day, last day) periods concurrently.
+        Failed queries give (0, 0) like before, periods which couldn't be loaded at all give None.
+        """
+        if not periods:
+            return []
+        return async_to_sync(OfficeBudgetHelper.aload_production_collections)(periods)
 
     @staticmethod
     def get_office_spent_budget_current_month(office):
@@ -226,6 +254,99 @@ class OfficeBudgetHelper:
                 subaccount.spend = F("spend") + spend
         Subaccount.objects.bulk_update(subaccounts.values(), fields=("spend",))
 
+    @staticmethod
+    def materialize_budgets(start_month: Month, end_month: Month, office_ids: Optional[List[int]] = None) -> int:
+        """
+        Create missing budgets of the offices (all offices by default) from `start_month` to `end_month` inclusive
+        in bulk, returning the number of created budgets. Like `get_or_create_budget`, a missing month gets the basis
+        and subaccounts of the most recent budget before it, or the default subaccounts if there is none.
+        """
+        months = start_month.range(end_month)
+        with transaction.atomic():
+            # serializes concurrent materializations of the same office, orders can still reference it
+            offices = Office.objects.select_for_update(no_key=True).order_by("id")
+            if office_ids is not None:
+                offices = offices.filter(id__in=office_ids)
+            office_ids = list(offices.values_list("id", flat=True))
+
+            existing_months = defaultdict(set)
+            for office_id, month in Budget.objects.filter(
+                office_id__in=office_ids, month__gte=start_month, month__lte=end_month
+            ).values_list("office_id", "month"):
+                existing_months[office_id].add(month)
+            offices_with_gaps = [
+                office_id
+                for office_id in office_ids
+                if any(month not in existing_months[office_id] for month in months)
+            ]
+            if not offices_with_gaps:
+                return 0
+
+            previous_budgets = (
+                Budget.objects.filter(office_id__in=offices_with_gaps, month__lt=start_month)
+                .order_by("office_id", "-month")
+                .distinct("office_id")
+                .values("id")
+            )
+            source_budgets = defaultdict(dict)
+            for budget in (
+                Budget.objects.filter(office_id__in=offices_with_gaps, month__lte=end_month)
+                .filter(Q(month__gte=start_month) | Q(id__in=previous_budgets))
+                .prefetch_related("subaccounts")
+            ):
+                source_budgets[budget.office_id][budget.month] = budget
+
+            budgets_to_create = []
+            subaccounts_data = []
+            for office_id in offices_with_gaps:
+                office_budgets = source_budgets[office_id]
+                previous_month = min(office_budgets, default=None)
+                source_budget = (
+                    office_budgets[previous_month]
+                    if previous_month is not None and previous_month < start_month
+                    else None
+                )
+                for month in months:
+                    if month in office_budgets:
+                        source_budget = office_budgets[month]
+                        continue
+                    budget = Budget(office_id=office_id, month=month, adjusted_production=0, collection=0)
+                    if source_budget:
+                        budget.basis = source_budget.basis
+                        data = [
+                            {
+                                "slug": subaccount.slug,
+                                "percentage": subaccount.percentage,
+                                "name": subaccount.name,
+                                "vendors": subaccount.vendors,
+                            }
+                            for subaccount in source_budget.subaccounts.all()
+                        ]
+                    else:
+                        data = [
+                            {
+                                "slug": slug,
+                                "percentage": DEFAULT_PERCENTAGE_MAPPING[slug],
+                                "vendors": [],
+                                "name": slug.capitalize(),
+                            }
+                            for slug in ("dental", "office", "miscellaneous")
+                        ]
+                    budgets_to_create.append(budget)
+                    subaccounts_data.append(data)
+
+            created_budgets = bulk_create(Budget, budgets_to_create)
+            bulk_create(
+                Subaccount,
+                [
+                    Subaccount(budget=budget, **subaccount_data)
+                    for budget, data in zip(created_budgets, subaccounts_data)
+                    for subaccount_data in data
+                ],
+            )
+        logger.info("Materialized %s budgets of %s offices", len(created_budgets), len(offices_with_gaps))
+        return len(created_budgets)
+
     @staticmethod
     def get_or_create_budget(office_id: int, month: Optional[Month] = None):
         if month is None:
@@ -233,42 +354,8 @@ class OfficeBudgetHelper:
         budget = Budget.objects.filter(office_id=office_id, month=month).first()
         if budget:
             return budget
-        most_recent_budget = Budget.objects.filter(office_id=office_id, month__lt=month).order_by("-month").first()
-        if not most_recent_budget:
-            # Create if we couldn't find any
-            budget = Budget.objects.create(
-                office_id=office_id,
-                month=month,
-                adjusted_production=0,
-                collection=0,
-            )
-            subaccounts_to_create = [
-                {
-                    "slug": slug,
-                    "percentage": DEFAULT_PERCENTAGE_MAPPING[slug],
-                    "vendors": [],
-                    "name": slug.capitalize(),
-                }
-                for slug in ("dental", "office", "miscellaneous")
-            ]
-        else:
-            budget = Budget.objects.create(
-                office_id=office_id, month=month, basis=most_recent_budget.basis, adjusted_production=0, collection=0
-            )
-            subaccounts_to_create = [
-                {
-                    "slug": slug,
-                    "percentage": percentage,
-                    "name": name,
-                    "vendors": vendors,
-                }
-                for slug, percentage, name, vendors in Subaccount.objects.filter(
-                    budget=most_recent_budget
-                ).values_list("slug", "percentage", "name", "vendors")
-            ]
-        for subaccount_data in subaccounts_to_create:
-            Subaccount.objects.create(budget=budget, **subaccount_data)
-        return budget
+        OfficeBudgetHelper.materialize_budgets(month, month, [office_id])
+        return Budget.objects.get(office_id=office_id, month=month)
 
     @staticmethod
     def get_or_create_subaccount(budget, slug):
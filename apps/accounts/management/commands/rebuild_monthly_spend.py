@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from apps.accounts.services.monthly_spend import rebuild_monthly_spend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly spend rollup from vendor order products"
+
+    def add_arguments(self, parser):
+        """
+        python manage.py rebuild_monthly_spend --office-id 1 --office-id 2
+        """
+        parser.add_argument("--office-id", type=int, action="append", dest="office_ids", help="defaults to all")
+
+    def handle(self, *args, **options):
+        rows = rebuild_monthly_spend(options["office_ids"])
+        self.stdout.write(f"Rebuilt {rows} monthly spend rows")
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.1 on 2026-10-17 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0058_alter_officevendor_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorRequestRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rate', models.FloatField(help_text='Last good requests per second')),
+                ('request_count', models.BigIntegerField(default=0)),
+                ('error_count', models.BigIntegerField(default=0)),
+                ('throttled_count', models.BigIntegerField(default=0)),
+                ('last_throttled_at', models.DateTimeField(blank=True, null=True)),
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='request_rate', to='accounts.vendor')),
+            ],
+            options={
+                'ordering': ('-updated_at',),
+                'abstract': False,
+            },
+        ),
+    ]
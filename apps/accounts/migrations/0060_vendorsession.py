@@ -0,0 +1,40 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0059_vendorrequestrate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendorSession",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("cookies", models.JSONField(default=list)),
+                ("credentials_hash", models.CharField(blank=True, max_length=64)),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "login_started_at",
+                    models.DateTimeField(blank=True, help_text="Set while a worker is logging in", null=True),
+                ),
+                (
+                    "office_vendor",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vendor_session",
+                        to="accounts.officevendor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-updated_at",),
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0060_vendorsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendorOrderSync",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("synced_to", models.DateField(blank=True, null=True)),
+                ("last_duration", models.FloatField(default=0, help_text="Seconds the last sync took")),
+                ("last_order_count", models.IntegerField(default=0)),
+                (
+                    "office_vendor",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_sync",
+                        to="accounts.officevendor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-updated_at",),
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:46
+
+import apps.common.month.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0061_vendorordersync"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlySpend",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("slug", models.CharField(max_length=64)),
+                ("month", apps.common.month.models.MonthField()),
+                ("spend", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                (
+                    "pending_approval_spend",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Spend of vendor orders waiting for approval",
+                        max_digits=14,
+                    ),
+                ),
+                (
+                    "office",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_spends",
+                        to="accounts.office",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="monthlyspend",
+            constraint=models.UniqueConstraint(
+                fields=("office", "slug", "month"), name="monthly_spend_office_slug_month_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,404 @@
+# Generated by Django 4.2.1 on 2026-10-17 12:00
+
+import importlib
+
+from django.db import migrations
+
+ADD_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION monthly_spend_add(
+    p_office_ids bigint[], p_slugs varchar[], p_months date[], p_pending boolean[], p_amounts numeric[]
+) RETURNS VOID
+AS $$
+BEGIN
+    INSERT INTO accounts_monthlyspend (office_id, slug, month, spend, pending_approval_spend)
+    SELECT d.office_id,
+           d.slug,
+           d.month,
+           coalesce(sum(d.amount) FILTER (WHERE NOT d.pending), 0),
+           coalesce(sum(d.amount) FILTER (WHERE d.pending), 0)
+    FROM unnest(p_office_ids, p_slugs, p_months, p_pending, p_amounts) AS d(office_id, slug, month, pending, amount)
+    WHERE coalesce(d.slug, '') != '' AND d.amount IS NOT NULL
+    GROUP BY d.office_id, d.slug, d.month
+    -- rows are locked in the same order by concurrent statements
+    ORDER BY d.office_id, d.slug, d.month
+    ON CONFLICT (office_id, slug, month) DO UPDATE
+    SET spend = accounts_monthlyspend.spend + excluded.spend,
+        pending_approval_spend = accounts_monthlyspend.pending_approval_spend + excluded.pending_approval_spend;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+ADD_FUNCTION_REV_SQL = """
+DROP FUNCTION IF EXISTS monthly_spend_add(bigint[], varchar[], date[], boolean[], numeric[]);
+"""
+
+TRIGGER_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION tgf_monthly_spend_on_product_insert () RETURNS TRIGGER
+AS $$
+BEGIN
+    PERFORM monthly_spend_add(
+        array_agg(o.office_id),
+        array_agg(r.budget_spend_type),
+        array_agg(date_trunc('month', ov.order_date)::date),
+        array_agg(ov.status = 'pendingapproval'),
+        array_agg(r.quantity * r.unit_price)
+    )
+    FROM new_rows r
+    JOIN orders_vendororder ov ON ov.id = r.vendor_order_id
+    JOIN orders_order o ON o.id = ov.order_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_monthly_spend_on_product_delete () RETURNS TRIGGER
+AS $$
+BEGIN
+    PERFORM monthly_spend_add(
+        array_agg(o.office_id),
+        array_agg(r.budget_spend_type),
+        array_agg(date_trunc('month', ov.order_date)::date),
+        array_agg(ov.status = 'pendingapproval'),
+        array_agg(-(r.quantity * r.unit_price))
+    )
+    FROM old_rows r
+    JOIN orders_vendororder ov ON ov.id = r.vendor_order_id
+    JOIN orders_order o ON o.id = ov.order_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_monthly_spend_on_product_update () RETURNS TRIGGER
+AS $$
+BEGIN
+    PERFORM monthly_spend_add(
+        array_agg(o.office_id),
+        array_agg(c.budget_spend_type),
+        array_agg(date_trunc('month', ov.order_date)::date),
+        array_agg(ov.status = 'pendingapproval'),
+        array_agg(c.amount)
+    )
+    FROM (
+        WITH changed AS (
+            SELECT old_rows.vendor_order_id AS old_vendor_order_id,
+                   old_rows.budget_spend_type AS old_budget_spend_type,
+                   old_rows.quantity * old_rows.unit_price AS old_amount,
+                   new_rows.vendor_order_id,
+                   new_rows.budget_spend_type,
+                   new_rows.quantity * new_rows.unit_price AS amount
+            FROM old_rows
+            JOIN new_rows ON new_rows.id = old_rows.id
+            WHERE (old_rows.vendor_order_id, old_rows.budget_spend_type, old_rows.quantity, old_rows.unit_price)
+                IS DISTINCT FROM
+                (new_rows.vendor_order_id, new_rows.budget_spend_type, new_rows.quantity, new_rows.unit_price)
+        )
+        SELECT old_vendor_order_id AS vendor_order_id, old_budget_spend_type AS budget_spend_type, -old_amount AS amount
+        FROM changed
+        UNION ALL
+        SELECT vendor_order_id, budget_spend_type, amount
+        FROM changed
+    ) c
+    JOIN orders_vendororder ov ON ov.id = c.vendor_order_id
+    JOIN orders_order o ON o.id = ov.order_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_monthly_spend_on_vendor_order_update () RETURNS TRIGGER
+AS $$
+BEGIN
+    PERFORM monthly_spend_add(
+        array_agg(d.office_id),
+        array_agg(d.budget_spend_type),
+        array_agg(d.month),
+        array_agg(d.pending),
+        array_agg(d.amount)
+    )
+    FROM (
+        WITH changed AS (
+            SELECT new_rows.id,
+                   old_rows.order_id AS old_order_id,
+                   date_trunc('month', old_rows.order_date)::date AS old_month,
+                   old_rows.status = 'pendingapproval' AS old_pending,
+                   new_rows.order_id,
+                   date_trunc('month', new_rows.order_date)::date AS month,
+                   new_rows.status = 'pendingapproval' AS pending
+            FROM old_rows
+            JOIN new_rows ON new_rows.id = old_rows.id
+            WHERE (old_rows.order_id IS DISTINCT FROM new_rows.order_id)
+               OR (date_trunc('month', old_rows.order_date) IS DISTINCT FROM date_trunc('month', new_rows.order_date))
+               OR ((old_rows.status = 'pendingapproval') IS DISTINCT FROM (new_rows.status = 'pendingapproval'))
+        )
+        SELECT o.office_id, vop.budget_spend_type, c.old_month AS month, c.old_pending AS pending,
+               -(vop.quantity * vop.unit_price) AS amount
+        FROM changed c
+        JOIN orders_vendororderproduct vop ON vop.vendor_order_id = c.id
+        JOIN orders_order o ON o.id = c.old_order_id
+        UNION ALL
+        SELECT o.office_id, vop.budget_spend_type, c.month, c.pending, vop.quantity * vop.unit_price
+        FROM changed c
+        JOIN orders_vendororderproduct vop ON vop.vendor_order_id = c.id
+        JOIN orders_order o ON o.id = c.order_id
+    ) d;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER_FUNCTIONS_REV_SQL = """
+DROP FUNCTION IF EXISTS tgf_monthly_spend_on_product_insert ();
+DROP FUNCTION IF EXISTS tgf_monthly_spend_on_product_delete ();
+DROP FUNCTION IF EXISTS tgf_monthly_spend_on_product_update ();
+DROP FUNCTION IF EXISTS tgf_monthly_spend_on_vendor_order_update ();
+"""
+
+TRIGGER_SQL = """
+CREATE TRIGGER after_create_monthly_spend
+AFTER INSERT ON orders_vendororderproduct
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_monthly_spend_on_product_insert();
+
+CREATE TRIGGER after_delete_monthly_spend
+AFTER DELETE ON orders_vendororderproduct
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_monthly_spend_on_product_delete();
+
+CREATE TRIGGER after_update_monthly_spend
+AFTER UPDATE ON orders_vendororderproduct
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_monthly_spend_on_product_update();
+
+CREATE TRIGGER after_update_monthly_spend
+AFTER UPDATE ON orders_vendororder
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_monthly_spend_on_vendor_order_update();
+"""
+
+TRIGGER_SQL_REV = """
+DROP TRIGGER after_create_monthly_spend ON orders_vendororderproduct;
+DROP TRIGGER after_delete_monthly_spend ON orders_vendororderproduct;
+DROP TRIGGER after_update_monthly_spend ON orders_vendororderproduct;
+DROP TRIGGER after_update_monthly_spend ON orders_vendororder;
+"""
+
+FILL_SQL = """
+INSERT INTO accounts_monthlyspend (office_id, slug, month, spend, pending_approval_spend)
+SELECT o.office_id,
+       vop.budget_spend_type,
+       date_trunc('month', ov.order_date)::date,
+       coalesce(sum(vop.quantity * vop.unit_price) FILTER (WHERE ov.status != 'pendingapproval'), 0),
+       coalesce(sum(vop.quantity * vop.unit_price) FILTER (WHERE ov.status = 'pendingapproval'), 0)
+FROM orders_vendororderproduct vop
+JOIN orders_vendororder ov ON ov.id = vop.vendor_order_id
+JOIN orders_order o ON o.id = ov.order_id
+WHERE coalesce(vop.budget_spend_type, '') != ''
+GROUP BY 1, 2, 3;
+"""
+
+# spend of whole months in the range comes from the rollup, spend of partial months from order products
+SPEND_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION office_monthly_spend(
+    p_office_id int, p_start_date date, p_end_date date, p_with_pending_approval boolean
+)
+    RETURNS TABLE
+            (
+                month date,
+                slug  varchar,
+                spend decimal
+            )
+    LANGUAGE sql
+    STABLE
+AS
+$$
+    WITH bounds AS (SELECT (date_trunc('month', p_start_date - 1) + interval '1 month')::date as full_start,
+                           date_trunc('month', p_end_date)::date                              as full_end)
+    SELECT ms.month,
+           ms.slug,
+           ms.spend + CASE WHEN p_with_pending_approval THEN ms.pending_approval_spend ELSE 0 END
+    FROM accounts_monthlyspend ms, bounds b
+    WHERE ms.office_id = p_office_id
+      AND ms.month >= b.full_start
+      AND ms.month < b.full_end
+    UNION ALL
+    SELECT date_trunc('month', ov.order_date)::date,
+           vop.budget_spend_type,
+           SUM(vop.quantity * vop.unit_price)
+    FROM orders_vendororderproduct vop
+             JOIN orders_vendororder ov on vop.vendor_order_id = ov.id
+             JOIN orders_order oo ON ov.order_id = oo.id,
+         bounds b
+    WHERE oo.office_id = p_office_id
+      AND ov.order_date >= p_start_date
+      AND ov.order_date < p_end_date
+      AND (ov.order_date < b.full_start OR ov.order_date >= b.full_end)
+      AND (p_with_pending_approval OR ov.status != 'pendingapproval')
+    GROUP BY 1, 2
+$$;
+"""
+
+SPEND_FUNCTION_REV_SQL = """
+DROP FUNCTION IF EXISTS office_monthly_spend(int, date, date, boolean);
+"""
+
+BUDGET_STATS_SQL = """
+CREATE OR REPLACE FUNCTION budget_stats(p_office_id int, start_date date, end_date date)
+    RETURNS TABLE
+            (
+                slug          varchar,
+                rank          integer,
+                name          varchar,
+                amount        decimal,
+                budget_amount decimal,
+                spend         decimal
+            )
+    LANGUAGE plpgsql
+AS
+$$
+DECLARE
+    dr daterange = daterange(start_date, end_date, '[]');
+BEGIN
+    RETURN QUERY
+        WITH budgets_with_intervals AS (SELECT ab.id,
+                                               ab.month,
+                                               CASE
+                                                   WHEN basis = 1 THEN adjusted_production
+                                                   ELSE collection END                                  as amount,
+                                               daterange(ab.month, date(ab.month + interval '1 month')) as month_range
+                                        FROM accounts_budget ab
+                                        WHERE office_id = p_office_id),
+             budgets_for_range as (SELECT bi.id,
+                                          bi.month,
+                                          bi.amount,
+                                          bi.month_range,
+                                          bi.month_range * dr as intersection_part
+                                   FROM budgets_with_intervals bi
+                                   WHERE month_range && dr),
+             budgets_with_ratios AS (SELECT bfr.id,
+                                            bfr.month,
+                                            bfr.amount,
+                                            upper(bfr.month_range) -
+                                            lower(bfr.month_range)             as total_days,
+
+                                            upper(bfr.intersection_part) -
+                                            lower(bfr.intersection_part) as intersection_days
+                                     FROM budgets_for_range bfr),
+             amount_ratio AS (SELECT bwr.id,
+                                     bwr.month,
+                                     bwr.amount * bwr.intersection_days / bwr.total_days as amount
+                              FROM budgets_with_ratios bwr),
+             subaccount_ratio as (SELECT asub.slug,
+                                         asub.percentage,
+                                         ar.amount                         as budget_amount,
+                                         asub.percentage * ar.amount / 100 as subaccount_amount
+                                  FROM accounts_subaccount asub
+                                           JOIN amount_ratio ar
+                                                ON asub.budget_id = ar.id),
+             vop_stats AS (SELECT oms.slug,
+                                  SUM(oms.spend) as order_amount
+                           FROM office_monthly_spend(p_office_id, start_date, end_date + 1, false) oms
+                           GROUP BY oms.slug),
+             subaccount_aggs as (SELECT sr.slug,
+                                        SUM(sr.subaccount_amount) as subaccount_amount,
+                                        SUM(sr.budget_amount)     as budget_amount
+                                 FROM subaccount_ratio sr
+                                 GROUP BY sr.slug),
+             subaccount_names as (
+                SELECT DISTINCT ON (sr.slug) sr.slug, sr.name
+                FROM accounts_subaccount sr
+                    JOIN accounts_budget a on sr.budget_id = a.id
+                WHERE a.office_id=p_office_id
+                ORDER BY sr.slug, a.month DESC
+             ),
+             subaccounts_with_spends AS (SELECT sa.slug,
+                                                CASE
+                                                   WHEN sa.slug = 'dental' THEN 1
+                                                   WHEN sa.slug = 'office' THEN 2
+                                                   WHEN sa.slug = 'miscellaneous' THEN 3
+                                                   ELSE 4
+                                                END as rank,
+                                                sn.name,
+                                                sa.subaccount_amount,
+                                                sa.budget_amount,
+                                                COALESCE(vs.order_amount, 0) as spend
+                                         FROM subaccount_aggs sa JOIN subaccount_names sn ON sa.slug = sn.slug
+                                                  LEFT JOIN vop_stats vs
+                                                            ON sa.slug = vs.slug
+                                        )
+        SELECT *
+        FROM subaccounts_with_spends;
+END;
+$$;
+"""
+
+CHART_SQL = """
+CREATE OR REPLACE FUNCTION budget_chart_data(p_office_id int, start_date date, end_date date)
+    RETURNS jsonb
+    LANGUAGE plpgsql
+AS
+$$
+DECLARE
+    result jsonb;
+BEGIN
+WITH vop_spends as (SELECT oms.month, oms.slug as budget_spend_type, sum(oms.spend) as spend
+                    FROM office_monthly_spend(p_office_id, start_date, end_date, true) oms
+                    GROUP BY oms.month, oms.slug),
+     subs_with_spends AS (SELECT subacc.budget_id,
+                                 jsonb_build_object(
+                                         'id', subacc.id,
+                                         'name', subacc.name,
+                                         'percentage', subacc.percentage,
+                                         'slug', subacc.slug,
+                                         'spend', vsp.spend,
+                                         'vendors', subacc.vendors
+                                     ) as sub_json
+                          FROM accounts_subaccount subacc
+                                   JOIN accounts_budget bud ON subacc.budget_id = bud.id
+                                   LEFT JOIN vop_spends vsp
+                                             ON subacc.slug = vsp.budget_spend_type
+                                                    AND bud.month = vsp.month
+                          WHERE bud.office_id = p_office_id
+                            AND bud.month >= start_date
+                            and bud.month < end_date),
+     subs_aggs AS (SELECT sws.budget_id, jsonb_agg(sws.sub_json) as subaccounts
+                   FROM subs_with_spends sws
+                   GROUP BY sws.budget_id)
+     SELECT json_agg(jsonb_build_object(
+                                'id', b.id,
+                                'adjusted_production', b.adjusted_production,
+                                'collection', b.collection,
+                                'basis', b.basis,
+                                'month', b.month,
+                                'office', b.office_id,
+                                'subaccounts', sag.subaccounts
+                            ) ORDER BY b.month)
+                 FROM accounts_budget b
+                          JOIN subs_aggs sag ON sag.budget_id = b.id
+    INTO result;
+    RETURN result;
+END
+$$;
+"""
+
+
+def previous_sql(migration_name: str, name: str) -> str:
+    return getattr(importlib.import_module(f"apps.accounts.migrations.{migration_name}"), name)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0062_monthlyspend"),
+        ("orders", "0101_price_age_day"),
+    ]
+
+    operations = [
+        migrations.RunSQL(ADD_FUNCTION_SQL, ADD_FUNCTION_REV_SQL),
+        migrations.RunSQL(TRIGGER_FUNCTIONS_SQL, TRIGGER_FUNCTIONS_REV_SQL),
+        migrations.RunSQL(TRIGGER_SQL, TRIGGER_SQL_REV),
+        migrations.RunSQL(FILL_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(SPEND_FUNCTION_SQL, SPEND_FUNCTION_REV_SQL),
+        migrations.RunSQL(BUDGET_STATS_SQL, previous_sql("0044_update_sql_for_budget_stats", "SQL")),
+        migrations.RunSQL(CHART_SQL, previous_sql("0045_chart_to_sql", "CHART_SQL")),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.1 on 2026-10-17 02:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0063_monthly_spend_triggers"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="monthlyspend",
+            name="office",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="monthly_spends",
+                to="accounts.office",
+            ),
+        ),
+    ]
@@ -9,7 +9,7 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from django.db.models import Case, F, Func, Manager, OuterRef, Q, Subquery, Value, When
-from django.db.models.functions import Extract, JSONObject
+from django.db.models.functions import Coalesce, Extract, JSONObject
 from django.utils import timezone
 from django_extensions.db.fields import AutoSlugField
 from phonenumber_field.modelfields import PhoneNumberField
@@ -57,6 +57,22 @@ class Vendor(models.Model):
         return {k: v for k, v in self.__dict__.items() if "_" not in k}
 
 
+class VendorRequestRate(TimeStampedModel):
+    """
+    Request rate learned by the vendor rate controller, persisted across runs
+    """
+
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, related_name="request_rate")
+    rate = models.FloatField(help_text="Last good requests per second")
+    request_count = models.BigIntegerField(default=0)
+    error_count = models.BigIntegerField(default=0)
+    throttled_count = models.BigIntegerField(default=0)
+    last_throttled_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.vendor}: {self.rate:.2f} req/s"
+
+
 class OpenDentalKey(models.Model):
     key = models.CharField(max_length=30)
 
@@ -344,7 +360,7 @@ VENDOR_CHOICES = ((k, k) for k in ALL_VENDORS)
 
 class SubaccountQuerySet(models.QuerySet):
     def with_ytd(self):
-        ytd_subaccounts = (
+        ytd_amounts = (
             Subaccount.objects.filter(
                 budget__office=OuterRef("budget__office"),
                 slug=OuterRef("slug"),
@@ -360,13 +376,27 @@ class SubaccountQuerySet(models.QuerySet):
                 amount=F("total_budget") * F("percentage") / 100,
             )
             .order_by()
-            .annotate(
-                data=JSONObject(spend=Func(F("spend"), function="sum"), amount=Func(F("amount"), function="sum"))
+            .annotate(total=Func(F("amount"), function="sum"))
+            .values("total")[:1]
+        )
+        ytd_spends = (
+            MonthlySpend.objects.filter(
+                office=OuterRef("budget__office"),
+                slug=OuterRef("slug"),
+                month__year=Extract(OuterRef("budget__month"), "year"),
+                month__lte=OuterRef("budget__month"),
             )
-            .values("data")[:1]
+            .order_by()
+            .annotate(total=Func(F("spend"), function="sum"))
+            .values("total")[:1]
         )
         return (
-            self.annotate(ytd=Subquery(ytd_subaccounts))
+            self.annotate(
+                ytd=JSONObject(
+                    spend=Coalesce(Subquery(ytd_spends), Value(0), output_field=models.DecimalField()),
+                    amount=Subquery(ytd_amounts),
+                )
+            )
             .annotate(
                 rank=Case(
                     When(slug="dental", then=1),
@@ -418,6 +448,31 @@ class Subaccount(models.Model):
         return self.slug
 
 
+class MonthlySpend(models.Model):
+    """
+    Spend of vendor order products per office, budget spend type and month.
+    Maintained by database triggers on vendor orders and their products, rebuilt by `rebuild_monthly_spend`.
+    """
+
+    # delete triggers of a cascaded order products delete write rows of the office being deleted,
+    # rows of deleted offices are removed by the post_delete signal of the office
+    office = models.ForeignKey(Office, on_delete=models.DO_NOTHING, db_constraint=False, related_name="monthly_spends")
+    slug = models.CharField(max_length=64)
+    month = MonthField()
+    spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending_approval_spend = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Spend of vendor orders waiting for approval"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("office", "slug", "month"), name="monthly_spend_office_slug_month_uniq")
+        ]
+
+    def __str__(self):
+        return f"{self.office_id} {self.slug} {self.month}: {self.spend}"
+
+
 class OfficeSetting(TimeStampedModel):
     office = models.OneToOneField(Office, related_name="settings", on_delete=models.CASCADE)
     enable_order_approval = models.BooleanField(default=True)
@@ -466,6 +521,35 @@ class UnlinkedOfficeVendor(OfficeVendor):
         proxy = True
 
 
+class VendorSession(TimeStampedModel):
+    """
+    Authenticated vendor cookies of an office vendor, shared by every task and worker until they expire
+    """
+
+    office_vendor = models.OneToOneField(OfficeVendor, on_delete=models.CASCADE, related_name="vendor_session")
+    cookies = models.JSONField(default=list)
+    credentials_hash = models.CharField(max_length=64, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    login_started_at = models.DateTimeField(null=True, blank=True, help_text="Set while a worker is logging in")
+
+    def __str__(self):
+        return f"{self.office_vendor_id}: expires at {self.expires_at}"
+
+
+class VendorOrderSync(TimeStampedModel):
+    """
+    High-water mark of the nightly order sync, the next sync pulls only orders placed after it
+    """
+
+    office_vendor = models.OneToOneField(OfficeVendor, on_delete=models.CASCADE, related_name="order_sync")
+    synced_to = models.DateField(null=True, blank=True)
+    last_duration = models.FloatField(default=0, help_text="Seconds the last sync took")
+    last_order_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.office_vendor_id}: synced to {self.synced_to}"
+
+
 class CompanyMember(TimeStampedModel):
     class InviteStatus(models.IntegerChoices):
         INVITE_SENT = 0
@@ -0,0 +1,46 @@
+"""
+Rebuild of the monthly spend rollup read by the budget stats and chart functions.
+
+The rollup is kept up to date by triggers on vendor orders and their products,
+rebuilding it is needed only after changes bypassing them (e.g. moving orders between offices).
+"""
+
+import logging
+from typing import List, Optional
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+REBUILD_SQL = """
+INSERT INTO accounts_monthlyspend (office_id, slug, month, spend, pending_approval_spend)
+SELECT o.office_id,
+       vop.budget_spend_type,
+       date_trunc('month', ov.order_date)::date,
+       coalesce(sum(vop.quantity * vop.unit_price) FILTER (WHERE ov.status != 'pendingapproval'), 0),
+       coalesce(sum(vop.quantity * vop.unit_price) FILTER (WHERE ov.status = 'pendingapproval'), 0)
+FROM orders_vendororderproduct vop
+JOIN orders_vendororder ov ON ov.id = vop.vendor_order_id
+JOIN orders_order o ON o.id = ov.order_id
+WHERE coalesce(vop.budget_spend_type, '') != '' {office_filter}
+GROUP BY 1, 2, 3
+"""
+
+
+def rebuild_monthly_spend(office_ids: Optional[List[int]] = None) -> int:
+    """Recalculate the rollup of the given offices (all offices by default), returning the number of rows"""
+    params = []
+    delete_sql = "DELETE FROM accounts_monthlyspend"
+    office_filter = ""
+    if office_ids:
+        params = [list(office_ids)]
+        delete_sql += " WHERE office_id = ANY(%s)"
+        office_filter = "AND o.office_id = ANY(%s)"
+    with transaction.atomic(), connection.cursor() as cur:
+        # triggers of concurrent order changes wait until the rebuilt rollup is committed
+        cur.execute("LOCK TABLE accounts_monthlyspend IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(delete_sql, params)
+        cur.execute(REBUILD_SQL.format(office_filter=office_filter), params)
+        rows = cur.rowcount
+    logger.info("Rebuilt %s monthly spend rows", rows)
+    return rows
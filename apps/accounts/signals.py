@@ -1,7 +1,9 @@
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, post_delete
 from django.dispatch import receiver
 from django_rest_passwordreset.signals import reset_password_token_created
 
+from apps.accounts.models import MonthlySpend as MonthlySpendModel
+from apps.accounts.models import Office as OfficeModel
 from apps.accounts.models import OfficeVendor as OfficeVendorModel
 from apps.accounts.models import ShippingMethod as ShippingMethodModel
 
@@ -20,3 +22,8 @@ def remove_shipping_method_through_office_vendor(sender, **kwargs):
         shipping_methods_pks = kwargs["instance"].shipping_options.values_list("pk")
         shipping_methods = ShippingMethodModel.objects.filter(pk__in=shipping_methods_pks)
         shipping_methods.delete()
+
+
+@receiver(post_delete, sender=OfficeModel)
+def remove_monthly_spend_of_office(sender, instance, **kwargs):
+    MonthlySpendModel.objects.filter(office_id=instance.id).delete()
@@ -18,6 +18,7 @@ from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from django.core.management import call_command
 from django.db import connection
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone
@@ -25,6 +26,7 @@ from django.utils import timezone
 from apps.accounts.constants import GHOST_COMPANY_PERIOD, MONTHS_BACKWARDS
 from apps.accounts.helper import OfficeBudgetHelper
 from apps.accounts.models import (
+    Budget,
     Company,
     CompanyMember,
     CompanyMemberInviteSchedule,
@@ -37,6 +39,7 @@ from apps.accounts.services.offices import OfficeService
 from apps.common.elk import _make_elk_link
 from apps.common.enums import SupportedVendor
 from apps.common.month import Month
+from apps.common.utils import bulk_update
 from apps.orders.helpers import (
     OfficeProductCategoryHelper,
     OfficeProductHelper,
@@ -45,7 +48,7 @@ from apps.orders.helpers import (
 from apps.orders.models import OfficeProductCategory, OrderStatus, VendorOrder
 from apps.orders.product_updater import update_vendor_products_by_api
 from apps.orders.products_updater.net32_updater import update_net32_products
-from apps.orders.updater import fetch_for_vendor
+from apps.orders.updater import fetch_for_vendor, refresh_vendor
 from apps.scrapers.errors import (
     OrderFetchException,
     ScraperException,
@@ -199,10 +202,20 @@ def update_vendor_products_prices(self, vendor_slug, office_id=None):
         OrderHelper.update_vendor_order_product_price(vendor_slug, office_id)
 
 
-@app.task(priority=9)
-def update_vendor_product_prices_for_all_offices(vendor_slug):
-    for ov in OfficeVendor.objects.filter(vendor__slug=vendor_slug, office__company__is_active=True):
-        update_vendor_products_prices.delay(vendor_slug, ov.office_id)
+@app.task(bind=True, priority=9, time_limit=4 * 60 * 60)
+def update_vendor_product_prices_for_all_offices(self, vendor_slug):
+    """
+    Refresh prices of a vendor for all active offices at once,
+    every vendor product is fetched only once per vendor account no matter how many offices have it in inventory.
+    """
+    try:
+        stats = asyncio.run(refresh_vendor(vendor_slug))
+    except (ScraperException, VendorClientException) as e:
+        self.update_state(state=states.FAILURE, meta=traceback.format_exc())
+        raise Ignore() from e
+    OrderHelper.update_vendor_order_product_price(vendor_slug)
+    if stats.has_more:
+        update_vendor_product_prices_for_all_offices.delay(vendor_slug)
 
 
 @app.task(bind=True, priority=9)
@@ -358,6 +371,13 @@ def update_office_budget():
     # OfficeBudgetHelper.update_budget_with_previous_month()
 
 
+@app.task
+def materialize_office_budgets(months_back: int = 0):
+    """Create missing budgets of the current month (and `months_back` previous ones) so requests don't have to"""
+    current_month = Month.from_date(timezone.localdate())
+    OfficeBudgetHelper.materialize_budgets(current_month - months_back, current_month)
+
+
 #####################################################################################################################
 # v2
 #####################################################################################################################
@@ -518,21 +538,31 @@ def cleanup_ghosted_companies():
 @app.task
 def fill_office_budget_full(office_id: Optional[int] = None, months=MONTHS_BACKWARDS):
     current_month = Month.from_date(timezone.localdate())
-    offices = Office.objects.filter(dental_api__isnull=False).select_related("dental_api")
+    offices = Office.objects.filter(dental_api__isnull=False)
     if office_id:
         offices = offices.filter(pk=office_id)
-    for o in offices:
-        logger.info("Processing %s", o.name)
-        m = current_month - months - 1
-        while m < current_month:
-            b = OfficeBudgetHelper.get_or_create_budget(office_id=o.pk, month=m + 1)
-            if not b.adjusted_production or not b.collection:
-                logger.info("Requesting for month %s", m)
-                ap, col = OfficeBudgetHelper.load_dental_data(o.dental_api.key, m)
-                b.adjusted_production = ap
-                b.collection = col
-                b.save(update_fields=["adjusted_production", "collection"])
-            m += 1
+    office_ids = list(offices.values_list("pk", flat=True))
+    OfficeBudgetHelper.materialize_budgets(current_month - months, current_month, office_ids=office_ids)
+    # budget of a month is based on production and collection of the previous one
+    budgets = list(
+        Budget.objects.filter(office_id__in=office_ids, month__gte=current_month - months, month__lte=current_month)
+        .filter(Q(adjusted_production=0) | Q(collection=0))
+        .select_related("office__dental_api")
+        .order_by("office_id", "month")
+    )
+    logger.info("Requesting production and collection for %s budgets", len(budgets))
+    results = OfficeBudgetHelper.load_production_collections(
+        [(b.office.dental_api.key, (b.month - 1).first_day(), (b.month - 1).last_day()) for b in budgets]
+    )
+    budgets_to_update = []
+    for b, result in zip(budgets, results):
+        if result is None:
+            continue
+        b.adjusted_production, b.collection = result
+        budgets_to_update.append(b)
+    bulk_update(Budget, budgets_to_update, fields=["adjusted_production", "collection"])
+
+
 def notyify_for_unlinked_vendor(office_name,vendor_name,reason):
     channel_id = os.getenv('UNLINK_VENDOR_SLACK_CHANNEL_ID')
     site = os.getenv('SITE_URL')
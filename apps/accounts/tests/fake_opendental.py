@@ -0,0 +1,66 @@
+"""
+Local stand-in for the OpenDental query API, used by tests and benchmarks.
+
+Serve `FakeOpenDental().make_app()` with `apps.common.benchmark.fake_server`
+and point clients at `<base url>/queries/ShortQuery`.
+Rows of a query are returned by the `rows(office_key, sql)` callable, paginated like ShortQuery.
+"""
+
+import asyncio
+import re
+from collections import Counter
+from typing import Callable, List
+
+from aiohttp import web
+
+from services.opendental import PAGE_SIZE
+
+QUERY_PATH = "/queries/ShortQuery"
+DATE_RE = re.compile(r"@(?:FromDate|StartDate)\s*=\s*'(\d{4}-\d{2}-\d{2})")
+
+RowsFunc = Callable[[str, str], List[dict]]
+
+
+def period_start(sql: str) -> str:
+    match = DATE_RE.search(sql)
+    return match.group(1) if match else ""
+
+
+def production_rows(office_key: str, sql: str) -> List[dict]:
+    """Deterministic production and collections of the office and period"""
+    seed = sum(map(ord, office_key + period_start(sql))) % 1000
+    return [{"Adjusted_Production": 10000 + seed, "Collections": 8000 + seed}]
+
+
+class FakeOpenDental:
+    """
+    `queries` records (office key, sql, offset) of every query,
+    `max_in_flight` the largest number of concurrent queries per office key.
+    """
+
+    def __init__(self, rows: RowsFunc = production_rows, latency: float = 0.0):
+        self.rows = rows
+        self.latency = latency
+        self.queries = []
+        self.max_in_flight = Counter()
+        self.in_flight = Counter()
+
+    async def short_query(self, request: web.Request) -> web.Response:
+        office_key = request.headers["Authorization"].rpartition("/")[2]
+        body = await request.json()
+        offset = int(request.query.get("Offset", 0))
+        self.queries.append((office_key, body["SqlCommand"], offset))
+        self.in_flight[office_key] += 1
+        self.max_in_flight[office_key] = max(self.max_in_flight[office_key], self.in_flight[office_key])
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight[office_key] -= 1
+        if office_key == "invalid":
+            return web.Response(status=401, text="Invalid authorization")
+        return web.json_response(self.rows(office_key, body["SqlCommand"])[offset : offset + PAGE_SIZE])
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_put(QUERY_PATH, self.short_query)
+        return app
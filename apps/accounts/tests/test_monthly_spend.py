@@ -0,0 +1,65 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.accounts.models import MonthlySpend, Office
+from apps.accounts.services.monthly_spend import rebuild_monthly_spend
+from apps.common.choices import OrderStatus
+from apps.orders.factories import (
+    OrderFactory,
+    VendorOrderFactory,
+    VendorOrderProductFactory,
+)
+from apps.orders.models import VendorOrderProduct
+
+
+def get_spends(office_id):
+    return {
+        (spend.slug, spend.month.first_day()): (spend.spend, spend.pending_approval_spend)
+        for spend in MonthlySpend.objects.filter(office_id=office_id).exclude(spend=0, pending_approval_spend=0)
+    }
+
+
+class MonthlySpendTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.order = OrderFactory()
+        cls.office_id = cls.order.office_id
+        cls.vendor_order = VendorOrderFactory(
+            order=cls.order, order_date=datetime.date(2023, 3, 15), status=OrderStatus.OPEN
+        )
+        VendorOrderProductFactory.create_batch(
+            2, vendor_order=cls.vendor_order, quantity=2, unit_price=Decimal("10.00"), budget_spend_type="dental"
+        )
+
+    def test_products_are_rolled_up(self):
+        self.assertEqual(get_spends(self.office_id), {("dental", datetime.date(2023, 3, 1)): (40, 0)})
+
+    def test_recategorized_products_move_spend(self):
+        VendorOrderProduct.objects.filter(vendor_order=self.vendor_order).update(budget_spend_type="office")
+        self.assertEqual(get_spends(self.office_id), {("office", datetime.date(2023, 3, 1)): (40, 0)})
+
+    def test_vendor_order_changes_move_spend(self):
+        self.vendor_order.order_date = datetime.date(2023, 4, 2)
+        self.vendor_order.status = OrderStatus.PENDING_APPROVAL
+        self.vendor_order.save()
+        self.assertEqual(get_spends(self.office_id), {("dental", datetime.date(2023, 4, 1)): (0, 40)})
+
+    def test_deleted_products_are_subtracted(self):
+        VendorOrderProduct.objects.filter(vendor_order=self.vendor_order).first().delete()
+        self.assertEqual(get_spends(self.office_id), {("dental", datetime.date(2023, 3, 1)): (20, 0)})
+
+    def test_rebuild_matches_triggers(self):
+        VendorOrderProductFactory(
+            vendor_order=self.vendor_order, quantity=1, unit_price=Decimal("5.00"), budget_spend_type="office"
+        )
+        expected = get_spends(self.office_id)
+        rebuild_monthly_spend([self.office_id])
+        self.assertEqual(get_spends(self.office_id), expected)
+
+    def test_deleted_office_removes_its_spend(self):
+        Office.objects.get(id=self.office_id).delete()
+
+        self.assertFalse(VendorOrderProduct.objects.filter(vendor_order=self.vendor_order).exists())
+        self.assertFalse(MonthlySpend.objects.filter(office_id=self.office_id).exists())
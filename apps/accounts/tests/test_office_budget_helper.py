@@ -173,7 +173,9 @@ class OfficeHelperTestCase(ParametrizedTestCase, TestCase):
         adjusted_production = 100
         collection = 200
         with patch.object(
-            OfficeBudgetHelper, "load_prev_month_production_collection", return_value=(adjusted_production, collection)
+            OfficeBudgetHelper,
+            "load_production_collections",
+            side_effect=lambda periods: [(adjusted_production, collection)] * len(periods),
         ):
             OfficeBudgetHelper.update_office_budgets()
         budgets = list(Budget.objects.filter(month=current_month))
@@ -215,6 +217,33 @@ class OfficeHelperTestCase(ParametrizedTestCase, TestCase):
         assert {s.name for s in subaccounts} == set(map(str.capitalize, slugs))
         assert all(s.vendors == [] for s in subaccounts)
 
+    def test_materialize_budgets_fills_gaps(self):
+        cs = self.companies[0]
+        last_month = cs.months[-1]
+        SubaccountFactory(budget=cs.budgets[last_month], slug="my-budget", name="My Budget", vendors=[], percentage=5)
+        Budget.objects.filter(pk=cs.budgets[cs.months[-2]].pk).delete()
+        created = OfficeBudgetHelper.materialize_budgets(cs.months[-3], last_month + 2, office_ids=[cs.office.id])
+        assert created == 3
+        budgets = {b.month: b for b in Budget.objects.filter(office=cs.office).prefetch_related("subaccounts")}
+        assert budgets[last_month].pk == cs.budgets[last_month].pk
+        assert {s.slug for s in budgets[cs.months[-2]].subaccounts.all()} == set(BUILTIN_BUDGET_SLUGS)
+        for month in (last_month + 1, last_month + 2):
+            budget = budgets[month]
+            assert budget.basis == cs.budgets[last_month].basis
+            assert budget.adjusted_production == 0
+            assert {s.slug for s in budget.subaccounts.all()} == {*BUILTIN_BUDGET_SLUGS, "my-budget"}
+            assert all(s.spend == 0 for s in budget.subaccounts.all())
+        assert not Budget.objects.filter(office=self.companies[1].office, month=last_month + 1).exists()
+
+    def test_materialize_budgets_without_previous_budget(self):
+        cs = _make_company([])
+        month = Month.from_date(timezone.localdate())
+        created = OfficeBudgetHelper.materialize_budgets(month - 1, month, office_ids=[cs.office.id])
+        assert created == 2
+        assert OfficeBudgetHelper.materialize_budgets(month - 1, month, office_ids=[cs.office.id]) == 0
+        subaccounts = Subaccount.objects.filter(budget__office=cs.office, budget__month=month)
+        assert {s.slug: s.percentage for s in subaccounts} == {"dental": 5, "office": 1.5, "miscellaneous": 0}
+
     def test_get_slug_mapping_no_custom(self):
         cs = self.companies[0]
         budget = OfficeBudgetHelper.get_or_create_budget(cs.office.id, cs.months[-1])
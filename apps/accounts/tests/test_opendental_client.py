@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+
+from django.core.cache import cache
+
+from apps.accounts.tests.fake_opendental import (
+    QUERY_PATH,
+    FakeOpenDental,
+    production_rows,
+)
+from apps.common.benchmark import fake_server
+from services.opendental import (
+    CLOSED_PERIOD_CACHE_TIMEOUT,
+    OPEN_PERIOD_CACHE_TIMEOUT,
+    PAGE_SIZE,
+    AsyncOpenDentalClient,
+    cache_timeout,
+    make_session,
+)
+
+PERIODS = [(datetime.date(2023, month, 1), datetime.date(2023, month, 28)) for month in range(1, 7)]
+
+
+def run_queries(base_url, queries):
+    async def main():
+        async with make_session() as session:
+            client = AsyncOpenDentalClient(session, query_url=f"{base_url}{QUERY_PATH}", developer_key="developer")
+            return await asyncio.gather(*(getattr(client, method)(*args) for method, *args in queries))
+
+    return asyncio.run(main())
+
+
+def test_offices_are_queried_concurrently_within_office_limit():
+    cache.clear()
+    fake = FakeOpenDental(latency=0.1)
+    queries = [
+        ("query_template", key, "production", *period)
+        for key in ("office-1", "office-2", "office-3")
+        for period in PERIODS
+    ]
+    with fake_server(fake.make_app()) as base_url:
+        results = run_queries(base_url, queries)
+
+    assert all(status == 200 for _, status in results)
+    assert results[0][0] == production_rows("office-1", "@FromDate = '2023-01-01'")
+    # queries of different offices overlap, each office has at most 2 in flight
+    assert dict(fake.max_in_flight) == {"office-1": 2, "office-2": 2, "office-3": 2}
+
+
+def test_template_results_are_cached():
+    cache.clear()
+    fake = FakeOpenDental()
+    query = ("query_template", "office-1", "production", *PERIODS[0])
+    with fake_server(fake.make_app()) as base_url:
+        run_queries(base_url, [query])
+        results = run_queries(base_url, [query, query])
+
+    assert len(fake.queries) == 1
+    assert results[0] == (production_rows("office-1", "@FromDate = '2023-01-01'"), 200)
+
+
+def test_failed_queries_are_not_cached():
+    cache.clear()
+    fake = FakeOpenDental()
+    query = ("query_template", "invalid", "production", *PERIODS[0])
+    with fake_server(fake.make_app()) as base_url:
+        results = run_queries(base_url, [query])
+        run_queries(base_url, [query])
+
+    assert results[0][1] == 401
+    assert len(fake.queries) == 2
+
+
+def test_all_pages_are_fetched():
+    cache.clear()
+    fake = FakeOpenDental(rows=lambda office_key, sql: [{"ProcCode": f"D{i:04}"} for i in range(PAGE_SIZE * 2 + 5)])
+    with fake_server(fake.make_app()) as base_url:
+        results = run_queries(base_url, [("query_template_all", "office-1", "procedure", *PERIODS[0])])
+
+    rows, status = results[0]
+    assert status == 200
+    assert len(rows) == PAGE_SIZE * 2 + 5
+    assert [offset for _, _, offset in fake.queries] == [0, PAGE_SIZE, PAGE_SIZE * 2]
+
+
+def test_cache_timeout_depends_on_closed_period():
+    today = datetime.date(2023, 6, 15)
+    assert cache_timeout(datetime.date(2023, 5, 31), today) == CLOSED_PERIOD_CACHE_TIMEOUT
+    assert cache_timeout(datetime.date(2023, 6, 30), today) == OPEN_PERIOD_CACHE_TIMEOUT
+    assert cache_timeout(datetime.datetime(2023, 6, 15, 10), today) == OPEN_PERIOD_CACHE_TIMEOUT
@@ -134,10 +134,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
         end_date = attrs.get("end_date")
         start_month = Month.from_date(start_date)
         end_month = Month.from_date(end_date)
-        cur_month = start_month
-        while cur_month <= end_month:
-            OfficeBudgetHelper.get_or_create_budget(office_id=office_id, month=cur_month)
-            cur_month += 1
+        OfficeBudgetHelper.materialize_budgets(start_month, end_month, office_ids=[office_id])
         with db.connection.cursor() as cur:
             cur.execute("SELECT * FROM budget_full_stats(%s, %s, %s)", [office_id, start_date, end_date])
             result = json.loads(cur.fetchone()[0])
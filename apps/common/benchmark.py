@@ -0,0 +1,72 @@
+"""
+Helpers for the benchmarks in scripts/benchmarks, tests serve fake vendor APIs with `fake_server` too.
+
+Each measured function runs in a fresh spawned process, so peak RSS of one
+run isn't affected by memory used by the command itself or by previous runs.
+"""
+import asyncio
+import multiprocessing
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, NamedTuple
+
+from aiohttp import web
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    elapsed: float
+    peak_rss_mb: float
+    result: Any = None
+
+    def __str__(self):
+        return f"{self.name:<24} {self.elapsed:>10.2f}s {self.peak_rss_mb:>10.1f}MB  {self.result}"
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss keeps the peak of the parent from before exec, VmHWM counts only this process
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(name: str, target: Callable, args: tuple) -> BenchmarkResult:
+    started = time.perf_counter()
+    result = target(*args)
+    elapsed = time.perf_counter() - started
+    return BenchmarkResult(name=name, elapsed=elapsed, peak_rss_mb=_peak_rss_mb(), result=result)
+
+
+def measure(name: str, target: Callable, *args) -> BenchmarkResult:
+    """Run module level `target` in a separate process and return its wall time and peak RSS"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_measure, (name, target, args))
+
+
+@contextmanager
+def fake_server(app: web.Application) -> Iterator[str]:
+    """Serve aiohttp `app` on a random local port from a background thread, yielding its base url"""
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
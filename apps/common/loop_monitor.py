@@ -0,0 +1,174 @@
+"""
+Event loop blocking detector.
+
+Every monitored loop runs a heartbeat callback. A watchdog thread notices when the heartbeat is late
+by more than the threshold, which means a callback is blocking the loop, and captures the stack of the loop thread
+together with the vendor of the scraper or client on that stack and the asyncio task (request or celery task).
+The blocked call is logged with its full duration once the loop gets back to the heartbeat.
+
+The ASGI app monitors its loop from startup, celery workers monitor every loop created by `asyncio.run`
+through `MonitoredEventLoopPolicy`, and `forbid_blocking` fails tests which block the loop.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.25"))
+HEARTBEAT_INTERVAL = 0.05
+
+counters = Counter()
+# name of the celery task running in this worker process
+current_task_name: Optional[str] = None
+
+_monitors: "weakref.WeakSet[LoopMonitor]" = weakref.WeakSet()
+_watchdog: Optional[threading.Thread] = None
+_watchdog_lock = threading.Lock()
+
+
+class LoopBlockedError(AssertionError):
+    pass
+
+
+@dataclass
+class BlockedCall:
+    stack: str
+    vendor: Optional[str]
+    task: Optional[str]
+    duration: Optional[float] = None
+
+    def __str__(self):
+        duration = f"{self.duration:.3f}s" if self.duration is not None else "at least the threshold"
+        return f"Event loop blocked for {duration} (vendor={self.vendor}, task={self.task})\n{self.stack}"
+
+
+def get_vendor_slug(frame) -> Optional[str]:
+    """Return slug of the vendor whose scraper or client is on the stack"""
+    while frame is not None:
+        owner = frame.f_locals.get("self")
+        slug = getattr(owner, "VENDOR_SLUG", None) or getattr(getattr(owner, "vendor", None), "slug", None)
+        if isinstance(slug, str):
+            return slug
+        frame = frame.f_back
+    return None
+
+
+class LoopMonitor:
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float = LOOP_BLOCK_THRESHOLD):
+        self.loop = loop
+        self.threshold = threshold
+        self.thread_id: Optional[int] = None
+        self.last_beat = time.monotonic()
+        self.pending: Optional[BlockedCall] = None
+        self.blocked: List[BlockedCall] = []
+
+    def start(self):
+        self.loop.call_soon(self._beat)
+        _monitors.add(self)
+        _ensure_watchdog()
+
+    def _beat(self):
+        now = time.monotonic()
+        self.thread_id = threading.get_ident()
+        if self.pending is not None:
+            blocked_call, self.pending = self.pending, None
+            blocked_call.duration = now - self.last_beat - HEARTBEAT_INTERVAL
+            self.blocked.append(blocked_call)
+            counters["blocked_calls"] += 1
+            counters["blocked_seconds"] += blocked_call.duration
+            counters[f"blocked_calls:{blocked_call.vendor or blocked_call.task}"] += 1
+            logger.warning("%s", blocked_call)
+        self.last_beat = now
+        self.loop.call_later(HEARTBEAT_INTERVAL, self._beat)
+
+    def check(self, now: float):
+        """Capture stack of the loop thread if the heartbeat is late, called from the watchdog thread"""
+        if self.pending is not None or self.thread_id is None or not self.loop.is_running():
+            return
+        if now - self.last_beat - HEARTBEAT_INTERVAL < self.threshold:
+            return
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        task = asyncio.current_task(self.loop)
+        self.pending = BlockedCall(
+            stack="".join(traceback.format_stack(frame)),
+            vendor=get_vendor_slug(frame),
+            task=current_task_name or (task.get_name() if task else None),
+        )
+
+
+def _watch():
+    while True:
+        time.sleep(min(LOOP_BLOCK_THRESHOLD, HEARTBEAT_INTERVAL))
+        now = time.monotonic()
+        for loop_monitor in list(_monitors):
+            if loop_monitor.loop.is_closed():
+                _monitors.discard(loop_monitor)
+                continue
+            loop_monitor.check(now)
+
+
+def _ensure_watchdog():
+    global _watchdog
+
+    with _watchdog_lock:
+        if _watchdog is None or not _watchdog.is_alive():
+            _watchdog = threading.Thread(target=_watch, name="loop-watchdog", daemon=True)
+            _watchdog.start()
+
+
+def monitor(loop: Optional[asyncio.AbstractEventLoop] = None, threshold: float = LOOP_BLOCK_THRESHOLD) -> LoopMonitor:
+    loop_monitor = LoopMonitor(loop or asyncio.get_running_loop(), threshold)
+    loop_monitor.start()
+    return loop_monitor
+
+
+class MonitoredEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    """Event loop policy monitoring every new loop, including the ones created by `asyncio.run`"""
+
+    def __init__(self, threshold: float = LOOP_BLOCK_THRESHOLD):
+        super().__init__()
+        self.threshold = threshold
+        self.monitors: List[LoopMonitor] = []
+
+    def new_event_loop(self):
+        loop = super().new_event_loop()
+        self.monitors.append(monitor(loop, self.threshold))
+        return loop
+
+
+@contextmanager
+def forbid_blocking(threshold: float = LOOP_BLOCK_THRESHOLD) -> Iterator[MonitoredEventLoopPolicy]:
+    """Raise `LoopBlockedError` if any loop created within the block was blocked longer than the threshold"""
+    previous_policy = asyncio.get_event_loop_policy()
+    policy = MonitoredEventLoopPolicy(threshold)
+    asyncio.set_event_loop_policy(policy)
+    try:
+        yield policy
+    finally:
+        asyncio.set_event_loop_policy(previous_policy)
+    blocked = []
+    for loop_monitor in policy.monitors:
+        blocked.extend(loop_monitor.blocked)
+        # the loop may have finished before getting back to the heartbeat
+        if loop_monitor.pending is not None:
+            blocked.append(loop_monitor.pending)
+    if blocked:
+        raise LoopBlockedError("\n".join(map(str, blocked)))
+
+
+def log_counters():
+    if counters:
+        logger.info("Event loop blocking: %s", dict(counters))
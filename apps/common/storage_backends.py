@@ -10,3 +10,10 @@ class PublicMediaStorage(S3Boto3Storage):
     location = "media"
     default_acl = "public-read"
     file_overwrite = False
+
+
+class PrivateMediaStorage(S3Boto3Storage):
+    location = "private"
+    default_acl = "private"
+    file_overwrite = True
+    custom_domain = False
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+import pytest
+
+from apps.common import loop_monitor
+
+
+class FakeClient:
+    VENDOR_SLUG = "fake_vendor"
+
+    async def blocking_call(self):
+        time.sleep(0.3)
+
+    async def awaiting_call(self):
+        await asyncio.sleep(0.3)
+
+
+def test_blocking_call_is_reported_with_vendor():
+    with pytest.raises(loop_monitor.LoopBlockedError) as exc_info:
+        with loop_monitor.forbid_blocking(threshold=0.1):
+            asyncio.run(FakeClient().blocking_call())
+
+    assert "vendor=fake_vendor" in str(exc_info.value)
+    assert "blocking_call" in str(exc_info.value)
+
+
+def test_awaiting_call_is_not_reported():
+    with loop_monitor.forbid_blocking(threshold=0.1) as policy:
+        asyncio.run(FakeClient().awaiting_call())
+
+    assert len(policy.monitors) == 1
@@ -1,7 +1,6 @@
 import asyncio as aio
 import csv
 import datetime
-import itertools
 import logging
 import traceback
 from collections import defaultdict
@@ -9,22 +8,25 @@ from decimal import Decimal
 from functools import reduce
 from itertools import chain
 from operator import or_
-from typing import Dict, Iterator, List, Optional, TypedDict, Union
+from typing import Dict, Iterator, List, NamedTuple, Optional, TypedDict, Union
 
 import pandas as pd
 import requests
 from aiohttp import ClientSession, ClientTimeout
-from asgiref.sync import sync_to_async
-from dateutil import rrule
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.search import SearchQuery, SearchVectorField
+from django.db import transaction
 from django.db.models import (
+    BigIntegerField,
     BooleanField,
     Case,
-    Count,
     DecimalField,
     Exists,
     F,
+    IntegerField,
     Model,
     OuterRef,
     Prefetch,
@@ -68,16 +70,19 @@ from apps.common.utils import (
     remove_dash_between_numerics,
     sort_and_write_to_csv,
 )
+from apps.orders import search_cache
 from apps.orders.models import OfficeProduct as OfficeProductModel
 from apps.orders.models import OfficeProductCategory as OfficeProductCategoryModel
 from apps.orders.models import Order as OrderModel
 from apps.orders.models import Procedure as ProcedureModel
 from apps.orders.models import ProcedureCode as ProcedureCodeModel
+from apps.orders.models import ProcedureFetchWindow as ProcedureFetchWindowModel
 from apps.orders.models import Product as ProductModel
 from apps.orders.models import ProductCategory as ProductCategoryModel
 from apps.orders.models import ProductImage as ProductImageModel
 from apps.orders.models import VendorOrder as VendorOrderModel
 from apps.orders.models import VendorOrderProduct as VendorOrderProductModel
+from apps.orders.services.similarity import group_similar_products
 from apps.scrapers.errors import VendorAuthenticationFailed as VendorAuthFailed
 from apps.scrapers.scraper_factory import ScraperFactory
 from apps.slack.bot import notify
@@ -87,12 +92,16 @@ from apps.vendor_clients.sync_clients import BaseClient as BaseSyncClient
 from apps.vendor_clients.types import Product, ProductPrice, VendorCredential
 from config.constants import API_AVAILABLE_VENDORS, FORMULA_VENDORS, NON_FORMULA_VENDORS
 from config.utils import get_client_session
-from services.opendental import OpenDentalClient
+from services.opendental import AsyncOpenDentalClient
+from services.opendental import make_session as make_opendental_session
 
 SmartID = Union[int, str]
 ProductID = SmartID
 ProductIDs = List[ProductID]
 CSV_DELIMITER = "!@#$%"
+MANUFACTURER_NUMBER_GROUPING_CHUNK_SIZE = 1000
+PROCEDURE_WEEK_CONCURRENCY = 4
+PROCEDURE_BATCH_SIZE = 1000
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +111,27 @@ class ParentProduct(TypedDict):
     children_ids: ProductIDs
 
 
+class ManufacturerNumberGroup(NamedTuple):
+    manufacturer_number: str
+    name: str
+    product_ids: List[int]
+    # existing parent to keep, new parent is created when it is None
+    parent_id: Optional[int]
+    parent_manufacturer_number_changed: bool
+    stale_parent_ids: List[int]
+    moved_product_ids: List[int]
+
+    def __str__(self):
+        parent = self.parent_id or f'new "{self.name}"'
+        text = (
+            f"{self.manufacturer_number}: parent {parent}, "
+            f"moving {len(self.moved_product_ids)} of {len(self.product_ids)} products"
+        )
+        if self.stale_parent_ids:
+            text += f", deleting parents {concatenate_list_as_string(self.stale_parent_ids, delimiter=',')}"
+        return text
+
+
 class OfficeProductHelper:
     @staticmethod
     def get_available_sibling_products(office: Union[SmartID, OfficeModel], product: Union[SmartID, ProductModel]):
@@ -362,6 +392,10 @@ class OfficeProductHelper:
     async def get_products_prices_from_db(
         products: Dict[str, ProductModel], office_id: str
     ) -> Dict[str, ProductPrice]:
+        """
+        Resolve prices of products stored in the database in at most two queries:
+        office product prices for formula vendors and recent product prices for the others
+        """
         product_ids_from_formula_vendors = []
         product_ids_from_non_formula_vendors = []
         for product_id, product in products.items():
@@ -373,28 +407,33 @@ class OfficeProductHelper:
         product_prices = defaultdict(dict)
 
         # Get prices of products from formula vendors
-        office_products = OfficeProductModel.objects.filter(
-            product_id__in=product_ids_from_formula_vendors, office_id=office_id
-        ).values("product_id", "price", "product_vendor_status")
-
-        async for office_product in office_products:
-            product_prices[office_product["product_id"]]["price"] = office_product["price"]
-            product_prices[office_product["product_id"]]["product_vendor_status"] = office_product[
-                "product_vendor_status"
-            ]
+        if product_ids_from_formula_vendors:
+            office_products = OfficeProductModel.objects.filter(
+                product_id__in=product_ids_from_formula_vendors, office_id=office_id
+            ).values("product_id", "price", "product_vendor_status")
+
+            async for office_product in office_products:
+                product_prices[office_product["product_id"]]["price"] = office_product["price"]
+                product_prices[office_product["product_id"]]["product_vendor_status"] = office_product[
+                    "product_vendor_status"
+                ]
 
         # Get prices of products from non-formula vendors
-        for product_id in product_ids_from_non_formula_vendors:
-            vendor_obj = ProductModel.objects.select_related("vendor").get(id=product_id)
-            if vendor_obj and vendor_obj.vendor.slug == "crazy_dental":
-                product_prices[product_id]["price"] = vendor_obj.price
-                product_prices[product_id]["product_vendor_status"] = ""
-
-            else:
-                recent_price = products[product_id].recent_price
-                if recent_price:
-                    product_prices[product_id]["price"] = recent_price
-                    product_prices[product_id]["product_vendor_status"] = ""
+        if product_ids_from_non_formula_vendors:
+            non_formula_products = ProductModel.objects.filter(id__in=product_ids_from_non_formula_vendors).values(
+                "id", "vendor__slug", "price", "last_price_updated"
+            )
+            async for product in non_formula_products:
+                if product["vendor__slug"] == "crazy_dental":
+                    price = product["price"]
+                else:
+                    price = ProductModel.get_recent_price(
+                        product["vendor__slug"], product["price"], product["last_price_updated"]
+                    )
+                    if not price:
+                        continue
+                product_prices[product["id"]]["price"] = price
+                product_prices[product["id"]]["product_vendor_status"] = ""
 
         return product_prices
 
@@ -530,7 +569,7 @@ class VendorHelper:
         for vendor_slug in vendor_slugs:
             vendor_products = list(filter(lambda x: x["vendor"] == vendor_slug, products.values()))
             if vendor_slug in clients:
-                tasks.append(clients[vendor_slug].get_products_prices(vendor_products, office_id))
+                tasks.append(clients[vendor_slug].get_products_prices(vendor_products, office_id=office_id))
         prices_results = await aio.gather(*tasks, return_exceptions=True)
 
         ret: Dict[str, ProductPrice] = {}
@@ -863,66 +902,124 @@ class ProductHelper:
             df_index += batch_size
 
     @staticmethod
-    def group_products_by_manufacturer_numbers(since: Optional[datetime.datetime] = None, vendor_id=-1):
-        """group products by using manufacturer_number. this number is identical for products"""
-        products = ProductModel.objects.filter(manufacturer_number__isnull=False)
-        if since:
-            products = products.filter(updated_at__gt=since)
-        if vendor_id != -1:
-            products = products.filter(vendor_id=vendor_id)
-        manufacturer_numbers = set(
-            products.order_by("manufacturer_number")
-            .values("manufacturer_number")
-            .annotate(products_count=Count("vendor"))
-            .values_list("manufacturer_number", flat=True)
+    def plan_manufacturer_number_groups(
+        since: Optional[datetime.datetime] = None, vendor_id=-1
+    ) -> List[ManufacturerNumberGroup]:
+        """
+        Compute parents of products sharing a manufacturer number from a single streamed query.
+        With `since` or `vendor_id`, only manufacturer numbers of matching products are regrouped.
+        Only groups that change are returned.
+        """
+        products = ProductModel.objects.filter(manufacturer_number__isnull=False, vendor__isnull=False).exclude(
+            manufacturer_number=""
         )
-        products_to_be_updated = []
-        # parent_products_to_be_created = []
-        for i, manufacturer_number in enumerate(manufacturer_numbers):
-            if len(manufacturer_number) < 1:
-                continue
-            print(f"Calculating {i}th: {manufacturer_number}")
-            similar_products = ProductModel.objects.filter(
-                manufacturer_number=manufacturer_number, vendor__isnull=False
+        if since or vendor_id != -1:
+            changed_products = ProductModel.objects.filter(manufacturer_number__isnull=False)
+            if since:
+                changed_products = changed_products.filter(updated_at__gt=since)
+            if vendor_id != -1:
+                changed_products = changed_products.filter(vendor_id=vendor_id)
+            products = products.filter(manufacturer_number__in=changed_products.values("manufacturer_number"))
+
+        products_by_manufacturer_number = defaultdict(list)
+        for product_id, manufacturer_number, name, parent_id in products.values_list(
+            "id", "manufacturer_number", "name", "parent_id"
+        ).iterator(chunk_size=MANUFACTURER_NUMBER_GROUPING_CHUNK_SIZE):
+            products_by_manufacturer_number[manufacturer_number].append((product_id, name, parent_id))
+
+        parents_by_manufacturer_number = {
+            manufacturer_number: {parent_id for _, _, parent_id in group_products if parent_id}
+            for manufacturer_number, group_products in products_by_manufacturer_number.items()
+        }
+        parent_manufacturer_numbers = {}
+        for parent_ids in batched(set(chain.from_iterable(parents_by_manufacturer_number.values())), 10000):
+            parent_manufacturer_numbers.update(
+                ProductModel.objects.filter(id__in=parent_ids).values_list("id", "manufacturer_number")
             )
+        # groups of products under different parents get a new parent, the old parents are removed
+        stale_parent_ids = set(
+            chain.from_iterable(parents for parents in parents_by_manufacturer_number.values() if len(parents) >= 2)
+        )
 
-            # remove already existing parent products
-            similar_product_ids = similar_products.values_list("id", flat=True)
-            parent_products = ProductModel.objects.filter(child__id__in=similar_product_ids).distinct()
-            product_names = sorted(list(similar_products.values_list("name", flat=True)), key=lambda x: len(x))
-            display_text = concatenate_list_as_string(similar_product_ids, delimiter=",")
-
-            parent_products_count = parent_products.count()
-            if parent_products_count == 1:
-                parent_product = parent_products.first()
-                print(f"Parent product already existed {parent_product.id} {parent_product.name}: {display_text}")
-                parent_product.manufacturer_number = manufacturer_number
-                parent_product.save()
-            else:
-                if parent_products_count >= 2:
-                    parent_product_ids = parent_products.values_list("id", flat=True)
-                    display_text = f"{concatenate_list_as_string(parent_product_ids, delimiter=',')}: {display_text}"
-                    print(f"Existed 2 parents {display_text}")
-                    ProductModel.objects.filter(id__in=parent_product_ids).delete()
+        groups = []
+        for manufacturer_number in sorted(products_by_manufacturer_number):
+            group_products = products_by_manufacturer_number[manufacturer_number]
+            parent_ids = parents_by_manufacturer_number[manufacturer_number]
+            parent_id = next(iter(parent_ids)) if len(parent_ids) == 1 else None
+            if parent_id in stale_parent_ids:
+                parent_id = None
+            moved_product_ids = [
+                product_id for product_id, _, product_parent_id in group_products if product_parent_id != parent_id
+            ]
+            manufacturer_number_changed = (
+                parent_id is not None and parent_manufacturer_numbers.get(parent_id) != manufacturer_number
+            )
+            if parent_id is not None and not moved_product_ids and not manufacturer_number_changed:
+                continue
 
-                parent_product = ProductModel.objects.create(
-                    name=product_names[0], manufacturer_number=manufacturer_number
+            groups.append(
+                ManufacturerNumberGroup(
+                    manufacturer_number=manufacturer_number,
+                    name=min((name for _, name, _ in group_products), key=len),
+                    product_ids=[product_id for product_id, _, _ in group_products],
+                    parent_id=parent_id,
+                    parent_manufacturer_number_changed=manufacturer_number_changed,
+                    stale_parent_ids=sorted(parent_ids) if len(parent_ids) >= 2 else [],
+                    moved_product_ids=moved_product_ids,
                 )
+            )
+        return groups
 
-            for product in similar_products:
-                product.parent = parent_product
-                products_to_be_updated.append(product)
+    @staticmethod
+    def apply_manufacturer_number_groups(
+        groups: List[ManufacturerNumberGroup], chunk_size: int = MANUFACTURER_NUMBER_GROUPING_CHUNK_SIZE
+    ):
+        """Write planned groups with bulk queries, each chunk of groups in its own transaction"""
+        for chunk in batched(groups, chunk_size):
+            with transaction.atomic():
+                new_parent_groups = [group for group in chunk if group.parent_id is None]
+                new_parents = bulk_create(
+                    ProductModel,
+                    [
+                        ProductModel(name=group.name, manufacturer_number=group.manufacturer_number)
+                        for group in new_parent_groups
+                    ],
+                )
+                new_parent_ids = {id(group): parent.id for group, parent in zip(new_parent_groups, new_parents)}
 
-                # parent_products_to_be_created.append(
-                #     ParentProduct(
-                #         product=ProductModel(name=product_names[0], manufacturer_number=manufacturer_number),
-                #         children_ids=similar_product_ids,
-                #     )
-                # )
+                stale_parent_ids = list(chain.from_iterable(group.stale_parent_ids for group in chunk))
+                if stale_parent_ids:
+                    ProductModel.objects.filter(id__in=stale_parent_ids).delete()
 
-        print("updating databases...")
-        bulk_update(model_class=ProductModel, objs=products_to_be_updated, fields=["parent"])
-        # ProductHelper.create_parent_products(parent_products_to_be_created)
+                bulk_update(
+                    ProductModel,
+                    [
+                        ProductModel(id=group.parent_id, manufacturer_number=group.manufacturer_number)
+                        for group in chunk
+                        if group.parent_manufacturer_number_changed
+                    ],
+                    fields=["manufacturer_number"],
+                )
+                bulk_update(
+                    ProductModel,
+                    [
+                        ProductModel(id=product_id, parent_id=group.parent_id or new_parent_ids[id(group)])
+                        for group in chunk
+                        for product_id in group.moved_product_ids
+                    ],
+                    fields=["parent"],
+                )
+            logger.info("Applied %s manufacturer number groups", len(chunk))
+
+    @staticmethod
+    def group_products_by_manufacturer_numbers(
+        since: Optional[datetime.datetime] = None, vendor_id=-1, dry_run: bool = False
+    ) -> List[ManufacturerNumberGroup]:
+        """group products by using manufacturer_number. this number is identical for products"""
+        groups = ProductHelper.plan_manufacturer_number_groups(since, vendor_id)
+        if not dry_run:
+            ProductHelper.apply_manufacturer_number_groups(groups)
+        return groups
 
     @staticmethod
     def group_products(
@@ -1037,106 +1134,16 @@ class ProductHelper:
 
     @staticmethod
     def group_products_by_name(products, product_ids_by_vendors) -> List[ProductIDs]:
-        # TODO: This algorith should be updated. like this way
-        """
-        1. find out 2-length similar products like current one
-        2. from the 3-length product comparison, current approach seems bad,
-            even though we don't calculate similarity for all pairs
-        3. group_by_vendors, run combination, products just like 2-length comparison, that will be faster.
-        """
-        threshold = 0.7
-        n_similarity = 2
-        vendors_count = len(product_ids_by_vendors)
-        similar_products_candidates = defaultdict(list)
-
-        # find out all 2-length similar products
-        products_combinations = itertools.combinations(product_ids_by_vendors, n_similarity)
-        for products_combination in products_combinations:
-            for product_ids in itertools.product(*products_combination):
-                vendor_product_names = [products[product_id]["name"] for product_id in product_ids]
-                similarity = ProductHelper.get_similarity(*vendor_product_names)
-
-                if similarity > threshold:
-                    display_text = "; ".join(
-                        [f'{products[product_id]["vendor"]}-{product_id}' for product_id in product_ids]
-                    )
-                    print(f"{similarity:.2f}: {display_text}")
-                    similar_products_candidates[n_similarity].append([f"{similarity:.2f}", *product_ids])
-
-        # when finding more than 3-length similar products we need to check from candidates pairs
-        n_similarity = 3
-        while n_similarity <= vendors_count:
-            print(f"calculating {n_similarity}=======")
-            n_threshold = threshold ** (n_similarity - 1)
-            n_1_similarity_products_pairs_length = len(similar_products_candidates[n_similarity - 1])
-            if not n_1_similarity_products_pairs_length:
-                break
-
-            well_matching_pair_ids = set()
-            for i in range(n_1_similarity_products_pairs_length - 1):
-                ith_similar_products_pair = similar_products_candidates[n_similarity - 1][i][1:]
-                ith_similar_product_ids = set(ith_similar_products_pair)
-                ith_similar_product_vendors = set(
-                    [products[product_id]["vendor"] for product_id in ith_similar_products_pair]
-                )
-                print(f"comparing with {i}th element ")
-                for j in range(i + 1, n_1_similarity_products_pairs_length):
-                    jth_similar_products_pair = similar_products_candidates[n_similarity - 1][j][1:]
-                    jth_similar_product_ids = set(jth_similar_products_pair)
-                    jth_similar_product_vendors = set(
-                        [products[product_id]["vendor"] for product_id in jth_similar_products_pair]
-                    )
-                    if not ith_similar_product_ids.intersection(jth_similar_product_ids):
-                        continue
-
-                    proucts_difference = ith_similar_product_ids - jth_similar_product_ids
-                    if len(proucts_difference) > 1:
-                        continue
-
-                    ith_vendor_difference = ith_similar_product_vendors - jth_similar_product_vendors
-                    jth_vendor_difference = jth_similar_product_vendors - ith_similar_product_vendors
-
-                    if ith_vendor_difference == jth_vendor_difference:
-                        continue
-
-                    if tuple(ith_similar_product_ids | jth_similar_product_ids) in well_matching_pair_ids:
-                        continue
-
-                    similar_products_pair = ith_similar_product_ids | jth_similar_product_ids
-                    well_matching_pair_ids.add(tuple(similar_products_pair))
-                    vendor_product_names = [products[product_id]["name"] for product_id in similar_products_pair]
-                    similarity = ProductHelper.get_similarity(*vendor_product_names)
-
-                    if similarity > n_threshold:
-                        display_text = "; ".join(
-                            [f'{products[product_id]["vendor"]}-{product_id}' for product_id in similar_products_pair]
-                        )
-                        print(f"{similarity:.2f}: {display_text}")
-                        similar_products_candidates[n_similarity].append([f"{similarity:.2f}", *similar_products_pair])
-
-            n_similarity += 1
-
-        similar_products_candidates = chain.from_iterable([value for _, value in similar_products_candidates.items()])
-        similar_products_list = ProductHelper.clean_well_matching_paris(similar_products_candidates)
-        return [similar_products[1:] for similar_products in similar_products_list]
-
-    @staticmethod
-    def clean_well_matching_paris(well_matching_pairs):
         """
-        This will remove partly-duplicated product paris if the well_matching_paris contains
-        [(1, vendorA_productID, vendorB_productID), (0.9, vendorA_productID, vendorB_productID)]
-        the second pair is not needed.
+        Return groups of similar products of different vendors.
+        :param products: product id => {"vendor": ..., "name": ...}
+        :param product_ids_by_vendors: product ids of each vendor, only those are grouped
         """
-        cleaned_well_matching_paris = []
-        included_product_ids = set()
-        well_matching_pairs = sorted(well_matching_pairs, key=lambda x: (len(x), x[0]), reverse=True)
-        for well_matching_pair in well_matching_pairs:
-            well_matching_product_pair_ids = set(well_matching_pair[1:])
-            if included_product_ids & well_matching_product_pair_ids:
-                continue
-            included_product_ids |= well_matching_product_pair_ids
-            cleaned_well_matching_paris.append(well_matching_pair)
-        return cleaned_well_matching_paris
+        product_ids = set(chain.from_iterable(product_ids_by_vendors))
+        return group_similar_products(
+            {product_id: product for product_id, product in products.items() if product_id in product_ids},
+            threshold=0.7,
+        )
 
     @staticmethod
     def get_similarity(*products, key=None):
@@ -1397,30 +1404,14 @@ class ProductHelper:
         )
 
     @staticmethod
-    def get_products_v3(
+    def search_parent_products(
         query: str,
-        office: Union[OfficeModel, SmartID],
-        fetch_parents: bool = True,
-        selected_products: Optional[List[SmartID]] = None,
-        price_from: float = -1,
-        price_to: float = -1,
-        vendors: Optional[List[str]] = None,
-    ):
-        replacer = Replacer()
-        query = replacer.replace(query)
-        if isinstance(office, OfficeModel):
-            office_pk = office.id
-        else:
-            office_pk = office
-
-        connected_vendor_ids = list(OfficeVendorHelper.get_connected_vendor_ids(office_pk))
-        print("connected_vendor_ids: ", connected_vendor_ids)
-        vendor_slugs = vendors.split(",") if vendors else []
-        if vendor_slugs:
-            selected_vendors = VendorModel.objects.filter(slug__in=vendor_slugs).values_list("id", flat=True)
-            connected_vendor_ids = list(set(connected_vendor_ids) & set(selected_vendors))
-            print("connected_vendor_ids: ", connected_vendor_ids)
-        print("query", query)
+        office_pk: SmartID,
+        connected_vendor_ids: List[int],
+        selected_products: List[SmartID],
+        max_last_order_date: QuerySet,
+    ) -> search_cache.SearchResult:
+        """Return ordered ids of parent products matching the search and vendors available among them"""
         products = (
             ProductModel.objects.available_products()
             .search(query)
@@ -1447,18 +1438,70 @@ class ProductHelper:
         # Unify with the above
         products = products | office_nickname_products
 
-        # TODO: why don't we remove this one? How is it being used?
-        #       Let's change it to office enabled vendors, this query is expensive
-        available_vendor_ids = set(v for vendors in products.values_list("vendors", flat=True) for v in vendors)
-        available_vendors = [v.slug for v in VendorModel.objects.filter(pk__in=available_vendor_ids)]
-        if selected_products is None:
-            selected_products = []
+        # Vendor facet is computed by the database from the same matches, it doesn't depend on the row
+        # so it is evaluated once and returned along with the product ids
+        matched_vendor_ids = (
+            products.order_by()
+            .annotate(matched_vendor_id=Func(F("vendors"), function="unnest", output_field=IntegerField()))
+            .values("matched_vendor_id")
+        )
+        available_vendors = ArraySubquery(VendorModel.objects.filter(pk__in=matched_vendor_ids).values("slug"))
 
-        products = products.select_related("vendor", "category")
+        rows = (
+            products.annotate(last_order_date=Subquery(max_last_order_date))
+            .annotate(available_vendors=available_vendors)
+            .annotate(
+                selected_product=Case(
+                    When(id__in=selected_products, then=Value(0)),
+                    default=Value(1),
+                )
+            )
+            .order_by(
+                "selected_product",
+                F("last_order_date").desc(nulls_last=True),
+                "-relevance",
+                "-child_count",
+            )
+            .values_list("id", "available_vendors")
+        )
+        rows = list(rows)
+        product_ids = list(dict.fromkeys(product_id for product_id, _ in rows))
+        available_vendors = rows[0][1] if rows else []
+        return search_cache.SearchResult(product_ids=product_ids, available_vendors=available_vendors)
 
-        office_product_price = OfficeProductModel.objects.filter(
-            office_id=office_pk, product_id=OuterRef("pk")
-        ).values("price")
+    @staticmethod
+    def get_products_v3(
+        query: str,
+        office: Union[OfficeModel, SmartID],
+        fetch_parents: bool = True,
+        selected_products: Optional[List[SmartID]] = None,
+        price_from: float = -1,
+        price_to: float = -1,
+        vendors: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ):
+        """
+        Return parent products matching the query, slice [offset:offset + limit] of them when limit is given,
+        connected vendors having any of them and the number of all matching products.
+        """
+        replacer = Replacer()
+        query = replacer.replace(query)
+        if isinstance(office, OfficeModel):
+            office_pk = office.id
+        else:
+            office_pk = office
+
+        connected_vendor_ids = list(OfficeVendorHelper.get_connected_vendor_ids(office_pk))
+        print("connected_vendor_ids: ", connected_vendor_ids)
+        vendor_slugs = vendors.split(",") if vendors else []
+        if vendor_slugs:
+            selected_vendors = VendorModel.objects.filter(slug__in=vendor_slugs).values_list("id", flat=True)
+            connected_vendor_ids = list(set(connected_vendor_ids) & set(selected_vendors))
+            print("connected_vendor_ids: ", connected_vendor_ids)
+        print("query", query)
+        if selected_products is None:
+            selected_products = []
 
         # we treat parent product as inventory product if it has inventory children product
         max_last_order_date = (
@@ -1470,6 +1513,22 @@ class ProductHelper:
             .values("max_last_order_date")
         )
 
+        cache_key = search_cache.search_cache_key(
+            office_pk, query, connected_vendor_ids, selected_products, price_from, price_to
+        )
+        search_result = search_cache.get_search_result(cache_key)
+        if search_result is None:
+            search_result = ProductHelper.search_parent_products(
+                query, office_pk, connected_vendor_ids, selected_products, max_last_order_date
+            )
+            search_cache.set_search_result(cache_key, search_result)
+        available_vendors = list(search_result.available_vendors)
+        total = len(search_result.product_ids)
+        # only ids of the requested page are sent to the database, so their order is cheap to keep
+        product_ids = search_result.product_ids[offset : None if limit is None else offset + limit]
+        if not product_ids:
+            return ProductModel.objects.none(), available_vendors, total
+
         price_least_update_date = timezone.localtime() - datetime.timedelta(days=settings.PRODUCT_PRICE_UPDATE_CYCLE)
         print(price_least_update_date)
         office_product_price = OfficeProductModel.objects.filter(
@@ -1503,33 +1562,28 @@ class ProductHelper:
             child_products_prefetch = child_products_prefetch.filter(product_price__lte=price_to)
 
         products = (
-            products.annotate(last_order_date=Subquery(max_last_order_date))
+            ProductModel.objects.filter(id__in=product_ids)
+            .select_related("vendor", "category")
+            .annotate(last_order_date=Subquery(max_last_order_date))
             .annotate(is_inventory=ExpressionWrapper(Q(last_order_date__isnull=False), output_field=BooleanField()))
-            # .annotate(last_order_date=Subquery(inventory_office_products.values("last_order_date")[:1]))
-            # .annotate(last_order_price=Subquery(inventory_office_products.values("price")[:1]))
-            # .annotate(product_vendor_status=Subquery(office_products.values("product_vendor_status")[:1]))
-            .annotate(
-                selected_product=Case(
-                    When(id__in=selected_products, then=Value(0)),
-                    default=Value(1),
-                )
-            )
             .annotate(
                 group=Case(
                     When(child_count__gt=1, then=Value(1)),
                     default=Value(0),
                 )
             )
+            # keep order of the search result
             .order_by(
-                "selected_product",
-                F("last_order_date").desc(nulls_last=True),
-                "-relevance",
-                "-child_count",
+                Func(
+                    Value(product_ids, output_field=ArrayField(BigIntegerField())),
+                    F("id"),
+                    function="array_position",
+                )
             )
             .prefetch_related(Prefetch("children", child_products_prefetch))
         )
 
-        return products, available_vendors
+        return products, available_vendors, total
 
     @staticmethod
     def suggest_products(search: str, office: Union[OfficeModel, SmartID], vendors=None):
@@ -1619,88 +1673,117 @@ class OfficeVendorHelper:
 class ProcedureHelper:
     @staticmethod
     def fetch_procedure_period(day_from, office_id):
+        """
+        Load weekly procedure counts of the office from Open Dental, starting from the week of `day_from`.
+        Weeks are fetched concurrently, weeks loaded after they were over are never fetched again.
+        """
         if day_from is None or office_id is None:
             print("Wrong argument(s)")
             return
 
-        office = OfficeModel.objects.get(id=office_id)
+        office = OfficeModel.objects.select_related("dental_api").get(id=office_id)
         dental_api = office.dental_api
         if not dental_api:
             print("Invalid dental api key")
             return
 
-        date_now = datetime.datetime.now()
-
-        week_startday = day_from - datetime.timedelta(days=day_from.weekday())
-        last_week_startday = date_now - datetime.timedelta(days=date_now.weekday())
-        for dt in rrule.rrule(rrule.WEEKLY, dtstart=week_startday, until=date_now):
-            ProcedureHelper.fetch_procedures(
-                dt,
-                dt + datetime.timedelta(days=6),
-                office.id,
-                dental_api.key,
-                dt.date() == last_week_startday.date(),
+        if isinstance(day_from, datetime.datetime):
+            day_from = day_from.date()
+        today = timezone.localdate()
+        week_start = day_from - datetime.timedelta(days=day_from.weekday())
+        fetched_weeks = set(
+            ProcedureFetchWindowModel.objects.filter(office_id=office.id, start_date__gte=week_start).values_list(
+                "start_date", flat=True
             )
-
-    @staticmethod
-    def fetch_procedures(day_from, day_to, office_id, dental_api, force_update=False):
-        if day_from is None or day_to is None:
-            print("Wrong argument(s)")
-            return
-
-        old_procs = ProcedureModel.objects.filter(office=office_id, start_date=day_from)
-        bExists = len(old_procs) > 0
-
-        if not force_update and bExists:
-            print(f"Already exists with day_from={day_from}")
+        )
+        weeks = []
+        while week_start <= today:
+            if week_start not in fetched_weeks:
+                weeks.append(week_start)
+            week_start += datetime.timedelta(weeks=1)
+        if not weeks:
             return
 
-        with open(settings.BASE_DIR / "query/procedure.sql") as f:
-            queryProcedure = f.read()
+        results = async_to_sync(ProcedureHelper.fetch_procedure_weeks)(dental_api.key, weeks)
+        ProcedureHelper.save_procedures(office.id, dict(zip(weeks, results)), today)
 
-        query = queryProcedure.format(day_from=day_from, day_to=day_to)
-        print(f"Fetching {day_from} - {day_to}")
-        offset = 0
-        count = 0
-
-        try:
-            creating_procedures = []
-            while True:
-                od_client = OpenDentalClient(dental_api)
-                json_procedure, status = od_client.query(query, offset)
-                if status != HTTP_200_OK:
-                    return Response(status=status, data={"message": f"{json_procedure}"})
-                response_len = len(json_procedure)
-
-                print(f"Fetching offset = {offset} length = {response_len}")
-
-                for procedure in json_procedure:
-                    procedure_code = ProcedureCodeModel.objects.filter(proccode=procedure["ProcCode"]).first()
-                    if procedure_code:
-                        creating_procedures.append(
-                            ProcedureModel(
-                                start_date=day_from,
-                                count=int(str(procedure["Count"]).replace(",", "")),
-                                avgfee=str(procedure["AvgFee"]).replace(",", ""),
-                                totfee=str(procedure["TotFee"]).replace(",", ""),
-                                procedurecode=procedure_code,
-                                office_id=office_id,
-                            )
-                        )
+    @staticmethod
+    async def fetch_procedure_weeks(dental_api_key: str, weeks: List[datetime.date]) -> list:
+        async with make_opendental_session() as session:
+            od_client = AsyncOpenDentalClient(session, office_concurrency=PROCEDURE_WEEK_CONCURRENCY)
+            return await aio.gather(
+                *(
+                    od_client.query_template_all(
+                        dental_api_key, "procedure", day_from=week, day_to=week + datetime.timedelta(days=6)
+                    )
+                    for week in weeks
+                ),
+                return_exceptions=True,
+            )
 
-                count += response_len
-                if response_len == 100:
-                    offset += 100
-                else:
-                    break
-            if bExists and force_update:
-                old_procs.delete()
-            bulk_create(ProcedureModel, creating_procedures)
-        except Exception:
-            # Skip in case we have a failure from Open Dental or parse issue.
-            pass
+    @staticmethod
+    def save_procedures(office_id: int, results: dict, today: datetime.date):
+        """Upsert procedures of the fetched weeks, dropping codes which are gone from them, and record closed weeks"""
+        code_ids = {}
+        for code_id, proccode in ProcedureCodeModel.objects.order_by("-id").values_list("id", "proccode"):
+            # first code wins, like looking codes up one by one did
+            code_ids[proccode] = code_id
+
+        procedures = {}
+        loaded_weeks = []
+        for week, result in results.items():
+            if isinstance(result, BaseException):
+                logger.warning("Fetching procedures of office %s week %s failed: %r", office_id, week, result)
+                continue
+            rows, status = result
+            if status != HTTP_200_OK:
+                logger.warning("Fetching procedures of office %s week %s failed: %s %s", office_id, week, status, rows)
+                continue
+            loaded_weeks.append(week)
+            for row in rows:
+                code_id = code_ids.get(row["ProcCode"])
+                if code_id is None:
+                    continue
+                procedures[(week, code_id)] = ProcedureModel(
+                    start_date=week,
+                    count=int(str(row["Count"]).replace(",", "")),
+                    avgfee=str(row["AvgFee"]).replace(",", ""),
+                    totfee=str(row["TotFee"]).replace(",", ""),
+                    procedurecode_id=code_id,
+                    office_id=office_id,
+                )
 
-        print(f"Update {day_from} - {day_to} {count} rows")
+        with transaction.atomic():
+            stale_ids = [
+                procedure_id
+                for procedure_id, week, code_id in ProcedureModel.objects.filter(
+                    office_id=office_id, start_date__in=loaded_weeks
+                ).values_list("id", "start_date", "procedurecode_id")
+                if (week, code_id) not in procedures
+            ]
+            ProcedureModel.objects.filter(id__in=stale_ids).delete()
+            ProcedureModel.objects.bulk_create(
+                procedures.values(),
+                batch_size=PROCEDURE_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=["office", "procedurecode", "start_date"],
+                update_fields=["count", "avgfee", "totfee"],
+            )
+            ProcedureFetchWindowModel.objects.bulk_create(
+                [
+                    ProcedureFetchWindowModel(office_id=office_id, start_date=week)
+                    for week in loaded_weeks
+                    if week + datetime.timedelta(days=6) < today
+                ],
+                ignore_conflicts=True,
+            )
+        logger.info(
+            "Loaded %s procedures of office %s from %s of %s weeks",
+            len(procedures),
+            office_id,
+            len(loaded_weeks),
+            len(results),
+        )
 
 
 class OfficeProductCategoryHelper:
@@ -1781,7 +1864,7 @@ class OrderHelper:
     @staticmethod
     async def _pre_login_steps(vendor_slug):
         # Check the website status
-        response = OrderHelper.check_website_status(vendor_slug)
+        response = await sync_to_async(OrderHelper.check_website_status, thread_sensitive=False)(vendor_slug)
         if response.status_code != 200:
             # Website is down, do not proceed with the login
             return False
@@ -1803,9 +1886,11 @@ class OrderHelper:
                 username=office_vendor.username,
                 password=office_vendor.password,
             )
+            scraper.office_vendor_id = office_vendor.id
             try:
                 logger.info("Starting login...")
-                ret = await scraper.login()
+                # credentials are verified with the vendor, not with a stored session
+                ret = await scraper.authenticate(force=True)
             except Exception as e:
                 logger.info("Login failed...", e)
                 # Comment this notification out as of now per discussion with clients...
@@ -1851,21 +1936,23 @@ class OrderHelper:
         else:
             from_date = to_date.replace(year=to_date.year - 2)
 
+        scraper.office_vendor_id = office_vendor.id
         if perform_login:
             try:
-                await scraper.login()
+                await scraper.authenticate()
             except Exception:
                 office_vendor.login_success = False
                 await office_vendor.asave()
                 raise VendorAuthFailed(f"Authentication is failed for {office_vendor.vendor.name} vendor")
 
-        await scraper.get_orders(
-            office=office_vendor.office,
-            from_date=from_date,
-            to_date=to_date,
-            perform_login=False,
-            completed_order_ids=completed_order_ids,
-        )
+        async with scraper.batch_orders(office_vendor.office):
+            await scraper.get_orders(
+                office=office_vendor.office,
+                from_date=from_date,
+                to_date=to_date,
+                perform_login=False,
+                completed_order_ids=completed_order_ids,
+            )
 
     @staticmethod
     @inject_session(handler=upload_and_notify_vendor_order_session)
@@ -1888,9 +1975,10 @@ class OrderHelper:
             username=office_vendor.username,
             password=office_vendor.password,
         )
+        scraper.office_vendor_id = office_vendor.id
         if perform_login:
             try:
-                await scraper.login()
+                await scraper.authenticate()
             except Exception:
                 logger.debug(f"Authentication is failed for {office_vendor.vendor.name} vendor")
                 raise
@@ -1955,6 +2043,7 @@ class OrderHelper:
                 await OfficeProductModel.objects.filter(
                     office=vendor_order.order.office, product=vendor_order_product.product
                 ).aupdate(last_order_date=vendor_order.order_date)
+            search_cache.invalidate_office_search_results(vendor_order.order.office_id)
 
             order_tasks.append(
                 OrderHelper.process_order_in_vendor(
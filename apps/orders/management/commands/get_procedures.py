@@ -35,6 +35,5 @@ class Command(BaseCommand):
         )
     def handle(self, *args, **options):
         day_from = datetime.datetime.fromisoformat(options["from"]) if options["from"] else None
-        type = options["type"] if options["type"] else None
         office_id = int(options["office"]) if options["office"] else None
-        ProcedureHelper.fetch_procedure_period(day_from, office_id, type)
+        ProcedureHelper.fetch_procedure_period(day_from, office_id)
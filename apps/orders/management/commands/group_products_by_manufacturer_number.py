@@ -11,6 +11,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         """
         python manage.py group_products_by_manufacturer_number --vendor 14 --since 2022-04-12T11:50:29.751119+00:00
+        python manage.py group_products_by_manufacturer_number --dry-run
         """
         parser.add_argument(
             "--since",
@@ -23,7 +24,21 @@ class Command(BaseCommand):
             help="vendor id to group",
         )
 
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="print changes without writing them",
+        )
+
     def handle(self, *args, **options):
         since = datetime.datetime.fromisoformat(options["since"]) if options["since"] else None
         vendor_id = int(options["vendor"]) if options["vendor"] else -1
-        ProductHelper.group_products_by_manufacturer_numbers(since, vendor_id)
+        groups = ProductHelper.group_products_by_manufacturer_numbers(since, vendor_id, dry_run=options["dry_run"])
+        if options["dry_run"]:
+            for group in groups:
+                self.stdout.write(str(group))
+        new_parents_count = sum(1 for group in groups if group.parent_id is None)
+        moved_products_count = sum(len(group.moved_product_ids) for group in groups)
+        self.stdout.write(
+            f"{len(groups)} groups changed: {new_parents_count} new parents, {moved_products_count} products moved"
+        )
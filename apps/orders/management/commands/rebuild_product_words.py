@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from apps.orders import product_words, search_cache
+
+
+class Command(BaseCommand):
+    help = "Recalculate search words of all parent products"
+
+    def add_arguments(self, parser):
+        """
+        python manage.py rebuild_product_words --batch-size 1000
+        python manage.py rebuild_product_words --lag
+        """
+        parser.add_argument("--batch-size", type=int, default=product_words.PRODUCT_WORDS_BATCH_SIZE)
+        parser.add_argument(
+            "--lag",
+            action="store_true",
+            help="only print how far behind the incremental maintenance is",
+        )
+
+    def handle(self, *args, **options):
+        if not options["lag"]:
+            processed = product_words.rebuild_product_words(options["batch_size"])
+            search_cache.invalidate_search_results()
+            self.stdout.write(f"Rebuilt words of {processed} parents")
+        self.stdout.write(f"Product words lag: {product_words.get_product_words_lag()}")
@@ -0,0 +1,182 @@
+# Generated by Django 4.2.1 on 2026-10-17 10:00
+
+from django.db import migrations
+
+DROP_VIEW_SQL = """
+DROP MATERIALIZED VIEW product_words;
+"""
+
+RECREATE_VIEW_SQL = """
+CREATE MATERIALIZED VIEW product_words AS
+SELECT op.parent_id                                 as product_id,
+       array_to_string(tsvector_to_array(to_tsvector('simple', string_agg(op.name, ' '))), ' ') as words,
+       (SELECT array_agg(DISTINCT x) FROM unnest(
+                                array_agg(op.product_id::text) ||
+                                array_agg(op.manufacturer_number::text) ||
+                                array_agg(op.sku::text) ||
+                                array_agg(replace(op.product_id::text, '-', '')) ||
+                                array_agg(replace(op.manufacturer_number::text, '-', '')) ||
+                                array_agg(replace(op.sku::text, '-', ''))
+       ) t(x)
+       WHERE x IS NOT NULL) as numbers,
+       (SELECT array_agg(DISTINCT x) FROM unnest(array_agg(op.name::text)) t(x)
+        WHERE x IS NOT NULL) as names
+FROM orders_product op
+WHERE op.parent_id IS NOT NULL
+  AND vendor_id != 5
+GROUP BY op.parent_id;
+
+CREATE INDEX ON product_words USING gin (words gin_trgm_ops);
+CREATE INDEX ON product_words USING gin (numbers array_ops);
+CREATE INDEX ON product_words USING gin (names array_ops);
+"""
+
+CREATE_TABLES_SQL = """
+CREATE TABLE product_words (
+    product_id bigint PRIMARY KEY REFERENCES orders_product (id) ON DELETE CASCADE,
+    words text,
+    numbers text[],
+    names text[],
+    updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+CREATE INDEX ON product_words USING gin (words gin_trgm_ops);
+CREATE INDEX ON product_words USING gin (numbers array_ops);
+CREATE INDEX ON product_words USING gin (names array_ops);
+
+-- parents whose words have to be recalculated
+CREATE TABLE product_words_queue (
+    product_id bigint PRIMARY KEY,
+    queued_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+CREATE INDEX ON product_words_queue (queued_at);
+"""
+
+DROP_TABLES_SQL = """
+DROP TABLE product_words_queue;
+DROP TABLE product_words;
+"""
+
+RECALCULATE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION recalculate_product_words(parent_product_ids bigint[]) RETURNS VOID
+AS $$
+BEGIN
+    DELETE FROM product_words WHERE product_id = ANY(parent_product_ids);
+
+    INSERT INTO product_words (product_id, words, numbers, names)
+    SELECT op.parent_id,
+           array_to_string(tsvector_to_array(to_tsvector('simple', string_agg(op.name, ' '))), ' '),
+           (SELECT array_agg(DISTINCT x) FROM unnest(
+                                    array_agg(op.product_id::text) ||
+                                    array_agg(op.manufacturer_number::text) ||
+                                    array_agg(op.sku::text) ||
+                                    array_agg(replace(op.product_id::text, '-', '')) ||
+                                    array_agg(replace(op.manufacturer_number::text, '-', '')) ||
+                                    array_agg(replace(op.sku::text, '-', ''))
+           ) t(x)
+           WHERE x IS NOT NULL),
+           (SELECT array_agg(DISTINCT x) FROM unnest(array_agg(op.name::text)) t(x)
+            WHERE x IS NOT NULL)
+    FROM orders_product op
+    WHERE op.parent_id = ANY(parent_product_ids)
+      AND op.vendor_id != 5
+    GROUP BY op.parent_id;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+RECALCULATE_FUNCTION_REV_SQL = """
+DROP FUNCTION IF EXISTS recalculate_product_words(parent_product_ids bigint[]);
+"""
+
+QUEUE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION tgf_queue_product_words () RETURNS TRIGGER
+AS $$
+BEGIN
+IF (TG_OP = 'DELETE' OR TG_OP = 'UPDATE') AND old.parent_id IS NOT NULL THEN
+   INSERT INTO product_words_queue (product_id) VALUES (old.parent_id) ON CONFLICT DO NOTHING;
+END IF;
+IF (TG_OP = 'INSERT' OR TG_OP = 'UPDATE') AND new.parent_id IS NOT NULL THEN
+   INSERT INTO product_words_queue (product_id) VALUES (new.parent_id) ON CONFLICT DO NOTHING;
+END IF;
+IF (TG_OP = 'INSERT') OR (TG_OP = 'UPDATE') THEN
+   RETURN NEW;
+ELSIF (TG_OP = 'DELETE') THEN
+   RETURN OLD;
+END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER after_update_queue_product_words
+AFTER UPDATE ON orders_product
+FOR EACH ROW
+WHEN (
+    (old.parent_id IS DISTINCT FROM new.parent_id) OR
+    (old.vendor_id IS DISTINCT FROM new.vendor_id) OR
+    (
+      new.parent_id IS NOT NULL AND
+      (
+        (old.name IS DISTINCT FROM new.name) OR
+        (old.product_id IS DISTINCT FROM new.product_id) OR
+        (old.manufacturer_number IS DISTINCT FROM new.manufacturer_number) OR
+        (old.sku IS DISTINCT FROM new.sku)
+      )
+    )
+) EXECUTE FUNCTION tgf_queue_product_words();
+
+CREATE TRIGGER after_create_queue_product_words
+AFTER INSERT ON orders_product
+FOR EACH ROW
+WHEN (new.parent_id IS NOT NULL)
+EXECUTE FUNCTION tgf_queue_product_words();
+
+CREATE TRIGGER after_delete_queue_product_words
+AFTER DELETE ON orders_product
+FOR EACH ROW
+WHEN (old.parent_id IS NOT NULL)
+EXECUTE FUNCTION tgf_queue_product_words();
+"""
+
+QUEUE_TRIGGER_SQL_REV = """
+DROP TRIGGER after_update_queue_product_words ON orders_product;
+DROP TRIGGER after_create_queue_product_words ON orders_product;
+DROP TRIGGER after_delete_queue_product_words ON orders_product;
+DROP FUNCTION IF EXISTS tgf_queue_product_words ();
+"""
+
+FILL_SQL = """
+INSERT INTO product_words (product_id, words, numbers, names)
+SELECT op.parent_id,
+       array_to_string(tsvector_to_array(to_tsvector('simple', string_agg(op.name, ' '))), ' '),
+       (SELECT array_agg(DISTINCT x) FROM unnest(
+                                array_agg(op.product_id::text) ||
+                                array_agg(op.manufacturer_number::text) ||
+                                array_agg(op.sku::text) ||
+                                array_agg(replace(op.product_id::text, '-', '')) ||
+                                array_agg(replace(op.manufacturer_number::text, '-', '')) ||
+                                array_agg(replace(op.sku::text, '-', ''))
+       ) t(x)
+       WHERE x IS NOT NULL),
+       (SELECT array_agg(DISTINCT x) FROM unnest(array_agg(op.name::text)) t(x)
+        WHERE x IS NOT NULL)
+FROM orders_product op
+WHERE op.parent_id IS NOT NULL
+  AND op.vendor_id != 5
+GROUP BY op.parent_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0098_alter_cart_unique_together"),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_VIEW_SQL, RECREATE_VIEW_SQL),
+        migrations.RunSQL(CREATE_TABLES_SQL, DROP_TABLES_SQL),
+        migrations.RunSQL(RECALCULATE_FUNCTION_SQL, RECALCULATE_FUNCTION_REV_SQL),
+        migrations.RunSQL(QUEUE_TRIGGER_SQL, QUEUE_TRIGGER_SQL_REV),
+        migrations.RunSQL(FILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,146 @@
+# Generated by Django 4.2.1 on 2026-10-17 12:00
+
+from django.db import migrations
+
+RECALCULATE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION parents_recalculate_children(parent_product_ids bigint[]) RETURNS VOID
+AS $$
+BEGIN
+    IF cardinality(parent_product_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+    WITH child_aggs as (
+        SELECT op.parent_id,
+               array_agg(DISTINCT op.vendor_id) as calculated_vendor_ids,
+               count(*) as calculated_child_count
+        FROM orders_product op
+        WHERE op.parent_id = ANY(parent_product_ids)
+        GROUP BY op.parent_id
+    )
+    UPDATE orders_product
+    SET vendors = coalesce(ca.calculated_vendor_ids, '{}'), child_count = coalesce(ca.calculated_child_count, 0)
+    FROM unnest(parent_product_ids) AS p(parent_id)
+    LEFT JOIN child_aggs ca ON ca.parent_id = p.parent_id
+    WHERE id = p.parent_id;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+RECALCULATE_FUNCTION_REV_SQL = """
+DROP FUNCTION IF EXISTS parents_recalculate_children(parent_product_ids bigint[]);
+"""
+
+STATEMENT_TRIGGER_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION tgf_parents_recalculate_children_on_insert () RETURNS TRIGGER
+AS $$
+BEGIN
+    PERFORM parents_recalculate_children(
+        ARRAY(SELECT DISTINCT parent_id FROM new_rows WHERE parent_id IS NOT NULL)
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_parents_recalculate_children_on_delete () RETURNS TRIGGER
+AS $$
+BEGIN
+    PERFORM parents_recalculate_children(
+        ARRAY(SELECT DISTINCT parent_id FROM old_rows WHERE parent_id IS NOT NULL)
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_parents_recalculate_children_on_update () RETURNS TRIGGER
+AS $$
+BEGIN
+    PERFORM parents_recalculate_children(ARRAY(
+        WITH changed AS (
+            SELECT old_rows.parent_id AS old_parent_id, new_rows.parent_id AS new_parent_id
+            FROM old_rows
+            JOIN new_rows ON new_rows.id = old_rows.id
+            WHERE (old_rows.vendor_id IS DISTINCT FROM new_rows.vendor_id)
+               OR (old_rows.parent_id IS DISTINCT FROM new_rows.parent_id)
+        )
+        SELECT old_parent_id FROM changed WHERE old_parent_id IS NOT NULL
+        UNION
+        SELECT new_parent_id FROM changed WHERE new_parent_id IS NOT NULL
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+STATEMENT_TRIGGER_FUNCTIONS_REV_SQL = """
+DROP FUNCTION IF EXISTS tgf_parents_recalculate_children_on_insert ();
+DROP FUNCTION IF EXISTS tgf_parents_recalculate_children_on_delete ();
+DROP FUNCTION IF EXISTS tgf_parents_recalculate_children_on_update ();
+"""
+
+ROW_TRIGGER_SQL = """
+CREATE TRIGGER after_update_vendor_id_recalculate_children
+AFTER UPDATE ON orders_product
+FOR EACH ROW
+WHEN ((old.vendor_id IS DISTINCT FROM new.vendor_id) OR (old.parent_id IS DISTINCT FROM new.parent_id))
+EXECUTE FUNCTION tgf_parent_recalculate_children();
+
+CREATE TRIGGER after_create_orders_product_recalculate_children
+AFTER INSERT ON orders_product
+FOR EACH ROW
+WHEN (new.parent_id IS NOT NULL)
+EXECUTE FUNCTION tgf_parent_recalculate_children();
+
+CREATE TRIGGER after_delete_orders_product_recalculate_children
+AFTER DELETE ON orders_product
+FOR EACH ROW
+WHEN (old.parent_id IS NOT NULL)
+EXECUTE FUNCTION tgf_parent_recalculate_children();
+"""
+
+ROW_TRIGGER_SQL_REV = """
+DROP TRIGGER after_update_vendor_id_recalculate_children ON orders_product;
+DROP TRIGGER after_create_orders_product_recalculate_children ON orders_product;
+DROP TRIGGER after_delete_orders_product_recalculate_children ON orders_product;
+"""
+
+# every affected parent is recalculated once per statement instead of once per changed child
+STATEMENT_TRIGGER_SQL = """
+CREATE TRIGGER after_update_recalculate_children
+AFTER UPDATE ON orders_product
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_parents_recalculate_children_on_update();
+
+CREATE TRIGGER after_create_recalculate_children
+AFTER INSERT ON orders_product
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_parents_recalculate_children_on_insert();
+
+CREATE TRIGGER after_delete_recalculate_children
+AFTER DELETE ON orders_product
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_parents_recalculate_children_on_delete();
+"""
+
+STATEMENT_TRIGGER_SQL_REV = """
+DROP TRIGGER after_update_recalculate_children ON orders_product;
+DROP TRIGGER after_create_recalculate_children ON orders_product;
+DROP TRIGGER after_delete_recalculate_children ON orders_product;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0099_product_words_table"),
+    ]
+
+    operations = [
+        migrations.RunSQL(RECALCULATE_FUNCTION_SQL, RECALCULATE_FUNCTION_REV_SQL),
+        migrations.RunSQL(STATEMENT_TRIGGER_FUNCTIONS_SQL, STATEMENT_TRIGGER_FUNCTIONS_REV_SQL),
+        migrations.RunSQL(ROW_TRIGGER_SQL_REV, ROW_TRIGGER_SQL),
+        migrations.RunSQL(STATEMENT_TRIGGER_SQL, STATEMENT_TRIGGER_SQL_REV),
+    ]
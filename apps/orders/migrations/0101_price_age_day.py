@@ -0,0 +1,255 @@
+# Generated by Django 4.2.1 on 2026-10-17 13:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+DROP_VIEW_SQL = """
+DROP MATERIALIZED VIEW IF EXISTS price_age;
+"""
+
+RECREATE_VIEW_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS price_age
+AS
+WITH price_ages as (SELECT office_id,
+                           vendor_id,
+                           current_timestamp - last_price_updated as age
+                    FROM orders_officeproduct op),
+grouped_price_ages as (SELECT
+    pa.office_id,
+    pa.vendor_id,
+    CASE
+        WHEN age < '1 day'::interval THEN 1
+        WHEN age < '3 days'::interval THEN 2
+        WHEN age < '7 days'::interval THEN 3
+        WHEN age < '15 days'::interval THEN 4
+        WHEN age < '30 days'::interval THEN 5
+        ELSE 6
+    END as age_group
+    FROM price_ages pa),
+    group_names as (
+        SELECT id, name
+        FROM (
+            VALUES
+                (1, '<1d'),
+                (2, '<3d'),
+                (3, '<7d'),
+                (4, '<15d'),
+                (5, '<30d'),
+                (6, '>30d')
+        ) as t(id, name)
+    ),
+    group_stats as (SELECT gpa.office_id, gpa.vendor_id, gpa.age_group, count(*) as product_count
+                    FROM grouped_price_ages gpa
+                    GROUP BY gpa.office_id, gpa.vendor_id, gpa.age_group)
+SELECT
+    row_number() OVER (ORDER BY av.slug, ao.name) id,
+    gs.office_id,
+    ao.name as office_name,
+    gs.vendor_id,
+    av.slug as vendor_slug,
+    gs.age_group,
+    gn.name as category,
+    COALESCE(gs.product_count, 0) as count
+FROM group_names gn LEFT JOIN group_stats gs ON gn.id = gs.age_group
+     JOIN accounts_office ao ON gs.office_id = ao.id
+    JOIN accounts_vendor av ON gs.vendor_id = av.id
+ORDER BY av.slug, ao.name
+"""
+
+# prices updated more than 30 days ago and products without price update date are counted under 1970-01-01
+DAY_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION price_age_day_of(last_price_updated timestamp with time zone) RETURNS date
+AS $$
+    SELECT CASE
+        WHEN last_price_updated IS NULL OR last_price_updated::date < current_date - 30 THEN DATE '1970-01-01'
+        ELSE last_price_updated::date
+    END
+$$ LANGUAGE sql STABLE;
+"""
+
+DAY_FUNCTION_REV_SQL = """
+DROP FUNCTION IF EXISTS price_age_day_of(last_price_updated timestamp with time zone);
+"""
+
+TRIGGER_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION tgf_price_age_day_on_insert () RETURNS TRIGGER
+AS $$
+BEGIN
+    INSERT INTO price_age_day (office_id, vendor_id, day, count)
+    SELECT office_id, vendor_id, price_age_day_of(last_price_updated), count(*)
+    FROM new_rows
+    WHERE vendor_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (office_id, vendor_id, day) DO UPDATE SET count = price_age_day.count + excluded.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_price_age_day_on_delete () RETURNS TRIGGER
+AS $$
+BEGIN
+    INSERT INTO price_age_day (office_id, vendor_id, day, count)
+    SELECT office_id, vendor_id, price_age_day_of(last_price_updated), -count(*)
+    FROM old_rows
+    WHERE vendor_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (office_id, vendor_id, day) DO UPDATE SET count = price_age_day.count + excluded.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_price_age_day_on_update () RETURNS TRIGGER
+AS $$
+BEGIN
+    WITH changed AS (
+        SELECT old_rows.office_id AS old_office_id,
+               old_rows.vendor_id AS old_vendor_id,
+               price_age_day_of(old_rows.last_price_updated) AS old_day,
+               new_rows.office_id AS new_office_id,
+               new_rows.vendor_id AS new_vendor_id,
+               price_age_day_of(new_rows.last_price_updated) AS new_day
+        FROM old_rows
+        JOIN new_rows ON new_rows.id = old_rows.id
+    ), deltas AS (
+        SELECT old_office_id AS office_id, old_vendor_id AS vendor_id, old_day AS day, -1 AS delta
+        FROM changed
+        WHERE old_vendor_id IS NOT NULL
+          AND (old_office_id, old_vendor_id, old_day) IS DISTINCT FROM (new_office_id, new_vendor_id, new_day)
+        UNION ALL
+        SELECT new_office_id, new_vendor_id, new_day, 1
+        FROM changed
+        WHERE new_vendor_id IS NOT NULL
+          AND (old_office_id, old_vendor_id, old_day) IS DISTINCT FROM (new_office_id, new_vendor_id, new_day)
+    )
+    INSERT INTO price_age_day (office_id, vendor_id, day, count)
+    SELECT office_id, vendor_id, day, sum(delta)
+    FROM deltas
+    GROUP BY 1, 2, 3
+    HAVING sum(delta) != 0
+    ORDER BY 1, 2, 3
+    ON CONFLICT (office_id, vendor_id, day) DO UPDATE SET count = price_age_day.count + excluded.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER_FUNCTIONS_REV_SQL = """
+DROP FUNCTION IF EXISTS tgf_price_age_day_on_insert ();
+DROP FUNCTION IF EXISTS tgf_price_age_day_on_delete ();
+DROP FUNCTION IF EXISTS tgf_price_age_day_on_update ();
+"""
+
+TRIGGER_SQL = """
+CREATE TRIGGER after_update_price_age_day
+AFTER UPDATE ON orders_officeproduct
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_price_age_day_on_update();
+
+CREATE TRIGGER after_create_price_age_day
+AFTER INSERT ON orders_officeproduct
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_price_age_day_on_insert();
+
+CREATE TRIGGER after_delete_price_age_day
+AFTER DELETE ON orders_officeproduct
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_price_age_day_on_delete();
+"""
+
+TRIGGER_SQL_REV = """
+DROP TRIGGER after_update_price_age_day ON orders_officeproduct;
+DROP TRIGGER after_create_price_age_day ON orders_officeproduct;
+DROP TRIGGER after_delete_price_age_day ON orders_officeproduct;
+"""
+
+# triggers are created first, so office products can't be changed until the initial counts are committed
+FILL_SQL = """
+INSERT INTO price_age_day (office_id, vendor_id, day, count)
+SELECT office_id, vendor_id, price_age_day_of(last_price_updated), count(*)
+FROM orders_officeproduct
+WHERE vendor_id IS NOT NULL
+GROUP BY 1, 2, 3;
+"""
+
+CREATE_VIEW_SQL = """
+CREATE VIEW price_age
+AS
+WITH group_stats as (
+    SELECT office_id,
+           vendor_id,
+           CASE
+               WHEN current_date - day < 1 THEN 1
+               WHEN current_date - day < 3 THEN 2
+               WHEN current_date - day < 7 THEN 3
+               WHEN current_date - day < 15 THEN 4
+               WHEN current_date - day < 30 THEN 5
+               ELSE 6
+           END as age_group,
+           sum(count) as product_count
+    FROM price_age_day
+    GROUP BY 1, 2, 3
+)
+SELECT
+    row_number() OVER (ORDER BY av.slug, ao.name) id,
+    gs.office_id,
+    ao.name as office_name,
+    gs.vendor_id,
+    av.slug as vendor_slug,
+    gs.age_group,
+    (ARRAY['<1d', '<3d', '<7d', '<15d', '<30d', '>30d'])[gs.age_group] as category,
+    gs.product_count as count
+FROM group_stats gs
+    JOIN accounts_office ao ON gs.office_id = ao.id
+    JOIN accounts_vendor av ON gs.vendor_id = av.id
+WHERE gs.product_count > 0
+ORDER BY av.slug, ao.name
+"""
+
+DROP_NEW_VIEW_SQL = """
+DROP VIEW IF EXISTS price_age;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0059_vendorrequestrate"),
+        ("orders", "0100_statement_level_recalculate_children"),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_VIEW_SQL, RECREATE_VIEW_SQL),
+        migrations.CreateModel(
+            name="PriceAgeDay",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "office",
+                    models.ForeignKey(
+                        db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to="accounts.office"
+                    ),
+                ),
+                (
+                    "vendor",
+                    models.ForeignKey(
+                        db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to="accounts.vendor"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "price_age_day",
+                "unique_together": {("office", "vendor", "day")},
+            },
+        ),
+        migrations.RunSQL(DAY_FUNCTION_SQL, DAY_FUNCTION_REV_SQL),
+        migrations.RunSQL(TRIGGER_FUNCTIONS_SQL, TRIGGER_FUNCTIONS_REV_SQL),
+        migrations.RunSQL(TRIGGER_SQL, TRIGGER_SQL_REV),
+        migrations.RunSQL(FILL_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_VIEW_SQL, DROP_NEW_VIEW_SQL),
+    ]
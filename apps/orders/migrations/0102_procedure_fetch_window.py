@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# weeks stored before the windows were recorded were fetched already, closed ones don't need fetching again
+FILL_SQL = """
+INSERT INTO orders_procedurefetchwindow (created_at, updated_at, office_id, start_date)
+SELECT now(), now(), office_id, start_date
+FROM orders_procedure
+WHERE start_date + 6 < CURRENT_DATE
+GROUP BY office_id, start_date
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0063_monthly_spend_triggers"),
+        ("orders", "0101_price_age_day"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProcedureFetchWindow",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("start_date", models.DateField()),
+                (
+                    "office",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="procedure_fetch_windows",
+                        to="accounts.office",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("office", "start_date")},
+            },
+        ),
+        migrations.RunSQL(FILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# An update trigger with transition tables can't have a WHEN condition or a column list, so it captured
+# whole old and new rows of every update of products (prices, descriptions, search vectors).
+# A row trigger filtered by WHEN records parents of children whose parent or vendor changed,
+# and a statement trigger without transition tables recalculates them once per statement.
+DIRTY_PARENTS_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION tgf_product_record_dirty_parents () RETURNS TRIGGER
+AS $$
+BEGIN
+    -- writes made by triggers, including the recalculation itself, are skipped
+    IF pg_trigger_depth() > 1 THEN
+        RETURN NULL;
+    END IF;
+    IF to_regclass('pg_temp.product_dirty_parents') IS NULL THEN
+        CREATE TEMP TABLE product_dirty_parents (id bigint PRIMARY KEY) ON COMMIT DELETE ROWS;
+    END IF;
+    INSERT INTO product_dirty_parents (id)
+    SELECT parent_id FROM (VALUES (old.parent_id), (new.parent_id)) AS p(parent_id)
+    WHERE parent_id IS NOT NULL
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_product_flush_dirty_parents () RETURNS TRIGGER
+AS $$
+DECLARE
+    parent_ids bigint[];
+BEGIN
+    IF pg_trigger_depth() > 1 OR to_regclass('pg_temp.product_dirty_parents') IS NULL THEN
+        RETURN NULL;
+    END IF;
+    WITH dirty AS (DELETE FROM product_dirty_parents RETURNING id)
+    SELECT coalesce(array_agg(id), '{}') INTO parent_ids FROM dirty;
+    PERFORM parents_recalculate_children(parent_ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DIRTY_PARENTS_FUNCTIONS_REV_SQL = """
+DROP FUNCTION IF EXISTS tgf_product_record_dirty_parents ();
+DROP FUNCTION IF EXISTS tgf_product_flush_dirty_parents ();
+"""
+
+UPDATE_TRIGGERS_SQL = """
+DROP TRIGGER after_update_recalculate_children ON orders_product;
+
+CREATE TRIGGER after_update_record_dirty_parents
+AFTER UPDATE ON orders_product
+FOR EACH ROW
+WHEN ((old.parent_id IS DISTINCT FROM new.parent_id) OR (old.vendor_id IS DISTINCT FROM new.vendor_id))
+EXECUTE FUNCTION tgf_product_record_dirty_parents();
+
+CREATE TRIGGER after_update_flush_dirty_parents
+AFTER UPDATE ON orders_product
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_product_flush_dirty_parents();
+"""
+
+UPDATE_TRIGGERS_REV_SQL = """
+DROP TRIGGER after_update_record_dirty_parents ON orders_product;
+DROP TRIGGER after_update_flush_dirty_parents ON orders_product;
+
+CREATE TRIGGER after_update_recalculate_children
+AFTER UPDATE ON orders_product
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_parents_recalculate_children_on_update();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0102_procedure_fetch_window"),
+    ]
+
+    operations = [
+        migrations.RunSQL(DIRTY_PARENTS_FUNCTIONS_SQL, DIRTY_PARENTS_FUNCTIONS_REV_SQL),
+        migrations.RunSQL(UPDATE_TRIGGERS_SQL, UPDATE_TRIGGERS_REV_SQL),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# The update trigger from 0101 captured transition tables of every office product update,
+# including writes which don't move the product between price age days (prices, inventory flags,
+# refreshes of prices already updated today), and upserted the same (office, vendor, day) rows.
+# A row trigger filtered by WHEN collects deltas of rows which moved in a session temp table,
+# and a statement trigger without transition tables applies them once per statement.
+DELTA_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION tgf_price_age_day_record_update () RETURNS TRIGGER
+AS $$
+BEGIN
+    IF to_regclass('pg_temp.price_age_day_deltas') IS NULL THEN
+        CREATE TEMP TABLE price_age_day_deltas (
+            office_id bigint,
+            vendor_id bigint,
+            day date,
+            count integer,
+            PRIMARY KEY (office_id, vendor_id, day)
+        ) ON COMMIT DELETE ROWS;
+    END IF;
+    INSERT INTO price_age_day_deltas (office_id, vendor_id, day, count)
+    SELECT office_id, vendor_id, day, delta
+    FROM (
+        VALUES (old.office_id, old.vendor_id, price_age_day_of(old.last_price_updated), -1),
+               (new.office_id, new.vendor_id, price_age_day_of(new.last_price_updated), 1)
+    ) AS d(office_id, vendor_id, day, delta)
+    WHERE vendor_id IS NOT NULL
+    ON CONFLICT (office_id, vendor_id, day) DO UPDATE SET count = price_age_day_deltas.count + excluded.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tgf_price_age_day_flush_update () RETURNS TRIGGER
+AS $$
+BEGIN
+    IF to_regclass('pg_temp.price_age_day_deltas') IS NULL THEN
+        RETURN NULL;
+    END IF;
+    WITH deltas AS (DELETE FROM price_age_day_deltas RETURNING office_id, vendor_id, day, count)
+    INSERT INTO price_age_day (office_id, vendor_id, day, count)
+    SELECT office_id, vendor_id, day, count
+    FROM deltas
+    WHERE count != 0
+    ORDER BY 1, 2, 3
+    ON CONFLICT (office_id, vendor_id, day) DO UPDATE SET count = price_age_day.count + excluded.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DELTA_FUNCTIONS_REV_SQL = """
+DROP FUNCTION IF EXISTS tgf_price_age_day_record_update ();
+DROP FUNCTION IF EXISTS tgf_price_age_day_flush_update ();
+"""
+
+UPDATE_TRIGGERS_SQL = """
+DROP TRIGGER after_update_price_age_day ON orders_officeproduct;
+
+CREATE TRIGGER after_update_record_price_age_day
+AFTER UPDATE ON orders_officeproduct
+FOR EACH ROW
+WHEN ((old.office_id IS DISTINCT FROM new.office_id)
+      OR (old.vendor_id IS DISTINCT FROM new.vendor_id)
+      OR (price_age_day_of(old.last_price_updated) IS DISTINCT FROM price_age_day_of(new.last_price_updated)))
+EXECUTE FUNCTION tgf_price_age_day_record_update();
+
+CREATE TRIGGER after_update_flush_price_age_day
+AFTER UPDATE ON orders_officeproduct
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_price_age_day_flush_update();
+"""
+
+UPDATE_TRIGGERS_REV_SQL = """
+DROP TRIGGER after_update_record_price_age_day ON orders_officeproduct;
+DROP TRIGGER after_update_flush_price_age_day ON orders_officeproduct;
+
+CREATE TRIGGER after_update_price_age_day
+AFTER UPDATE ON orders_officeproduct
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_price_age_day_on_update();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0103_dirty_parents_recalculate_children"),
+    ]
+
+    operations = [
+        migrations.RunSQL(DELTA_FUNCTIONS_SQL, DELTA_FUNCTIONS_REV_SQL),
+        migrations.RunSQL(UPDATE_TRIGGERS_SQL, UPDATE_TRIGGERS_REV_SQL),
+    ]
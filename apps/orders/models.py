@@ -130,20 +130,24 @@ class Product(TimeStampedModel):
 
     @property
     def recent_price(self):
+        return self.get_recent_price(self.vendor.slug, self.price, self.last_price_updated)
+
+    @staticmethod
+    def get_recent_price(vendor_slug: str, price, last_price_updated):
         # TODO: let's get rid of this code in favor of either cleaning up, updating
         #       more frequently or returning `oudated` flag
-        if self.vendor.slug in NON_FORMULA_VENDORS:
-            if self.vendor.slug == "dental_city" and self.last_price_updated:
-                ages_in_days = (timezone.localtime() - self.last_price_updated).days
+        if vendor_slug in NON_FORMULA_VENDORS:
+            if vendor_slug == "dental_city" and last_price_updated:
+                ages_in_days = (timezone.localtime() - last_price_updated).days
                 life_span_in_days = (
                     settings.NET32_PRODUCT_PRICE_UPDATE_CYCLE
-                    if self.vendor.slug == "net_32"
+                    if vendor_slug == "net_32"
                     else settings.PRODUCT_PRICE_UPDATE_CYCLE
                 )
                 if ages_in_days < life_span_in_days:
-                    return self.price
+                    return price
             else:
-                return self.price
+                return price
 
     def to_dict(self, include_images=True) -> ProductDict:
         result = {
@@ -194,10 +198,13 @@ class Product(TimeStampedModel):
 
 
 class ProductWords(models.Model):
-    product = models.OneToOneField(Product, on_delete=models.DO_NOTHING, related_name="words")
+    """Search words of parent products, maintained from product_words_queue by update_product_words task"""
+
+    product = models.OneToOneField(Product, on_delete=models.DO_NOTHING, primary_key=True, related_name="words")
     words = models.TextField()
     numbers = ArrayField(models.TextField())
     names = ArrayField(models.TextField())
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         managed = False
@@ -603,6 +610,16 @@ class Procedure(models.Model):
         ordering = ["start_date"]
 
 
+class ProcedureFetchWindow(TimeStampedModel):
+    """Weeks of procedures loaded from Open Dental after they were over, which are never fetched again"""
+
+    office = models.ForeignKey(Office, on_delete=models.CASCADE, related_name="procedure_fetch_windows")
+    start_date = models.DateField()
+
+    class Meta:
+        unique_together = ["office", "start_date"]
+
+
 class PriceAge(models.Model):
     AGE_GROUP_CHOICES = ((1, "<1d"), (2, "<3d"), (3, "<7d"), (4, "<15d"), (5, "<30d"), (6, ">30d"))
 
@@ -615,3 +632,20 @@ class PriceAge(models.Model):
     class Meta:
         managed = False
         db_table = "price_age"
+
+
+class PriceAgeDay(models.Model):
+    """
+    Number of office products by the day their price was updated, maintained by triggers on office products.
+    Prices updated more than 30 days ago and products without price update date are counted under 1970-01-01
+    """
+
+    # triggers may write counts of offices being deleted, rows of deleted offices are removed by shift_price_age
+    office = models.ForeignKey(Office, on_delete=models.DO_NOTHING, db_constraint=False)
+    vendor = models.ForeignKey(Vendor, on_delete=models.DO_NOTHING, db_constraint=False)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "price_age_day"
+        unique_together = ["office", "vendor", "day"]
@@ -0,0 +1,37 @@
+"""
+Price age statistics.
+
+Triggers on office products keep price_age_day counts by the day prices were updated,
+the price_age view groups them into age buckets on read.
+Counts of days older than 30 days are merged into the 1970-01-01 row by shift_price_age,
+so the table stays at most 32 rows per office vendor.
+"""
+
+from django.db import connection, transaction
+
+SHIFT_SQL = """
+WITH aged AS (
+    DELETE FROM price_age_day
+    WHERE day < current_date - 30 AND day != DATE '1970-01-01'
+    RETURNING office_id, vendor_id, count
+)
+INSERT INTO price_age_day (office_id, vendor_id, day, count)
+SELECT office_id, vendor_id, DATE '1970-01-01', sum(count)
+FROM aged
+GROUP BY 1, 2
+ORDER BY 1, 2
+ON CONFLICT (office_id, vendor_id, day) DO UPDATE SET count = price_age_day.count + excluded.count
+"""
+
+CLEANUP_SQL = """
+DELETE FROM price_age_day pad
+WHERE pad.count = 0
+   OR NOT EXISTS (SELECT 1 FROM accounts_office ao WHERE ao.id = pad.office_id)
+   OR NOT EXISTS (SELECT 1 FROM accounts_vendor av WHERE av.id = pad.vendor_id)
+"""
+
+
+def shift_price_age():
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SHIFT_SQL)
+        cursor.execute(CLEANUP_SQL)
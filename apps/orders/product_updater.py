@@ -1,10 +1,11 @@
 import logging
 from collections import namedtuple
-from typing import List, Union
+from typing import Dict, Iterable, List, Optional, Union
 
 from aiohttp import ClientSession
-from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
@@ -52,6 +53,7 @@ VendorAPIClientMapping = {
     },
 }
 BATCH_SIZE = 5000
+PRODUCT_STATUS_CACHE_TIMEOUT = 6 * 60 * 60
 
 
 async def create_vendor_api_client(vendor_slug: str, session: ClientSession) -> any:
@@ -66,20 +68,38 @@ async def create_vendor_api_client(vendor_slug: str, session: ClientSession) ->
     return client
 
 
-async def get_product_status_async(vendor_slug, mp_id):
-    async with ClientSession() as session:
-        client = await create_vendor_api_client(vendor_slug, session)
-        product_status = await client.get_product_status(mp_id=mp_id)
-        # await client.close_session()  # Ensure closure of the session
-        return product_status
+def product_status_cache_key(vendor_slug: str, product_identifier: str) -> str:
+    return f"product_status:{vendor_slug}:{product_identifier}"
+
+
+async def resolve_product_statuses(client: Net32APIClient, vendor_slug: str, mp_ids: Iterable[str]) -> Dict[str, str]:
+    """Resolve vendor statuses of products in bulk, reusing recently resolved ones from cache"""
+    keys = {product_status_cache_key(vendor_slug, mp_id): mp_id for mp_id in set(mp_ids)}
+    cached = await cache.aget_many(keys.keys())
+    statuses = {keys[key]: status for key, status in cached.items()}
+    missing = [mp_id for key, mp_id in keys.items() if key not in cached]
+    if missing:
+        fetched = await client.get_products_statuses(missing)
+        await cache.aset_many(
+            {product_status_cache_key(vendor_slug, mp_id): status for mp_id, status in fetched.items()},
+            PRODUCT_STATUS_CACHE_TIMEOUT,
+        )
+        statuses.update(fetched)
+    logger.info("Resolved %s product statuses, %s from cache", len(statuses), len(cached))
+    return statuses
 
 
 @sync_to_async
-def update_products(vendor: SupportedVendor, products: Union[List[DentalCityProduct], List[Net32Product]]):
+def update_products(
+    vendor: SupportedVendor,
+    products: Union[List[DentalCityProduct], List[Net32Product]],
+    product_statuses: Optional[Dict[str, str]] = None,
+):
     """Update the product price in db with data we get from vendor api
-    - Net32
+    - Net32: product statuses are resolved beforehand by `resolve_product_statuses`
     - Dental City: In addition to product price, we update manufacturer promotion
     """
+    product_statuses = product_statuses or {}
     products_by_identifier = {product.product_identifier: product for product in products}
     update_time = timezone.localtime()
     office_product_instances = []
@@ -89,83 +109,73 @@ def update_products(vendor: SupportedVendor, products: Union[List[DentalCityProd
     filters = Q(vendor__slug=vendor.value) & Q(
         **{f"{product_identifier_name_in_table}__in": products_by_identifier.keys()}
     )
-    product_instances = Product.objects.filter(filters)
-    product_instance_ids = Product.objects.filter(filters).values_list("id", flat=True)
-    office_product_instances = OfficeProduct.objects.filter(product_id__in=product_instance_ids).select_related(
-        "product"
+    product_instances = list(Product.objects.filter(filters))
+    office_product_instances = list(
+        OfficeProduct.objects.filter(product_id__in=[product.id for product in product_instances]).select_related(
+            "product"
+        )
     )
 
     manufacturer_promotion_products = []
     mismatch_manufacturer_numbers = []
     no_comparison_products = []
+    for product_instance in product_instances:
+        # update the product price
+        product_identifier_in_table = getattr(product_instance, product_identifier_name_in_table)
+        vendor_product = products_by_identifier[product_identifier_in_table]
+        product_instance.price = vendor_product.price
+        product_instance.last_price_updated = update_time
+        product_instance.updated_at = update_time
+        if vendor.value == "net_32" and product_identifier_in_table in product_statuses:
+            product_instance.product_vendor_status = product_statuses[product_identifier_in_table]
+        if vendor.value == "dcdental":
+            product_instance.product_vendor_status = "Active" if vendor_product.quantity >= 1 else "Unavailable"
+
+        if vendor.value == "crazy_dental":
+            print("crazy_dental case ==============", vendor_product)
+            product_instance.product_vendor_status = "Active" if vendor_product.quantity >= 1 else "Discontinued"
+
+        product_description = getattr(vendor_product, "product_desc", None)
+        if product_description:
+            product_instance.vendor_description = product_description
+
+        # In case of dental city and DC Dental, we update manufacturer promotion
+        manufacturer_special = getattr(vendor_product, "manufacturer_special", None)
+        if manufacturer_special:
+            manufacturer_number = getattr(vendor_product, "manufacturer_part_number", None)
+            if manufacturer_number and manufacturer_number.replace("-", "") != product_instance.manufacturer_number:
+                mismatch_manufacturer_numbers.append(vendor_product)
+                continue
+
+            if product_instance.parent_id is None:
+                no_comparison_products.append(vendor_product)
+                continue
+
+            # Avoid loading parent from db, simulate product with id field.
+            manufacturer_promotion_product = Product(id=product_instance.parent_id)
+            manufacturer_promotion_product.promotion_description = manufacturer_special
+            manufacturer_promotion_product.is_special_offer = True
+            manufacturer_promotion_product.updated_at = update_time
+            manufacturer_promotion_products.append(manufacturer_promotion_product)
+
+    for office_product_instance in office_product_instances:
+        logger.info(f"Office Product Updated => {office_product_instance.id}")
+        product_identifier_in_table = getattr(office_product_instance.product, product_identifier_name_in_table)
+        vendor_product = products_by_identifier[product_identifier_in_table]
+        office_product_instance.price = vendor_product.price
+        office_product_instance.last_price_updated = update_time
+        office_product_instance.updated_at = update_time
+        if vendor.value == "net_32" and product_identifier_in_table in product_statuses:
+            office_product_instance.product_vendor_status = product_statuses[product_identifier_in_table]
+        if vendor.value == "dcdental":
+            office_product_instance.product_vendor_status = "Active" if vendor_product.quantity >= 1 else "Unavailable"
+
+        if vendor.value == "crazy_dental":
+            print("crazy_dental case 2 _______ ==============", vendor_product)
+            office_product_instance.product_vendor_status = (
+                "Active" if vendor_product.quantity >= 1 else "Discontinued"
+            )
     with transaction.atomic():
-        for product_instance in product_instances:
-            # update the product price
-            product_identifier_in_table = getattr(product_instance, product_identifier_name_in_table)
-            vendor_product = products_by_identifier[product_identifier_in_table]
-            if vendor.value == "net_32":
-                product_status = async_to_sync(get_product_status_async)(
-                    vendor_slug=vendor.value, mp_id=product_identifier_in_table
-                )
-            product_instance.price = vendor_product.price
-            product_instance.last_price_updated = update_time
-            product_instance.updated_at = update_time
-            if vendor.value == "net_32":
-                product_instance.product_vendor_status = product_status
-            if vendor.value == "dcdental":
-                product_instance.product_vendor_status = "Active" if vendor_product.quantity >= 1 else "Unavailable"
-
-            if vendor.value == "crazy_dental":
-                print("crazy_dental case ==============", vendor_product)
-                product_instance.product_vendor_status = "Active" if vendor_product.quantity >= 1 else "Discontinued"
-
-            product_description = getattr(vendor_product, "product_desc", None)
-            if product_description:
-                product_instance.vendor_description = product_description
-
-            # In case of dental city and DC Dental, we update manufacturer promotion
-            manufacturer_special = getattr(vendor_product, "manufacturer_special", None)
-            if manufacturer_special:
-                manufacturer_number = getattr(vendor_product, "manufacturer_part_number", None)
-                if (
-                    manufacturer_number
-                    and manufacturer_number.replace("-", "") != product_instance.manufacturer_number
-                ):
-                    mismatch_manufacturer_numbers.append(vendor_product)
-                    continue
-
-                if product_instance.parent_id is None:
-                    no_comparison_products.append(vendor_product)
-                    continue
-
-                # Avoid loading parent from db, simulate product with id field.
-                manufacturer_promotion_product = Product(id=product_instance.parent_id)
-                manufacturer_promotion_product.promotion_description = manufacturer_special
-                manufacturer_promotion_product.is_special_offer = True
-                manufacturer_promotion_product.updated_at = update_time
-                manufacturer_promotion_products.append(manufacturer_promotion_product)
-
-        for office_product_instance in office_product_instances:
-            logger.info(f"Office Product Updated => {office_product_instance.id}")
-            product_identifier_in_table = getattr(office_product_instance.product, product_identifier_name_in_table)
-            vendor_product = products_by_identifier[product_identifier_in_table]
-            if vendor.value == "net_32":
-                product_status = async_to_sync(get_product_status_async)(
-                    vendor_slug=vendor.value, mp_id=product_identifier_in_table
-                )
-            office_product_instance.price = vendor_product.price
-            office_product_instance.last_price_updated = update_time
-            office_product_instance.updated_at = update_time
-            if vendor.value == "net_32":
-                office_product_instance.product_vendor_status = product_status
-            if vendor.value == "dcdental":
-                office_product_instance.product_vendor_status = (
-                    "Active" if vendor_product.quantity >= 1 else "Unavailable"
-                )
-
-            if vendor.value == "crazy_dental":
-                print("crazy_dental case 2 _______ ==============", vendor_product)
-                product_instance.product_vendor_status = "Active" if vendor_product.quantity >= 1 else "Discontinued"
         Product.objects.bulk_update(
             manufacturer_promotion_products, fields=("promotion_description", "is_special_offer", "updated_at")
         )
@@ -184,10 +194,26 @@ async def update_vendor_products_by_api(vendor_slug: str) -> None:
     async with ClientSession() as session:
         vendor = SupportedVendor(vendor_slug)
         client = await create_vendor_api_client(vendor_slug, session)
-        products_from_api = await client.get_products()
-        products_len = len(products_from_api)
-
-        print("products_len=", products_len)
-        for i in range(0, products_len, BATCH_SIZE):
-            products_chunk = products_from_api[i : i + BATCH_SIZE]
-            await update_products(vendor, products_chunk)
+        products_len = 0
+        if hasattr(client, "iter_products"):
+            # pages are fetched ahead while the previous page is written
+            async for page in client.iter_products():
+                await update_products(vendor, page)
+                products_len += len(page)
+        else:
+            products_from_api = await client.get_products()
+            products_len = len(products_from_api)
+            for i in range(0, products_len, BATCH_SIZE):
+                products_chunk = products_from_api[i : i + BATCH_SIZE]
+                product_statuses = None
+                if vendor == SupportedVendor.Net32:
+                    mp_ids = [
+                        product_id
+                        async for product_id in Product.objects.filter(
+                            vendor__slug=vendor_slug,
+                            product_id__in={product.product_identifier for product in products_chunk},
+                        ).values_list("product_id", flat=True)
+                    ]
+                    product_statuses = await resolve_product_statuses(client, vendor_slug, mp_ids)
+                await update_products(vendor, products_chunk, product_statuses)
+        logger.info("Updated %s products of %s from api", products_len, vendor_slug)
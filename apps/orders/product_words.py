@@ -0,0 +1,98 @@
+"""
+Maintenance of the product_words search table.
+
+Triggers on orders_product queue parent ids whose children were inserted, deleted, regrouped or renamed
+into product_words_queue, and the queue is drained here in small batches,
+each batch recalculated by the recalculate_product_words database function in its own transaction.
+"""
+
+import logging
+import time
+from typing import List, NamedTuple, Optional
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_WORDS_BATCH_SIZE = 500
+
+POP_QUEUE_SQL = """
+DELETE FROM product_words_queue
+WHERE product_id IN (
+    SELECT product_id FROM product_words_queue ORDER BY queued_at LIMIT %s FOR UPDATE SKIP LOCKED
+)
+RETURNING product_id
+"""
+
+LAG_SQL = """
+SELECT count(*), extract(epoch FROM now() - min(queued_at)) FROM product_words_queue
+"""
+
+PARENT_IDS_SQL = """
+SELECT DISTINCT parent_id FROM orders_product
+WHERE parent_id > %s
+ORDER BY parent_id
+LIMIT %s
+"""
+
+DELETE_ORPHANS_SQL = """
+DELETE FROM product_words pw
+WHERE NOT EXISTS (SELECT 1 FROM orders_product op WHERE op.parent_id = pw.product_id AND op.vendor_id != 5)
+"""
+
+
+class ProductWordsLag(NamedTuple):
+    queued: int
+    seconds: float
+
+    def __str__(self):
+        return f"{self.queued} parents queued, oldest {self.seconds:.0f}s ago"
+
+
+def recalculate_product_words(parent_ids: List[int]):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT recalculate_product_words(%s::bigint[])", [parent_ids])
+
+
+def get_product_words_lag() -> ProductWordsLag:
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        queued, seconds = cursor.fetchone()
+    return ProductWordsLag(queued=queued, seconds=float(seconds or 0))
+
+
+def process_product_words_queue(batch_size: int = PRODUCT_WORDS_BATCH_SIZE, time_limit: Optional[float] = None) -> int:
+    """Recalculate words of queued parents batch by batch, returning the number of recalculated parents"""
+    started = time.monotonic()
+    processed = 0
+    while time_limit is None or time.monotonic() - started < time_limit:
+        # popped ids go back to the queue if the recalculation fails
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(POP_QUEUE_SQL, [batch_size])
+            parent_ids = [row[0] for row in cursor.fetchall()]
+            if not parent_ids:
+                break
+            recalculate_product_words(parent_ids)
+        processed += len(parent_ids)
+    return processed
+
+
+def rebuild_product_words(batch_size: int = PRODUCT_WORDS_BATCH_SIZE) -> int:
+    """Recalculate words of every parent, readers see old words until their batch is committed"""
+    last_parent_id = 0
+    processed = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(PARENT_IDS_SQL, [last_parent_id, batch_size])
+            parent_ids = [row[0] for row in cursor.fetchall()]
+        if not parent_ids:
+            break
+        with transaction.atomic():
+            recalculate_product_words(parent_ids)
+        processed += len(parent_ids)
+        last_parent_id = parent_ids[-1]
+        logger.info("Rebuilt words of %s parents", processed)
+
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_ORPHANS_SQL)
+    return processed
@@ -1,6 +1,6 @@
 import datetime
 import logging
-from typing import List
+from typing import Dict, List, Set
 
 from aiohttp import ClientSession
 from django.db.models import Q
@@ -20,56 +20,60 @@ async def update_net32_products():
     Fetch Full products from Net32 using API
     - Enable or disable products in the table
     - Update prices if not updated since yesterday.
+
+    The feed is streamed and processed batch by batch, only product ids are kept
+    to find out which products disappeared from the feed.
     """
+    net_32_vendor_id = (await Vendor.objects.aget(slug="net_32")).id
+    availability = await get_products_availability(net_32_vendor_id)
+    products_to_be_disabled = {product_id for product_id, available in availability.items() if available}
+    total = 0
     async with ClientSession() as session:
         client = Net32APIClient(session)
-        logging.info("Getting full product list")
-        products_from_api: List[Net32ProductInfo] = await client.get_full_products()
+        logging.info("Streaming full product list")
+        async for products_from_api in client.iter_full_products(batch_size=BATCH_SIZE):
+            total += len(products_from_api)
+            products_to_be_disabled.difference_update(product.mp_id for product in products_from_api)
+            await enable_or_create_products(net_32_vendor_id, availability, products_from_api)
+            await update_prices(products_from_api)
 
-        await enable_or_disable_products(products_from_api)
-        await update_prices(products_from_api)
+    logging.info("Processed %s products from feed, to disable = %s", total, len(products_to_be_disabled))
+    await disable_products(net_32_vendor_id, products_to_be_disabled)
 
 
-async def enable_or_disable_products(products_from_api: List[Net32ProductInfo]):
-    net_32_vendor_id = (await Vendor.objects.aget(slug="net_32")).id
-    all_products = [
-        o
-        async for o in Product.objects.filter(vendor_id=net_32_vendor_id).values_list(
+async def get_products_availability(net_32_vendor_id: int) -> Dict[str, bool]:
+    return {
+        product_id: available
+        async for product_id, available in Product.objects.filter(vendor_id=net_32_vendor_id).values_list(
             "product_id", "is_available_on_vendor"
         )
-    ]
-    available_product_ids = {product_id for product_id, available in all_products if available}
-    unavailable_product_ids = {product_id for product_id, available in all_products if not available}
-    all_product_ids = {product_id for product_id, _ in all_products}
+    }
 
-    available_product_ids_from_api = set(product.mp_id for product in products_from_api)
-
-    product_ids_to_be_disabled = available_product_ids - available_product_ids_from_api
-    product_ids_to_be_enabled = unavailable_product_ids & available_product_ids_from_api
-    product_ids_to_be_created = available_product_ids_from_api - all_product_ids
-
-    logging.info(
-        "To disable = %s, to enable = %s, to_create = %s",
-        len(product_ids_to_be_disabled),
-        len(product_ids_to_be_enabled),
-        len(product_ids_to_be_created),
-    )
 
-    for batch in batched(product_ids_to_be_disabled, BATCH_SIZE):
+async def disable_products(net_32_vendor_id: int, product_ids: Set[str]):
+    for batch in batched(product_ids, BATCH_SIZE):
         logging.debug("Disabling %s", batch)
-        await Product.objects.filter(product_id__in=batch).aupdate(
+        await Product.objects.filter(vendor_id=net_32_vendor_id, product_id__in=batch).aupdate(
             is_available_on_vendor=False, updated_at=timezone.localtime()
         )
 
-    for batch in batched(product_ids_to_be_enabled, BATCH_SIZE):
-        logging.debug("Enabling %s", batch)
-        await Product.objects.filter(product_id__in=batch).aupdate(
+
+async def enable_or_create_products(
+    net_32_vendor_id: int, availability: Dict[str, bool], products_from_api: List[Net32ProductInfo]
+):
+    """Enable unavailable products and create new ones found in a batch of the feed"""
+    product_ids_to_be_enabled = [
+        product.mp_id for product in products_from_api if availability.get(product.mp_id) is False
+    ]
+    if product_ids_to_be_enabled:
+        logging.debug("Enabling %s", product_ids_to_be_enabled)
+        await Product.objects.filter(vendor_id=net_32_vendor_id, product_id__in=product_ids_to_be_enabled).aupdate(
             is_available_on_vendor=True, updated_at=timezone.localtime()
         )
 
     updated_at = timezone.localtime()
-    products_to_be_created = [
-        Product(
+    products_to_be_created = {
+        product.mp_id: Product(
             vendor_id=net_32_vendor_id,
             product_id=product.mp_id,
             manufacturer_number=product.manufacturer_number,
@@ -81,22 +85,27 @@ async def enable_or_disable_products(products_from_api: List[Net32ProductInfo]):
             updated_at=updated_at,
         )
         for product in products_from_api
-        if product.mp_id in product_ids_to_be_created
-    ]
-
-    await Product.objects.abulk_create(products_to_be_created, batch_size=BATCH_SIZE)
+        if product.mp_id not in availability
+    }
+    await Product.objects.abulk_create(products_to_be_created.values(), batch_size=BATCH_SIZE)
+    for product_id in product_ids_to_be_enabled:
+        availability[product_id] = True
+    for product_id in products_to_be_created:
+        availability[product_id] = True
 
 
 async def update_prices(products_from_api: List[Net32ProductInfo]):
     product_prices = {p.mp_id: p.price for p in products_from_api}
     updated_at = timezone.localtime()
     datetime_from = updated_at - datetime.timedelta(days=1)
-    product_instances = Product.net32.available_products().filter(
-        Q(last_price_updated__lt=datetime_from) | Q(last_price_updated=None)
-    )
-    async for product_instance in product_instances:
-        if product_instance.product_id not in product_prices:
-            continue
+    product_instances = [
+        product_instance
+        async for product_instance in Product.net32.available_products().filter(
+            Q(last_price_updated__lt=datetime_from) | Q(last_price_updated=None),
+            product_id__in=product_prices.keys(),
+        )
+    ]
+    for product_instance in product_instances:
         product_instance.price = product_prices[product_instance.product_id]
         product_instance.last_price_updated = updated_at
         product_instance.updated_at = updated_at
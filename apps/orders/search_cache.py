@@ -0,0 +1,82 @@
+"""
+Cache of product search results per office.
+
+Entries hold ordered parent product ids and available vendor slugs of a search,
+so repeating the search (e.g. the next page) costs only an id lookup.
+Entries are invalidated by bumping a version which is part of the key:
+per office when its vendors or inventory change and globally when all product words are rebuilt.
+Incrementally recalculated product words show up in cached results once they expire.
+Versions live in the shared cache (see CACHES), so invalidations made by celery workers and commands
+reach the web workers.
+"""
+
+import hashlib
+import json
+import time
+from typing import List, NamedTuple, Optional
+
+from django.core.cache import cache
+
+SEARCH_CACHE_TIMEOUT = 10 * 60
+GLOBAL_VERSION_KEY = "product_search:version"
+
+
+class SearchResult(NamedTuple):
+    product_ids: List[int]
+    available_vendors: List[str]
+
+
+def _office_version_key(office_id) -> str:
+    return f"product_search:office:{office_id}:version"
+
+
+def _get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # start from current time, so versions aren't reused after the key is evicted
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def search_cache_key(
+    office_id, query: str, vendor_ids: List[int], selected_products: List, price_from, price_to
+) -> str:
+    normalized = json.dumps(
+        [
+            " ".join(query.lower().split()),
+            sorted(vendor_ids),
+            sorted(map(str, selected_products)),
+            str(price_from),
+            str(price_to),
+        ]
+    )
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    return (
+        f"product_search:{_get_version(GLOBAL_VERSION_KEY)}:{office_id}:"
+        f"{_get_version(_office_version_key(office_id))}:{digest}"
+    )
+
+
+def get_search_result(key: str) -> Optional[SearchResult]:
+    result = cache.get(key)
+    return SearchResult(*result) if result is not None else None
+
+
+def set_search_result(key: str, result: SearchResult):
+    cache.set(key, tuple(result), SEARCH_CACHE_TIMEOUT)
+
+
+def invalidate_office_search_results(office_id):
+    _bump_version(_office_version_key(office_id))
+
+
+def invalidate_search_results():
+    _bump_version(GLOBAL_VERSION_KEY)
@@ -9,6 +9,7 @@ from apps.accounts.helper import OfficeBudgetHelper
 from apps.accounts.serializers import VendorLiteSerializer
 from apps.common.choices import OrderStatus
 from apps.common.serializers import Base64ImageField
+from apps.orders import search_cache
 from apps.orders.helpers import OfficeProductHelper, OrderHelper
 
 from ..accounts.models import BasisType, OpenDentalKey
@@ -697,6 +698,7 @@ class OfficeProductSerializer(serializers.ModelSerializer):
                 for office_product in office_products:
                     office_product.is_favorite = validated_data["is_inventory"]
                 m.OfficeProduct.objects.bulk_update(office_products, ["is_inventory"])
+                search_cache.invalidate_office_search_results(instance.office_id)
 
         return instance
 
@@ -1,9 +1,5 @@
-import copy
 import datetime
 import decimal
-import itertools
-from collections import defaultdict
-from itertools import chain
 from typing import List, Optional, Union
 
 from django.contrib.postgres.search import SearchQuery, SearchRank
@@ -17,6 +13,7 @@ from apps.common.utils import (
     find_words_from_string,
 )
 from apps.orders.models import Product, ProductCategory, ProductImage, Vendor
+from apps.orders.services.similarity import group_similar_products
 
 ProductID = Union[int, str]
 ProductIDs = List[ProductID]
@@ -96,19 +93,16 @@ class ProductService:
             if len(vendor_slugs) <= 1:
                 return []
 
-        vendor_products = []
+        vendors_products = {}
         for vendor_slug in vendor_slugs:
-            vendor_products_names = products.filter(vendor__slug=vendor_slug).values("id", "vendor", "name")
+            vendor_products = products.filter(vendor__slug=vendor_slug)
             if product_category:
-                vendor_products_names = products.filter(category=product_category)
+                vendor_products = vendor_products.filter(category=product_category)
 
-            if vendor_products_names:
-                vendor_products.append(vendor_products_names)
+            for vendor_product in vendor_products.values("id", "vendor", "name"):
+                vendors_products[vendor_product["id"]] = vendor_product
 
-        if len(vendor_products) <= 1:
-            return []
-
-        similar_product_ids_list = ProductService.group_products_by_name(vendor_products)
+        similar_product_ids_list = ProductService.group_products_by_name(vendors_products)
 
         updated_products = []
         for similar_product_ids in similar_product_ids_list:
@@ -140,103 +134,12 @@ class ProductService:
         bulk_update(Product, updated_products, fields=["parent"])
 
     @staticmethod
-    def group_products_by_name(product_names_list) -> List[ProductIDs]:
-        threshold = 0.65
-        n_similarity = 2
-        vendors_count = len(product_names_list)
-        similar_products_candidates = defaultdict(list)
-
-        # find out all 2-length similar products
-        products_combinations = itertools.combinations(product_names_list, n_similarity)
-        for products_combination in products_combinations:
-            for vendor_products in itertools.product(*products_combination):
-                vendor_product_names = [vendor_product["name"] for vendor_product in vendor_products]
-                similarity = ProductService.get_similarity(*vendor_product_names)
-                if similarity > threshold:
-                    display_text = "; ".join(
-                        [
-                            f'{vendor_product["name"]} from {vendor_product["vendor"]}'
-                            for vendor_product in vendor_products
-                        ]
-                    )
-                    print(f"{similarity:.2f}: {display_text}")
-                    similar_products_candidates[n_similarity].append([f"{similarity:.2f}", *vendor_products])
-
-        # when finding more than 3-length similar products we need to check from candidates pairs
-        n_similarity = 3
-        while n_similarity <= vendors_count:
-            n_threshold = threshold ** (n_similarity - 1)
-            n_1_similarity_products_pairs_length = len(similar_products_candidates[n_similarity - 1])
-            if not n_1_similarity_products_pairs_length:
-                break
-
-            well_matching_pair_ids = set()
-            for i in range(n_1_similarity_products_pairs_length - 1):
-                ith_similar_products_pair = similar_products_candidates[n_similarity - 1][i][1:]
-                ith_similar_product_ids = set([product["id"] for product in ith_similar_products_pair])
-                ith_similar_product_vendors = set([product["vendor"] for product in ith_similar_products_pair])
-                for j in range(i + 1, n_1_similarity_products_pairs_length):
-                    jth_similar_products_pair = similar_products_candidates[n_similarity - 1][j][1:]
-                    jth_similar_product_ids = set([product["id"] for product in jth_similar_products_pair])
-                    jth_similar_product_vendors = set([product["vendor"] for product in jth_similar_products_pair])
-                    if not ith_similar_product_ids.intersection(jth_similar_product_ids):
-                        continue
-
-                    ith_vendor_difference = ith_similar_product_vendors - jth_similar_product_vendors
-                    jth_vendor_difference = jth_similar_product_vendors - ith_similar_product_vendors
-
-                    if ith_vendor_difference == jth_vendor_difference:
-                        continue
-
-                    if tuple(ith_similar_product_ids | jth_similar_product_ids) in well_matching_pair_ids:
-                        continue
-
-                    well_matching_pair_ids.add(tuple(ith_similar_product_ids | jth_similar_product_ids))
-                    similar_products_pair = copy.deepcopy(ith_similar_products_pair)
-                    similar_products_pair.extend(
-                        [
-                            product
-                            for product in jth_similar_products_pair
-                            if product["id"] in jth_similar_product_ids - ith_similar_product_ids
-                        ]
-                    )
-
-                    vendor_product_names = [product["name"] for product in similar_products_pair]
-                    display_text = "; ".join(
-                        [
-                            f'{vendor_product["name"]} from {vendor_product["vendor"]}'
-                            for vendor_product in similar_products_pair
-                        ]
-                    )
-                    similarity = ProductService.get_similarity(*vendor_product_names)
-
-                    if similarity > n_threshold:
-                        print(f"{similarity:.2f}: {display_text}")
-                        similar_products_candidates[n_similarity].append([f"{similarity:.2f}", *similar_products_pair])
-
-            n_similarity += 1
-
-        similar_products_candidates = chain.from_iterable([value for _, value in similar_products_candidates.items()])
-        similar_products_list = ProductService.clean_well_matching_paris(similar_products_candidates)
-        return [[product["id"] for product in similar_products[1:]] for similar_products in similar_products_list]
-
-    @staticmethod
-    def clean_well_matching_paris(well_matching_pairs):
+    def group_products_by_name(products) -> List[ProductIDs]:
         """
-        This will remove partly-duplicated product paris if the well_matching_paris contains
-        [(1, vendorA_productID, vendorB_productID), (0.9, vendorA_productID, vendorB_productID)]
-        the second pair is not needed.
+        Return groups of similar products of different vendors.
+        :param products: product id => {"vendor": ..., "name": ...}
         """
-        cleaned_well_matching_paris = []
-        included_product_ids = set()
-        well_matching_pairs = sorted(well_matching_pairs, key=lambda x: (len(x), x[0]), reverse=True)
-        for well_matching_pair in well_matching_pairs:
-            well_matching_product_pair_ids = set([product["id"] for product in well_matching_pair[1:]])
-            if included_product_ids & well_matching_product_pair_ids:
-                continue
-            included_product_ids |= well_matching_product_pair_ids
-            cleaned_well_matching_paris.append(well_matching_pair)
-        return cleaned_well_matching_paris
+        return group_similar_products(products, threshold=0.65)
 
     @staticmethod
     def get_similarity(*products, key=None):
@@ -0,0 +1,296 @@
+import itertools
+import logging
+import math
+from collections import defaultdict
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+from apps.common.utils import find_numeric_values_from_string, find_words_from_string
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_WORDS = frozenset({"of", "and", "with"})
+WORDS_WEIGHT = 0.4
+NUMBERS_WEIGHT = 0.6
+# upper bound of candidate pairs materialized at once
+PAIR_BATCH_SIZE = 1_000_000
+# postings with fewer pairs are expanded together in one go
+SMALL_POSTING_PAIRS = 10_000
+# upper bound of token comparisons made at once while scoring candidates
+SCORE_BATCH_CELLS = 50_000_000
+
+Tokens = FrozenSet[str]
+
+
+def tokenize(name: str) -> Tuple[Tokens, Tokens]:
+    """Split product name into words and numeric tokens the same way `get_similarity` does"""
+    numbers = frozenset(map(str.lower, find_numeric_values_from_string(name)))
+    words = frozenset(map(str.lower, find_words_from_string(name))) - numbers - EXCLUDED_WORDS
+    return words, numbers
+
+
+def score(matched_words, total_words, matched_numbers, total_numbers) -> np.ndarray:
+    """Vectorized `get_similarity` over arrays of matched and total token counts"""
+    matched_words, total_words, matched_numbers, total_numbers = (
+        np.asarray(value, dtype=np.float64) for value in (matched_words, total_words, matched_numbers, total_numbers)
+    )
+    # same order of operations as `get_similarity`, so scores right at the threshold are compared equally
+    words_ratio = np.divide(matched_words, total_words, out=np.zeros_like(total_words), where=total_words > 0)
+    weighted_words_ratio = np.divide(
+        WORDS_WEIGHT * matched_words, total_words, out=np.zeros_like(total_words), where=total_words > 0
+    )
+    weighted_numbers_ratio = np.divide(
+        NUMBERS_WEIGHT * matched_numbers, total_numbers, out=np.zeros_like(total_numbers), where=total_numbers > 0
+    )
+    return np.where(total_numbers > 0, weighted_words_ratio + weighted_numbers_ratio, words_ratio)
+
+
+def prefix_length(size: int, min_jaccard: float) -> int:
+    """
+    Number of the rarest tokens of a set to index, so that every other set
+    with Jaccard similarity above `min_jaccard` shares at least one of them with it
+    """
+    if min_jaccard <= 0:
+        return size
+    return size - math.ceil(min_jaccard * size - 1e-9) + 1
+
+
+class SimilarityEngine:
+    """
+    Group similar products of different vendors by name.
+
+    Names are tokenized once. Candidate pairs come from an inverted index of the rarest tokens of
+    each product (prefix filtering), so only pairs which can pass the threshold are scored,
+    instead of the full product of vendor catalogs.
+    A pair can score above threshold > 0.4 only if both names have numbers and share some of them,
+    or both have no numbers at all, so numeric tokens and words are indexed separately.
+    """
+
+    def __init__(self, products: Dict[Hashable, dict], threshold: float):
+        self.threshold = threshold
+        self.ids = list(products.keys())
+        vendor_codes = {}
+        self.vendor_codes = [
+            vendor_codes.setdefault(product["vendor"], len(vendor_codes)) for product in products.values()
+        ]
+        self.vendors = np.array(self.vendor_codes, dtype=np.int64)
+        self.vendors_count = len(vendor_codes)
+        tokens = [tokenize(product["name"]) for product in products.values()]
+        self.words = [words for words, _ in tokens]
+        self.numbers = [numbers for _, numbers in tokens]
+        self.words_matrix = self._token_matrix(self.words)
+        self.numbers_matrix = self._token_matrix(self.numbers)
+        self.words_sizes = (self.words_matrix >= 0).sum(axis=1)
+        self.numbers_sizes = (self.numbers_matrix >= 0).sum(axis=1)
+
+    @staticmethod
+    def _token_matrix(token_sets: List[Tokens]) -> np.ndarray:
+        """Token ids of each set, padded with -1 to the same width"""
+        vocabulary = {}
+        width = max(1, max(map(len, token_sets), default=0))
+        matrix = np.full((len(token_sets), width), -1, dtype=np.int32)
+        for row, tokens in enumerate(token_sets):
+            matrix[row, : len(tokens)] = [vocabulary.setdefault(token, len(vocabulary)) for token in tokens]
+        return matrix
+
+    @staticmethod
+    def _matched(matrix: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """Count tokens shared by rows `first` and `second` of token matrix, token ids are unique within a row"""
+        left = matrix[first][:, :, None]
+        right = matrix[second][:, None, :]
+        return ((left == right) & (left >= 0)).sum(axis=(1, 2))
+
+    def postings(self) -> Iterable[np.ndarray]:
+        """Yield sorted product indexes sharing an indexed key"""
+        min_numbers_jaccard = (self.threshold - WORDS_WEIGHT) / NUMBERS_WEIGHT
+        min_words_jaccard = (self.threshold - NUMBERS_WEIGHT) / WORDS_WEIGHT
+        if min_numbers_jaccard <= 0:
+            # low thresholds can be passed by words only, index every token
+            yield from self._postings(
+                {
+                    index: [("w", word) for word in words] + [("n", number) for number in numbers]
+                    for index, (words, numbers) in enumerate(zip(self.words, self.numbers))
+                }
+            )
+            return
+
+        with_numbers = {index: numbers for index, numbers in enumerate(self.numbers) if numbers}
+        numbers_prefixes = self._prefixes(with_numbers, min_numbers_jaccard)
+        if min_words_jaccard > 0:
+            # a pair has to pass both numbers and words bounds, so it shares a (number, word) key of the prefixes
+            words_prefixes = self._prefixes({index: self.words[index] for index in with_numbers}, min_words_jaccard)
+            numbers_prefixes = {
+                index: list(itertools.product(numbers_prefix, words_prefixes[index]))
+                for index, numbers_prefix in numbers_prefixes.items()
+            }
+        yield from self._postings(numbers_prefixes)
+
+        without_numbers = {
+            index: words for index, (words, numbers) in enumerate(zip(self.words, self.numbers)) if not numbers
+        }
+        yield from self._postings(self._prefixes(without_numbers, self.threshold))
+
+    @staticmethod
+    def _prefixes(token_sets: Dict[int, Tokens], min_jaccard: float) -> Dict[int, List[str]]:
+        """Return the rarest tokens of each set, which are enough to find sets with Jaccard above `min_jaccard`"""
+        frequency = defaultdict(int)
+        for tokens in token_sets.values():
+            for token in tokens:
+                frequency[token] += 1
+
+        prefixes = {}
+        for index, tokens in token_sets.items():
+            ordered = sorted(tokens, key=lambda token: (frequency[token], token))
+            prefixes[index] = ordered[: prefix_length(len(ordered), min_jaccard)]
+        return prefixes
+
+    @staticmethod
+    def _postings(keys_by_product: Dict[int, Iterable[Hashable]]) -> Iterable[np.ndarray]:
+        index = defaultdict(list)
+        for product_index, keys in keys_by_product.items():
+            for key in keys:
+                index[key].append(product_index)
+
+        for members in index.values():
+            if len(members) > 1:
+                yield np.array(members, dtype=np.int64)
+
+    def candidate_pairs(self) -> np.ndarray:
+        """Return unique cross-vendor candidate pairs encoded as `first * n + second`, first < second"""
+        keys, pending = [], 0
+        for pair_keys in self._pair_keys():
+            keys.append(pair_keys)
+            pending += len(pair_keys)
+            if pending >= PAIR_BATCH_SIZE:
+                keys, pending = [np.unique(np.concatenate(keys))], 0
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(keys))
+
+    def _pair_keys(self) -> Iterable[np.ndarray]:
+        small, small_pairs = [], 0
+        for members in self.postings():
+            pairs_count = len(members) * (len(members) - 1) // 2
+            if pairs_count > SMALL_POSTING_PAIRS:
+                yield from self._large_posting_pair_keys(members)
+                continue
+            small.append(members)
+            small_pairs += pairs_count
+            if small_pairs >= PAIR_BATCH_SIZE:
+                yield self._small_postings_pair_keys(small)
+                small, small_pairs = [], 0
+        if small:
+            yield self._small_postings_pair_keys(small)
+
+    def _small_postings_pair_keys(self, postings: List[np.ndarray]) -> np.ndarray:
+        """Pairs within many small postings at once, each entry is paired with the following entries of its posting"""
+        sizes = np.fromiter(map(len, postings), dtype=np.int64, count=len(postings))
+        members = np.concatenate(postings)
+        positions = np.arange(len(members))
+        ends = np.repeat(np.cumsum(sizes), sizes)
+        counts = ends - positions - 1
+        first_positions = np.repeat(positions, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        first, second = members[first_positions], members[first_positions + 1 + offsets]
+        return self._encode(first, second)
+
+    def _large_posting_pair_keys(self, members: np.ndarray) -> Iterable[np.ndarray]:
+        member_vendors = self.vendors[members]
+        groups = [members[member_vendors == vendor] for vendor in np.unique(member_vendors)]
+        for first_group, second_group in itertools.combinations(groups, 2):
+            step = max(1, PAIR_BATCH_SIZE // len(second_group))
+            for start in range(0, len(first_group), step):
+                block = first_group[start : start + step]
+                yield self._encode(np.repeat(block, len(second_group)), np.tile(second_group, len(block)))
+
+    def _encode(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        cross_vendor = self.vendors[first] != self.vendors[second]
+        first, second = first[cross_vendor], second[cross_vendor]
+        return np.minimum(first, second) * len(self.ids) + np.maximum(first, second)
+
+    def similar_pairs(self) -> List[Tuple[float, Tuple[int, int]]]:
+        n = len(self.ids)
+        candidates = self.candidate_pairs()
+        logger.info("Scoring %s candidate pairs of %s products", len(candidates), n)
+        width = max(self.words_matrix.shape[1], self.numbers_matrix.shape[1])
+        batch_size = max(1, SCORE_BATCH_CELLS // (width * width))
+        pairs = []
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start : start + batch_size]
+            first, second = batch // n, batch % n
+            matched_words = self._matched(self.words_matrix, first, second)
+            matched_numbers = self._matched(self.numbers_matrix, first, second)
+            scores = score(
+                matched_words,
+                self.words_sizes[first] + self.words_sizes[second] - matched_words,
+                matched_numbers,
+                self.numbers_sizes[first] + self.numbers_sizes[second] - matched_numbers,
+            )
+            for position in np.flatnonzero(scores > self.threshold).tolist():
+                pairs.append((float(scores[position]), (int(first[position]), int(second[position]))))
+        return pairs
+
+    def similarity(self, indexes: Iterable[int]) -> float:
+        """Scalar `score` of a group of products"""
+        words = [self.words[index] for index in indexes]
+        numbers = [self.numbers[index] for index in indexes]
+        matched_words, total_words = len(frozenset.intersection(*words)), len(frozenset.union(*words))
+        matched_numbers, total_numbers = len(frozenset.intersection(*numbers)), len(frozenset.union(*numbers))
+        if not total_words:
+            return NUMBERS_WEIGHT * matched_numbers / total_numbers if total_numbers else 0.0
+        if total_numbers:
+            return WORDS_WEIGHT * matched_words / total_words + NUMBERS_WEIGHT * matched_numbers / total_numbers
+        return matched_words / total_words
+
+    def group(self) -> List[List[Hashable]]:
+        """
+        Return the list of groups of similar product ids, one product per vendor in a group.
+        Groups of n products are built from overlapping groups of n - 1 products.
+        """
+        candidates = {2: self.similar_pairs()}
+        n_similarity = 3
+        while n_similarity <= self.vendors_count and candidates[n_similarity - 1]:
+            n_threshold = self.threshold ** (n_similarity - 1)
+            # groups which differ by one product share all other n - 2 products
+            groups_by_subset = defaultdict(list)
+            for _, members in candidates[n_similarity - 1]:
+                for member in members:
+                    groups_by_subset[frozenset(members).difference((member,))].append(frozenset(members))
+
+            seen = set()
+            candidates[n_similarity] = []
+            for groups in groups_by_subset.values():
+                for first, second in itertools.combinations(groups, 2):
+                    union = first | second
+                    if union in seen:
+                        continue
+                    seen.add(union)
+                    if len({self.vendor_codes[member] for member in union}) != n_similarity:
+                        continue
+                    similarity = self.similarity(union)
+                    if similarity > n_threshold:
+                        candidates[n_similarity].append((similarity, tuple(sorted(union))))
+            n_similarity += 1
+
+        groups, included = [], set()
+        all_candidates = itertools.chain.from_iterable(candidates.values())
+        for _, members in sorted(
+            all_candidates, key=lambda candidate: (len(candidate[1]), candidate[0]), reverse=True
+        ):
+            if included.intersection(members):
+                continue
+            included.update(members)
+            groups.append([self.ids[member] for member in members])
+        logger.info("Found %s groups of similar products", len(groups))
+        return groups
+
+
+def group_similar_products(products: Dict[Hashable, dict], threshold: float) -> List[List[Hashable]]:
+    """
+    Group products of different vendors whose names are similar.
+    `products` maps product id to a dict with `vendor` and `name`.
+    """
+    if not products:
+        return []
+    return SimilarityEngine(products, threshold).group()
@@ -1,8 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from apps.accounts.models import OfficeVendor
-from apps.orders.models import VendorOrder
+from apps.orders import search_cache
+from apps.orders.models import OfficeProduct, VendorOrder
 
 
 @receiver(post_save, sender=VendorOrder)
@@ -13,3 +14,15 @@ def create_vendor_order(sender, instance, created, **kwargs):
             return
         instance.shipping_option = office_vendor.default_shipping_option
         instance.save()
+
+
+@receiver(post_save, sender=OfficeProduct)
+@receiver(post_delete, sender=OfficeProduct)
+def invalidate_office_product_search_results(sender, instance, **kwargs):
+    search_cache.invalidate_office_search_results(instance.office_id)
+
+
+@receiver(post_save, sender=OfficeVendor)
+@receiver(post_delete, sender=OfficeVendor)
+def invalidate_office_vendor_search_results(sender, instance, **kwargs):
+    search_cache.invalidate_office_search_results(instance.office_id)
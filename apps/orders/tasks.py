@@ -2,13 +2,11 @@ import asyncio
 import datetime
 import logging
 import urllib.parse
-from asyncio import Semaphore
 
 # from decimal import Decimal
-from typing import List, Optional
+from typing import List
 
 from aiohttp import ClientSession, ClientTimeout
-from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.mail import send_mail
 from django.db.models import F, Q
@@ -18,10 +16,10 @@ from slugify import slugify
 
 from apps.accounts.models import CompanyMember, OfficeVendor, Subscription, User
 from apps.audit.models import OrderTasks
-from apps.common.choices import OrderStatus
 from apps.common.elk import _make_elk_link
 from apps.common.utils import group_products
 from apps.notifications.models import Notification
+from apps.orders import price_age, product_words, vendor_sync
 from apps.orders.helpers import OrderHelper, ProductHelper
 from apps.orders.models import Keyword as KeyModel
 from apps.orders.models import OfficeCheckoutStatus
@@ -32,10 +30,9 @@ from apps.orders.models import ProductCategory
 from apps.orders.models import ProductImage as ProductImageModel
 from apps.orders.models import VendorOrder as VendorOrderModel
 from apps.orders.models import VendorOrderProduct as VendorOrderProductModel
-from apps.scrapers.errors import VendorAuthenticationFailed
+from apps.scrapers import invoices
 from apps.scrapers.schema import Product as ProductDataClass
 from apps.scrapers.scraper_factory import ScraperFactory
-from apps.scrapers.semaphore import fake_semaphore
 from apps.slack import bot
 from apps.slack.bot import notify
 from config.celery import app
@@ -43,6 +40,9 @@ from promotions import PROMOTION_MAP
 
 logger = logging.getLogger(__name__)
 
+# stays under the one minute schedule with the last batch, so runs don't overlap
+PRODUCT_WORDS_TIME_LIMIT = 45
+
 
 @app.task
 def update_office_cart_status():
@@ -316,87 +316,6 @@ def notify_order_creation(vendor_order_ids, approval_needed):
     )
 
 
-async def _sync_with_vendor(
-    sem: Semaphore,
-    session: ClientSession,
-    office_vendor: OfficeVendor,
-    completed_vendor_order_ids: List[str],
-    from_date: Optional[datetime.date],
-    to_date: Optional[datetime.date],
-):
-    scraper = ScraperFactory.create_scraper(
-        vendor=office_vendor.vendor,
-        session=session,
-        username=office_vendor.username,
-        password=office_vendor.password,
-    )
-
-    if not hasattr(scraper, "get_orders"):
-        return
-
-    if not sem:
-        sem = fake_semaphore
-
-    async with sem:
-        results = await scraper.get_orders(
-            office=office_vendor.office,
-            perform_login=True,
-            from_date=from_date,
-            to_date=to_date,
-            completed_order_ids=completed_vendor_order_ids,
-        )
-
-    return results
-
-
-@sync_to_async
-def get_vendor_orders_id_and_last_processing_order_date(office_vendor):
-    vendor_orders = VendorOrderModel.objects.select_related("vendor", "order__office").filter(
-        order__office=office_vendor.office,
-        vendor=office_vendor.vendor,
-    )
-
-    order_id_field = "vendor_order_reference" if office_vendor.vendor.slug == "henry_schein" else "vendor_order_id"
-    completed_vendor_order_ids = list(
-        vendor_orders.filter(status=OrderStatus.CLOSED).values_list(order_id_field, flat=True)
-    )
-    return (
-        completed_vendor_order_ids,
-        vendor_orders.filter(status=OrderStatus.OPEN).order_by("order_date").first(),
-    )
-
-
-async def _sync_with_vendors(office_vendors):
-    sem = Semaphore(value=2)
-    today = datetime.date.today()
-    tasks = []
-    async with ClientSession(timeout=ClientTimeout(30)) as session:
-        for office_vendor in office_vendors:
-            (
-                completed_vendor_order_ids,
-                last_processing_vendor_order,
-            ) = await get_vendor_orders_id_and_last_processing_order_date(office_vendor)
-            tasks.append(
-                _sync_with_vendor(
-                    sem=sem,
-                    session=session,
-                    office_vendor=office_vendor,
-                    completed_vendor_order_ids=completed_vendor_order_ids,
-                    from_date=last_processing_vendor_order.order_date if last_processing_vendor_order else None,
-                    to_date=today,
-                )
-            )
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        invalid_credentials_office_vendors = [
-            result for result in results if type(result) == VendorAuthenticationFailed
-        ]
-
-    if invalid_credentials_office_vendors:
-        # send email notification
-        pass
-
-
 @app.task
 def sync_with_vendors():
     """
@@ -406,7 +325,8 @@ def sync_with_vendors():
     """
     office_ids = Subscription.actives.select_related("office").values_list("office", flat=True)
     office_vendors = list(OfficeVendor.objects.select_related("office", "vendor").filter(office_id__in=office_ids))
-    asyncio.run(_sync_with_vendors(office_vendors))
+    plans = vendor_sync.get_sync_plans(office_vendors)
+    asyncio.run(vendor_sync.sync_with_vendors(office_vendors, plans, to_date=timezone.localdate()))
 
 
 @app.task
@@ -483,19 +403,38 @@ def perform_real_order(self, vendor_order_ids):
 
 
 @app.task(priority=9)
-def refresh_product_words():
-    from django.db import connection
-
-    with connection.cursor() as cursor:
-        cursor.execute("REFRESH MATERIALIZED VIEW product_words;")
+def update_product_words():
+    # cached search results pick up recalculated words when they expire
+    processed = product_words.process_product_words_queue(time_limit=PRODUCT_WORDS_TIME_LIMIT)
+    logger.info(
+        "Recalculated words of %s parents, product words lag: %s", processed, product_words.get_product_words_lag()
+    )
 
 
 @app.task(priority=9)
-def refresh_price_age():
-    from django.db import connection
+def shift_price_age():
+    price_age.shift_price_age()
 
-    with connection.cursor() as cursor:
-        cursor.execute("REFRESH MATERIALIZED VIEW price_age;")
+
+@app.task
+def prefetch_invoices(vendor_order_ids: List[int]):
+    vendor_orders = list(
+        VendorOrderModel.objects.select_related("vendor", "order").filter(pk__in=vendor_order_ids, total_amount__gt=0)
+    )
+    office_vendors = {
+        (office_vendor.office_id, office_vendor.vendor_id): office_vendor
+        for office_vendor in OfficeVendor.objects.filter(
+            office_id__in={vendor_order.order.office_id for vendor_order in vendor_orders},
+            vendor_id__in={vendor_order.vendor_id for vendor_order in vendor_orders},
+        )
+    }
+    pairs = [
+        (vendor_order, office_vendors[(vendor_order.order.office_id, vendor_order.vendor_id)])
+        for vendor_order in vendor_orders
+        if vendor_order.is_invoice_available
+        and (vendor_order.order.office_id, vendor_order.vendor_id) in office_vendors
+    ]
+    asyncio.run(invoices.prefetch_invoices(pairs))
 
 
 @app.task
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from services.api_client.errors import APIClientError
+from services.api_client.pages import iter_pages
+
+
+class FakeCatalog:
+    def __init__(self, products: int, page_size: int, failures: int = 0):
+        self.products = products
+        self.page_size = page_size
+        self.failures = failures
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch_page(self, page_number: int):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures:
+                self.failures -= 1
+                raise APIClientError("Too many requests")
+            start = (page_number - 1) * self.page_size
+            return list(range(start, min(start + self.page_size, self.products)))
+        finally:
+            self.in_flight -= 1
+
+
+async def collect(catalog: FakeCatalog, **kwargs):
+    return [page async for page in iter_pages(catalog.fetch_page, catalog.page_size, **kwargs)]
+
+
+def test_pages_are_yielded_in_order_with_bounded_concurrency():
+    catalog = FakeCatalog(products=95, page_size=10)
+
+    pages = asyncio.run(collect(catalog, concurrency=3))
+
+    assert [product for page in pages for product in page] == list(range(95))
+    assert catalog.max_in_flight == 3
+
+
+def test_catalog_ending_on_page_boundary():
+    pages = asyncio.run(collect(FakeCatalog(products=30, page_size=10)))
+    assert [len(page) for page in pages] == [10, 10, 10]
+
+
+def test_failed_pages_are_retried():
+    catalog = FakeCatalog(products=25, page_size=10, failures=2)
+    pages = asyncio.run(collect(catalog, concurrency=1, wait=0.01))
+    assert [product for page in pages for product in page] == list(range(25))
+
+    with pytest.raises(APIClientError):
+        asyncio.run(collect(FakeCatalog(products=25, page_size=10, failures=5), concurrency=1, wait=0.01))
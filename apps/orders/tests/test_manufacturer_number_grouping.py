@@ -0,0 +1,61 @@
+from django.test import TestCase
+
+from apps.orders.factories import ProductFactory
+from apps.orders.helpers import ProductHelper
+from apps.orders.models import Product
+
+
+class GroupProductsByManufacturerNumberTestCase(TestCase):
+    def test_creates_parent_for_ungrouped_products(self):
+        first = ProductFactory(manufacturer_number="MN1", name="Gloves Nitrile Small")
+        second = ProductFactory(manufacturer_number="MN1", name="Gloves Small")
+
+        ProductHelper.group_products_by_manufacturer_numbers()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.parent_id == second.parent_id
+        assert first.parent.name == "Gloves Small"
+        assert first.parent.manufacturer_number == "MN1"
+
+    def test_reuses_single_existing_parent(self):
+        parent = ProductFactory(vendor=None, manufacturer_number=None)
+        grouped = ProductFactory(manufacturer_number="MN2", parent=parent)
+        ungrouped = ProductFactory(manufacturer_number="MN2")
+
+        ProductHelper.group_products_by_manufacturer_numbers()
+
+        ungrouped.refresh_from_db()
+        parent.refresh_from_db()
+        assert ungrouped.parent_id == parent.id
+        assert parent.manufacturer_number == "MN2"
+        assert Product.objects.filter(child=grouped).count() == 1
+
+    def test_merges_multiple_parents(self):
+        first_parent = ProductFactory(vendor=None)
+        second_parent = ProductFactory(vendor=None)
+        first = ProductFactory(manufacturer_number="MN3", parent=first_parent)
+        second = ProductFactory(manufacturer_number="MN3", parent=second_parent)
+
+        ProductHelper.group_products_by_manufacturer_numbers()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.parent_id == second.parent_id
+        assert first.parent_id not in (first_parent.id, second_parent.id)
+        assert not Product.objects.filter(id__in=[first_parent.id, second_parent.id]).exists()
+
+    def test_dry_run_does_not_write(self):
+        product = ProductFactory(manufacturer_number="MN4")
+
+        groups = ProductHelper.group_products_by_manufacturer_numbers(dry_run=True)
+
+        product.refresh_from_db()
+        assert product.parent_id is None
+        assert [group.moved_product_ids for group in groups] == [[product.id]]
+
+    def test_unchanged_groups_are_skipped(self):
+        ProductFactory(manufacturer_number="MN5")
+        ProductHelper.group_products_by_manufacturer_numbers()
+
+        assert ProductHelper.group_products_by_manufacturer_numbers(dry_run=True) == []
@@ -0,0 +1,57 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.factories import CompanyFactory, OfficeFactory, VendorFactory
+from apps.orders import price_age
+from apps.orders.models import OfficeProduct, PriceAge, PriceAgeDay
+from apps.orders.tests.factories import OfficeProductFactory
+
+
+class PriceAgeTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = OfficeFactory(company=CompanyFactory())
+        cls.vendor = VendorFactory(slug="henry_schein", name="Henry Schein")
+        now = timezone.now()
+        cls.fresh_office_products = [
+            OfficeProductFactory(office=cls.office, vendor=cls.vendor, last_price_updated=now) for _ in range(2)
+        ]
+        cls.stale_office_product = OfficeProductFactory(
+            office=cls.office, vendor=cls.vendor, last_price_updated=now - datetime.timedelta(days=10)
+        )
+
+    def get_counts(self):
+        return {row.age_group: row.count for row in PriceAge.objects.filter(office_name=self.office.name)}
+
+    def test_counts_follow_price_updates(self):
+        self.assertEqual(self.get_counts(), {1: 2, 4: 1})
+
+        OfficeProduct.objects.filter(id=self.stale_office_product.id).update(last_price_updated=timezone.now())
+        self.assertEqual(self.get_counts(), {1: 3})
+
+        OfficeProduct.objects.filter(id=self.fresh_office_products[0].id).delete()
+        self.assertEqual(self.get_counts(), {1: 2})
+
+    def test_writes_within_the_same_day_keep_counts(self):
+        OfficeProduct.objects.filter(id__in=[p.id for p in self.fresh_office_products]).update(
+            price=1, last_price_updated=timezone.now()
+        )
+        OfficeProduct.objects.filter(id=self.stale_office_product.id).update(is_inventory=True)
+
+        self.assertEqual(self.get_counts(), {1: 2, 4: 1})
+        self.assertEqual(set(PriceAgeDay.objects.filter(office=self.office).values_list("count", flat=True)), {2, 1})
+
+    def test_shift_price_age(self):
+        OfficeProduct.objects.filter(id=self.stale_office_product.id).update(last_price_updated=None)
+        PriceAgeDay.objects.create(
+            office=self.office, vendor=self.vendor, day=timezone.localdate() - datetime.timedelta(days=40), count=5
+        )
+
+        price_age.shift_price_age()
+
+        self.assertEqual(
+            PriceAgeDay.objects.get(office=self.office, vendor=self.vendor, day=datetime.date(1970, 1, 1)).count, 6
+        )
+        self.assertEqual(self.get_counts(), {1: 2, 6: 6})
@@ -0,0 +1,73 @@
+import asyncio
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from apps.accounts.factories import OfficeFactory
+from apps.orders.factories import ProductFactory
+from apps.orders.models import OfficeProduct, Product
+from apps.orders.updater import PriceWriteBuffer
+
+
+def test_updates_of_same_row_are_merged():
+    buffer = PriceWriteBuffer()
+
+    asyncio.run(buffer.update_product(1, price=Decimal("10.00")))
+    asyncio.run(buffer.update_product(1, price=Decimal("12.00"), product_vendor_status="Active"))
+
+    assert buffer.products == {1: {"price": Decimal("12.00"), "product_vendor_status": "Active"}}
+
+
+def test_flushes_on_size():
+    buffer = PriceWriteBuffer(max_size=2)
+    with patch.object(PriceWriteBuffer, "flush", AsyncMock()) as flush:
+        asyncio.run(buffer.update_product(1, price=Decimal("10.00")))
+        flush.assert_not_called()
+        asyncio.run(buffer.update_office_products([1], price=Decimal("10.00")))
+        flush.assert_called_once()
+
+
+def test_flushes_on_age():
+    buffer = PriceWriteBuffer(max_age=60)
+    with patch.object(PriceWriteBuffer, "flush", AsyncMock()) as flush:
+        asyncio.run(buffer.update_product(1, price=Decimal("10.00")))
+        flush.assert_not_called()
+        buffer.last_flush -= 60
+        asyncio.run(buffer.update_product(2, price=Decimal("10.00")))
+        flush.assert_called_once()
+
+
+def test_rows_are_grouped_by_field_set():
+    pending = {
+        1: {"price": Decimal("10.00")},
+        2: {"product_vendor_status": "Active", "price": Decimal("11.00")},
+        3: {"price": Decimal("12.00"), "product_vendor_status": "Active"},
+    }
+    with patch.object(Product.objects, "abulk_update", AsyncMock()) as abulk_update:
+        assert asyncio.run(PriceWriteBuffer._bulk_update(Product, pending)) == 3
+
+    assert sorted((fields, [obj.pk for obj in objs]) for (objs, fields), _ in abulk_update.call_args_list) == [
+        (("price",), [1]),
+        (("price", "product_vendor_status"), [2, 3]),
+    ]
+
+
+class PriceWriteBufferTestCase(TestCase):
+    def test_office_product_fields_are_merged_with_fields_of_product(self):
+        product = ProductFactory()
+        first, second = (
+            OfficeProduct.objects.create(office=OfficeFactory(), product=product, vendor=product.vendor)
+            for _ in range(2)
+        )
+        buffer = PriceWriteBuffer()
+
+        async_to_sync(buffer.update_office_products_of_product)(product.id, price=Decimal("10.00"))
+        async_to_sync(buffer.update_office_products)([first.id], product_vendor_status="Active")
+        async_to_sync(buffer.flush)()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.price, first.product_vendor_status), (Decimal("10.00"), "Active"))
+        self.assertEqual((second.price, second.product_vendor_status), (Decimal("10.00"), None))
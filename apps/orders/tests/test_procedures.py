@@ -0,0 +1,74 @@
+import datetime
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from apps.accounts.factories import CompanyFactory, OfficeFactory, OpenDentalKeyFactory
+from apps.orders.factories import ProcedureCodeFactory, ProcedureFactory
+from apps.orders.helpers import ProcedureHelper
+from apps.orders.models import Procedure, ProcedureFetchWindow
+
+TODAY = datetime.date(2023, 6, 14)
+CLOSED_WEEK = datetime.date(2023, 6, 5)
+OPEN_WEEK = datetime.date(2023, 6, 12)
+
+
+def procedure_row(code, count):
+    return {"ProcCode": code, "Count": f"{count:,}", "AvgFee": "1,000.00", "TotFee": f"{count * 1000}"}
+
+
+class ProcedureIngestionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = OfficeFactory(company=CompanyFactory(), dental_api=OpenDentalKeyFactory())
+        cls.exam = ProcedureCodeFactory(proccode="D0120")
+        cls.cleaning = ProcedureCodeFactory(proccode="D1110")
+        ProcedureCodeFactory(proccode="D1110")
+
+    def get_counts(self):
+        return {
+            (p.start_date, p.procedurecode.proccode): p.count
+            for p in Procedure.objects.filter(office=self.office).select_related("procedurecode")
+        }
+
+    def test_save_procedures(self):
+        ProcedureFactory(office=self.office, procedurecode=self.exam, start_date=OPEN_WEEK, count=1)
+        ProcedureFactory(office=self.office, procedurecode=self.cleaning, start_date=OPEN_WEEK, count=1)
+        results = {
+            CLOSED_WEEK: ([procedure_row("D0120", 1200), procedure_row("D1110", 3), procedure_row("D9999", 1)], 200),
+            OPEN_WEEK: ([procedure_row("D0120", 2)], 200),
+            OPEN_WEEK - datetime.timedelta(weeks=2): ("Open dental API response: error", 500),
+        }
+        ProcedureHelper.save_procedures(self.office.id, results, TODAY)
+
+        assert self.get_counts() == {
+            (CLOSED_WEEK, "D0120"): 1200,
+            (CLOSED_WEEK, "D1110"): 3,
+            (OPEN_WEEK, "D0120"): 2,
+        }
+        # the first of duplicated codes is used
+        assert Procedure.objects.get(start_date=CLOSED_WEEK, procedurecode__proccode="D1110").procedurecode == (
+            self.cleaning
+        )
+        assert list(ProcedureFetchWindow.objects.values_list("office_id", "start_date")) == [
+            (self.office.id, CLOSED_WEEK)
+        ]
+
+    def test_fetched_weeks_are_skipped(self):
+        ProcedureFetchWindow.objects.create(office=self.office, start_date=CLOSED_WEEK)
+        weeks = []
+
+        async def fetch_procedure_weeks(dental_api_key, fetched_weeks):
+            weeks.extend(fetched_weeks)
+            return [([procedure_row("D0120", 5)], 200) for _ in fetched_weeks]
+
+        with patch.object(ProcedureHelper, "fetch_procedure_weeks", fetch_procedure_weeks), patch(
+            "apps.orders.helpers.timezone.localdate", return_value=TODAY
+        ):
+            ProcedureHelper.fetch_procedure_period(CLOSED_WEEK - datetime.timedelta(days=3), self.office.id)
+
+        assert weeks == [CLOSED_WEEK - datetime.timedelta(weeks=1), OPEN_WEEK]
+        assert self.get_counts() == {
+            (CLOSED_WEEK - datetime.timedelta(weeks=1), "D0120"): 5,
+            (OPEN_WEEK, "D0120"): 5,
+        }
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.accounts.factories import CompanyFactory, OfficeFactory, VendorFactory
+from apps.orders.factories import ProductFactory
+from apps.orders.helpers import OfficeProductHelper
+from apps.orders.models import Product
+from apps.orders.tests.factories import OfficeProductFactory
+
+
+class ProductPricesFromDBTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = OfficeFactory(company=CompanyFactory())
+        henry_schein = VendorFactory(slug="henry_schein", name="Henry Schein")
+        net_32 = VendorFactory(slug="net_32", name="Net 32")
+        crazy_dental = VendorFactory(slug="crazy_dental", name="Crazy Dental")
+
+        cls.formula_product = ProductFactory(vendor=henry_schein)
+        cls.formula_product_without_price = ProductFactory(vendor=henry_schein)
+        OfficeProductFactory(
+            office=cls.office, product=cls.formula_product, price=Decimal("10.00"), product_vendor_status="Active"
+        )
+        cls.net32_product = ProductFactory(vendor=net_32, price=Decimal("20.00"))
+        cls.crazy_dental_product = ProductFactory(vendor=crazy_dental, price=Decimal("30.00"))
+
+    async def test_get_products_prices_from_db(self):
+        product_ids = [
+            self.formula_product.id,
+            self.formula_product_without_price.id,
+            self.net32_product.id,
+            self.crazy_dental_product.id,
+        ]
+        products = await Product.objects.select_related("vendor").ain_bulk(product_ids)
+        prices = await OfficeProductHelper.get_products_prices_from_db(products, self.office.id)
+
+        self.assertEqual(
+            dict(prices),
+            {
+                self.formula_product.id: {"price": Decimal("10.00"), "product_vendor_status": "Active"},
+                self.net32_product.id: {"price": Decimal("20.00"), "product_vendor_status": ""},
+                self.crazy_dental_product.id: {"price": Decimal("30.00"), "product_vendor_status": ""},
+            },
+        )
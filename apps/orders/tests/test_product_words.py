@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from apps.accounts.factories import VendorFactory
+from apps.orders import product_words
+from apps.orders.factories import ProductFactory
+from apps.orders.models import Product, ProductWords
+
+
+class ProductWordsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = VendorFactory(slug="henry_schein", name="Henry Schein")
+        cls.parent = ProductFactory(vendor=None, name="Nitrile Gloves", product_id=None)
+        cls.child = ProductFactory(
+            vendor=cls.vendor, parent=cls.parent, name="Nitrile Gloves Small", product_id="1-23"
+        )
+
+    def test_queued_parent_is_recalculated(self):
+        self.assertEqual(product_words.get_product_words_lag().queued, 1)
+        self.assertFalse(ProductWords.objects.filter(product=self.parent).exists())
+
+        self.assertEqual(product_words.process_product_words_queue(), 1)
+
+        words = ProductWords.objects.get(product=self.parent)
+        self.assertEqual(set(words.words.split()), {"nitrile", "gloves", "small"})
+        self.assertEqual(set(words.numbers), {"1-23", "123"})
+        self.assertEqual(product_words.get_product_words_lag().queued, 0)
+        self.assertEqual(Product.objects.search("gloves").get().id, self.parent.id)
+
+    def test_renaming_child_requeues_parent(self):
+        product_words.process_product_words_queue()
+        Product.objects.filter(id=self.child.id).update(name="Latex Gloves")
+        product_words.process_product_words_queue()
+
+        self.assertIn("latex", ProductWords.objects.get(product=self.parent).words.split())
+
+    def test_unrelated_update_does_not_queue_parent(self):
+        product_words.process_product_words_queue()
+        Product.objects.filter(id=self.child.id).update(price=10)
+
+        self.assertEqual(product_words.get_product_words_lag().queued, 0)
+
+    def test_rebuild_product_words(self):
+        self.assertEqual(product_words.rebuild_product_words(), 1)
+        self.assertTrue(ProductWords.objects.filter(product=self.parent).exists())
@@ -0,0 +1,24 @@
+from apps.orders import search_cache
+
+
+def test_search_cache_key_normalizes_search():
+    key = search_cache.search_cache_key(1, "Nitrile  Gloves", [2, 1], [5, "3"], -1, -1)
+    assert key == search_cache.search_cache_key(1, "nitrile gloves", [1, 2], ["3", 5], -1, -1)
+    assert key != search_cache.search_cache_key(2, "nitrile gloves", [1, 2], ["3", 5], -1, -1)
+    assert key != search_cache.search_cache_key(1, "nitrile gloves", [1, 2], ["3", 5], 10, -1)
+
+
+def test_invalidate_office_search_results():
+    result = search_cache.SearchResult(product_ids=[3, 1, 2], available_vendors=["henry_schein"])
+    key = search_cache.search_cache_key(1, "gloves", [1], [], -1, -1)
+    other_office_key = search_cache.search_cache_key(2, "gloves", [1], [], -1, -1)
+    search_cache.set_search_result(key, result)
+    search_cache.set_search_result(other_office_key, result)
+    assert search_cache.get_search_result(key) == result
+
+    search_cache.invalidate_office_search_results(1)
+    assert search_cache.get_search_result(search_cache.search_cache_key(1, "gloves", [1], [], -1, -1)) is None
+    assert search_cache.get_search_result(search_cache.search_cache_key(2, "gloves", [1], [], -1, -1)) == result
+
+    search_cache.invalidate_search_results()
+    assert search_cache.get_search_result(search_cache.search_cache_key(2, "gloves", [1], [], -1, -1)) is None
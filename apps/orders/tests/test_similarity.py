@@ -0,0 +1,54 @@
+import itertools
+import random
+
+import pytest
+
+from apps.orders.services.product import ProductService
+from apps.orders.services.similarity import SimilarityEngine, group_similar_products
+
+WORDS = ["nitrile", "gloves", "composite", "syringe", "bur", "diamond", "carbide", "tips", "bond", "etch"]
+SIZES = ["2g", "4g", "100", "200", "330", "557", "1/2", "3ml"]
+
+
+def random_name(rng: random.Random) -> str:
+    return " ".join(rng.sample(WORDS, rng.randint(1, 4)) + rng.sample(SIZES, rng.randint(0, 2)))
+
+
+@pytest.mark.parametrize(
+    "names",
+    [
+        ("Nitrile Gloves Small 100", "Nitrile Gloves 100 small"),
+        ("Composite Syringe 4g A2", "Composite Syringe of 4g A3"),
+        ("Prophy Angles", "Prophy Angles with Cups"),
+        ("Diamond Bur 557", "Carbide Bur 330"),
+    ],
+)
+def test_engine_scores_like_get_similarity(names):
+    engine = SimilarityEngine({i: {"vendor": i, "name": name} for i, name in enumerate(names)}, threshold=0)
+    assert engine.similarity([0, 1]) == pytest.approx(ProductService.get_similarity(*names))
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.65, 0.7])
+def test_similar_pairs_match_brute_force(threshold):
+    rng = random.Random(threshold)
+    products = {product_id: {"vendor": rng.choice("abc"), "name": random_name(rng)} for product_id in range(300)}
+    engine = SimilarityEngine(products, threshold)
+
+    expected = {
+        (first, second)
+        for first, second in itertools.combinations(products, 2)
+        if products[first]["vendor"] != products[second]["vendor"]
+        and ProductService.get_similarity(products[first]["name"], products[second]["name"]) > threshold
+    }
+    assert {pair for _, pair in engine.similar_pairs()} == expected
+
+
+def test_group_similar_products():
+    products = {
+        1: {"vendor": "henry_schein", "name": "Nitrile Gloves Small 100"},
+        2: {"vendor": "darby", "name": "Nitrile Gloves 100 Small"},
+        3: {"vendor": "patterson", "name": "Gloves Nitrile Small 100/Box"},
+        4: {"vendor": "darby", "name": "Composite Syringe 4g A2"},
+        5: {"vendor": "darby", "name": "Nitrile Gloves Small 100 pcs"},
+    }
+    assert sorted(map(sorted, group_similar_products(products, threshold=0.65))) == [[1, 2, 3]]
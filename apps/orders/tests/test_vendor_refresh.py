@@ -0,0 +1,38 @@
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from apps.accounts.factories import (
+    CompanyFactory,
+    OfficeFactory,
+    OfficeVendorFactory,
+    VendorFactory,
+)
+from apps.orders.updater import get_refresh_groups
+
+
+class RefreshGroupsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = CompanyFactory(is_active=True)
+        cls.offices = [OfficeFactory(company=company) for _ in range(3)]
+
+    def connect(self, vendor, credentials):
+        for office, (username, password) in zip(self.offices, credentials):
+            OfficeVendorFactory(office=office, vendor=vendor, username=username, password=password)
+
+    def test_offices_are_grouped_by_account(self):
+        vendor = VendorFactory(slug="henry_schein", name="Henry Schein")
+        self.connect(vendor, [("shared", "pass"), ("own", "pass"), ("shared", "pass")])
+
+        groups = async_to_sync(get_refresh_groups)(vendor)
+
+        self.assertEqual(
+            sorted((credentials["username"], sorted(office_ids)) for credentials, office_ids in groups),
+            [("own", [self.offices[1].id]), ("shared", sorted([self.offices[0].id, self.offices[2].id]))],
+        )
+
+    def test_shared_prices_are_refreshed_once_for_all_offices(self):
+        vendor = VendorFactory(slug="net_32", name="Net 32")
+        self.connect(vendor, [("first", "pass"), ("second", "pass")])
+
+        self.assertEqual(async_to_sync(get_refresh_groups)(vendor), [(None, None)])
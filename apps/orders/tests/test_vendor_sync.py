@@ -0,0 +1,109 @@
+import asyncio
+import contextlib
+import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from apps.accounts.factories import OfficeVendorFactory, VendorFactory
+from apps.accounts.models import VendorOrderSync
+from apps.common.choices import OrderStatus
+from apps.orders import vendor_sync
+from apps.orders.factories import OrderFactory, VendorOrderFactory
+from apps.orders.models import VendorOrder
+from apps.scrapers.errors import VendorAuthenticationFailed
+
+
+class SyncPlansTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office_vendor = OfficeVendorFactory(vendor=VendorFactory(slug="henry_schein", name="Henry Schein"))
+        order = OrderFactory(office=cls.office_vendor.office)
+        VendorOrderFactory(
+            order=order,
+            vendor=cls.office_vendor.vendor,
+            status=OrderStatus.CLOSED,
+            vendor_order_id="1",
+            vendor_order_reference="ref-1",
+        )
+        VendorOrderFactory(
+            order=order, vendor=cls.office_vendor.vendor, status=OrderStatus.OPEN, order_date=datetime.date(2023, 1, 5)
+        )
+
+    def test_first_sync_starts_from_oldest_open_order(self):
+        plan = vendor_sync.get_sync_plans([self.office_vendor])[self.office_vendor.id]
+
+        self.assertEqual(plan.completed_order_ids, ["ref-1"])
+        self.assertEqual(plan.from_date, datetime.date(2023, 1, 5))
+
+    def test_next_sync_starts_from_high_water_mark(self):
+        VendorOrderSync.objects.create(office_vendor=self.office_vendor, synced_to=datetime.date(2023, 6, 10))
+        VendorOrder.objects.update(status=OrderStatus.CLOSED)
+
+        plan = vendor_sync.get_sync_plans([self.office_vendor])[self.office_vendor.id]
+
+        self.assertEqual(
+            plan.from_date, datetime.date(2023, 6, 10) - datetime.timedelta(days=vendor_sync.SYNC_OVERLAP_DAYS)
+        )
+
+    def test_next_sync_includes_older_open_orders(self):
+        VendorOrderSync.objects.create(office_vendor=self.office_vendor, synced_to=datetime.date(2023, 6, 10))
+
+        plan = vendor_sync.get_sync_plans([self.office_vendor])[self.office_vendor.id]
+
+        self.assertEqual(plan.from_date, datetime.date(2023, 1, 5))
+
+
+class FakeScraper:
+    def __init__(self, logged_in=True, failed_batches=0):
+        self.logged_in = logged_in
+        self.ingestor = SimpleNamespace(ingested_orders=2, failed_batches=failed_batches)
+        self.fetched_orders = False
+
+    async def authenticate(self):
+        return None if self.logged_in else False
+
+    @contextlib.asynccontextmanager
+    async def batch_orders(self, office):
+        yield self.ingestor
+
+    async def get_orders(self, **kwargs):
+        self.fetched_orders = True
+
+
+class SyncOfficeVendorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office_vendor = OfficeVendorFactory(vendor=VendorFactory(slug="henry_schein", name="Henry Schein"))
+
+    def sync(self, scraper):
+        plan = vendor_sync.SyncPlan(completed_order_ids=[], from_date=None)
+        with patch.object(vendor_sync.ScraperFactory, "create_scraper", return_value=scraper):
+            return async_to_sync(vendor_sync.sync_office_vendor)(
+                asyncio.Semaphore(1), None, self.office_vendor, plan, datetime.date(2023, 6, 10)
+            )
+
+    def test_complete_sync_advances_high_water_mark(self):
+        self.assertEqual(self.sync(FakeScraper()), 2)
+        self.assertEqual(
+            VendorOrderSync.objects.get(office_vendor=self.office_vendor).synced_to, datetime.date(2023, 6, 10)
+        )
+
+    def test_failed_login_raises(self):
+        scraper = FakeScraper(logged_in=False)
+
+        with self.assertRaises(VendorAuthenticationFailed):
+            self.sync(scraper)
+        self.assertFalse(scraper.fetched_orders)
+        self.assertFalse(VendorOrderSync.objects.exists())
+
+    def test_failed_batches_keep_high_water_mark(self):
+        VendorOrderSync.objects.create(office_vendor=self.office_vendor, synced_to=datetime.date(2023, 6, 1))
+
+        with self.assertRaises(vendor_sync.OrderSyncFailed):
+            self.sync(FakeScraper(failed_batches=1))
+        self.assertEqual(
+            VendorOrderSync.objects.get(office_vendor=self.office_vendor).synced_to, datetime.date(2023, 6, 1)
+        )
@@ -10,6 +10,8 @@ class VendorParams(NamedTuple):
     request_rate: float
     batch_size: int = 1
     needs_login: bool = True
+    # prices don't depend on the account, so a price fetched once is valid for every office
+    shared_prices: bool = False
 
 
 class ProcessTask(NamedTuple):
@@ -26,3 +28,20 @@ class Stats(NamedTuple):
     rate: float
     error_rate: float
     total: int
+
+
+class RefreshStats(NamedTuple):
+    vendor: str
+    products: int
+    office_products: int
+    errors: int
+    elapsed: float
+    has_more: bool = False
+
+    @property
+    def rate(self) -> float:
+        return self.products / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def office_product_rate(self) -> float:
+        return self.office_products / self.elapsed if self.elapsed else 0.0
@@ -1,20 +1,26 @@
 import asyncio
 import datetime
 import logging
-import random
 import time
 from asyncio import Queue
-from collections import deque
-from typing import Deque, Dict, List, Union
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, Union
 
 from aiohttp import ClientSession
 from asgiref.sync import sync_to_async
+from django.db.models import Q
 from django.db.models.functions import Now
 from django.utils import timezone
 
 from apps.accounts.models import OfficeVendor, Vendor
 from apps.orders.models import OfficeProduct, Product, ProductImage
-from apps.orders.types import ProcessResult, ProcessTask, Stats, VendorParams
+from apps.orders.types import (
+    ProcessResult,
+    ProcessTask,
+    RefreshStats,
+    Stats,
+    VendorParams,
+)
 from apps.vendor_clients.async_clients import BaseClient
 from apps.vendor_clients.async_clients.base import (
     EmptyResults,
@@ -23,6 +29,7 @@ from apps.vendor_clients.async_clients.base import (
     TooManyRequests,
 )
 from apps.vendor_clients.errors import MissingCredentials
+from apps.vendor_clients.rate_controller import RateController
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +40,14 @@ STATUS_ACTIVE = "Active"
 
 BULK_SIZE = 500
 
+# Refresh engine settings: distinct vendor products per run and concurrent consumers
+ENGINE_BULK_SIZE = 5000
+ENGINE_CONSUMERS = 4
+
+# Pending rows and seconds after which buffered price results are written to database
+WRITE_BUFFER_SIZE = 500
+WRITE_BUFFER_AGE = 10
+
 
 INVENTORY_AGE_DEFAULT = datetime.timedelta(days=1)
 NONINVENTORY_AGE_DEFAULT = datetime.timedelta(days=2)
@@ -48,6 +63,7 @@ VENDOR_PARAMS: Dict[str, VendorParams] = {
         batch_size=1,
         request_rate=1.5,
         needs_login=False,
+        shared_prices=True,
     ),
     "henry_schein": VendorParams(
         inventory_age=datetime.timedelta(days=7),
@@ -125,6 +141,7 @@ VENDOR_PARAMS: Dict[str, VendorParams] = {
         batch_size=1,
         request_rate=1,
         needs_login=False,
+        shared_prices=True,
     ),
     "bluesky_bio": VendorParams(
         inventory_age=datetime.timedelta(days=14),
@@ -195,6 +212,107 @@ class StatBuffer:
         )
 
 
+class PriceWriteBuffer:
+    """
+    Collects price update results in memory and writes them with `bulk_update`
+    once `max_size` rows are pending or `max_age` seconds passed since the last flush.
+    Updates of the same row are merged, so only the latest values are written.
+    """
+
+    def __init__(self, max_size: int = WRITE_BUFFER_SIZE, max_age: float = WRITE_BUFFER_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.products: Dict[int, dict] = {}
+        self.office_products: Dict[int, dict] = {}
+        # product id => fields for all office products of that product
+        self.office_products_by_product: Dict[int, dict] = {}
+        # product id => fields for all images of that product
+        self.images: Dict[int, dict] = {}
+        self.flushed_rows = 0
+        self.started = time.monotonic()
+        self.last_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return (
+            len(self.products) + len(self.office_products) + len(self.office_products_by_product) + len(self.images)
+        )
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.flushed_rows / elapsed if elapsed else 0.0
+
+    async def update_product(self, product_id: int, **fields):
+        self.products.setdefault(product_id, {}).update(fields)
+        await self.maybe_flush()
+
+    async def update_office_products(self, office_product_ids: Iterable[int], **fields):
+        for office_product_id in office_product_ids:
+            self.office_products.setdefault(office_product_id, {}).update(fields)
+        await self.maybe_flush()
+
+    async def update_office_products_of_product(self, product_id: int, **fields):
+        self.office_products_by_product.setdefault(product_id, {}).update(fields)
+        await self.maybe_flush()
+
+    async def update_images(self, product_id: int, **fields):
+        self.images.setdefault(product_id, {}).update(fields)
+        await self.maybe_flush()
+
+    async def maybe_flush(self):
+        if len(self) >= self.max_size or time.monotonic() - self.last_flush >= self.max_age:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            products, self.products = self.products, {}
+            office_products, self.office_products = self.office_products, {}
+            office_products_by_product, self.office_products_by_product = self.office_products_by_product, {}
+            images, self.images = self.images, {}
+            self.last_flush = time.monotonic()
+
+            if office_products_by_product:
+                resolved = await self._resolve(OfficeProduct, office_products_by_product)
+                # fields of the office product itself take precedence over the ones set for its product
+                for pk, fields in office_products.items():
+                    resolved.setdefault(pk, {}).update(fields)
+                office_products = resolved
+            if images:
+                images = await self._resolve(ProductImage, images)
+
+            started = time.monotonic()
+            rows = 0
+            rows += await self._bulk_update(Product, products)
+            rows += await self._bulk_update(OfficeProduct, office_products)
+            rows += await self._bulk_update(ProductImage, images)
+            if not rows:
+                return
+            self.flushed_rows += rows
+            logger.info(
+                "Flushed %s rows in %.2fs, %s rows total (%.1f rows/s)",
+                rows,
+                time.monotonic() - started,
+                self.flushed_rows,
+                self.rows_per_second,
+            )
+
+    @staticmethod
+    async def _resolve(model, pending_by_product: Dict[int, dict]) -> Dict[int, dict]:
+        """Expand updates keyed by product id into updates keyed by primary key of `model`"""
+        rows = model.objects.filter(product_id__in=pending_by_product.keys()).values_list("id", "product_id")
+        return {pk: dict(pending_by_product[product_id]) async for pk, product_id in rows}
+
+    @staticmethod
+    async def _bulk_update(model, pending: Dict[int, dict]) -> int:
+        groups: Dict[Tuple[str, ...], list] = defaultdict(list)
+        for pk, fields in pending.items():
+            groups[tuple(sorted(fields))].append(model(pk=pk, **fields))
+        for fields, objs in groups.items():
+            await model.objects.abulk_update(objs, fields, batch_size=BULK_SIZE)
+        return len(pending)
+
+
 class Updater:
     attempt_threshold = 3
 
@@ -206,17 +324,16 @@ class Updater:
         self.to_process: Queue[ProcessTask] = Queue(maxsize=20)
         self._crendentials = None
         self.statbuffer = StatBuffer()
-        self.target_rate = self.vendor_params.request_rate
-        self.last_check: float = time.monotonic()
-        self.errors = 0
+        self.rate_controller: Optional[RateController] = None
         self.office_id = office_id
+        self.write_buffer = PriceWriteBuffer()
 
     async def get_credentials(self):
         if not self._crendentials:
             qs = OfficeVendor.objects.filter(vendor=self.vendor)
             if self.office_id:
                 qs = qs.filter(office_id=self.office_id)
-            credentials = await qs.values("username", "password").afirst()
+            credentials = await qs.values("id", "username", "password").afirst()
             if not credentials:
                 raise MissingCredentials()
             self._crendentials = credentials
@@ -259,20 +376,24 @@ class Updater:
             product = process_result.product
             if process_result.result.is_ok():
                 self.statbuffer.add_item(True)
+                self.rate_controller.record_success()
                 await self.update_price(product, process_result.result.value)
             else:
                 exc = process_result.result.value
                 if isinstance(exc, TooManyRequests):
                     attempt = task_mapping[product.id].attempt + 1
                     self.statbuffer.add_item(False)
+                    self.rate_controller.record_throttled(exc.retry_after)
                     await self.reschedule(ProcessTask(product, attempt))
                 elif isinstance(exc, EmptyResults):
                     logger.debug("Marking product %s as empty", product.id)
                     self.statbuffer.add_item(True)
+                    self.rate_controller.record_success()
                     await self.mark_status(product, STATUS_UNAVAILABLE)
                 else:
                     attempt = task_mapping[product.id].attempt + 1
                     self.statbuffer.add_item(True)
+                    self.rate_controller.record_error()
                     await self.reschedule(ProcessTask(product, attempt))
 
         if task_mapping.items():
@@ -295,12 +416,10 @@ class Updater:
             "price_expiration": current_time + get_vendor_age(self.vendor, product),
         }
         if isinstance(product, Product):
-            await Product.objects.filter(
-                pk=product.pk,
-            ).aupdate(**update_fields)
-            await OfficeProduct.objects.filter(product_id=product.pk).aupdate(**update_fields)
+            await self.write_buffer.update_product(product.pk, **update_fields)
+            await self.write_buffer.update_office_products_of_product(product.pk, **update_fields)
         else:
-            await OfficeProduct.objects.filter(id=product.pk).aupdate(**update_fields)
+            await self.write_buffer.update_office_products([product.pk], **update_fields)
 
     async def update_price(self, product: Union[Product, OfficeProduct], price_info: PriceInfo):
         update_time = timezone.localtime()
@@ -320,41 +439,24 @@ class Updater:
                 **update_fields,
                 "description": price_info.description,
             }
-            await Product.objects.filter(pk=product.pk).aupdate(**data, **product_update_fields)
-            if price_info.image != '':
-                update_image_field = {
-                    "image": price_info.image,
-                    "updated_at": update_time,
-                }
-                await ProductImage.objects.filter(product_id=product.pk).aupdate(**update_image_field)
-            await OfficeProduct.objects.filter(product_id=product.pk).aupdate(**update_fields)
+            await self.write_buffer.update_product(product.pk, **data, **product_update_fields)
+            if price_info.image:
+                await self.write_buffer.update_images(product.pk, image=price_info.image, updated_at=update_time)
+            await self.write_buffer.update_office_products_of_product(product.pk, **update_fields)
         elif isinstance(product, OfficeProduct):
-            if price_info.image != '':
-                update_image_field = {
-                    "image": price_info.image,
-                    "updated_at": update_time,
-                }
-                await ProductImage.objects.filter(product_id=product.product_id).aupdate(**update_image_field)
-            if price_info.description != '':
-                description_update_field = {
-                    "description": price_info.description,
-                }
-                await Product.objects.filter(id=product.product_id).aupdate(**description_update_field)
-            await OfficeProduct.objects.filter(id=product.pk).aupdate(**update_fields)
+            if price_info.image:
+                await self.write_buffer.update_images(
+                    product.product_id, image=price_info.image, updated_at=update_time
+                )
+            if price_info.description != "":
+                await self.write_buffer.update_product(product.product_id, description=price_info.description)
+            await self.write_buffer.update_office_products([product.pk], **update_fields)
 
     async def get_batch(self) -> List[ProcessTask]:
-        batch = []
-        sleeps = 0
-        while len(batch) < self.batch_size:
-            await asyncio.sleep(random.uniform(0.5, 1.5) / self.target_rate)
-            if sleeps > 3 and batch:
-                break
-            if not self.to_process.empty():
-                item = await self.to_process.get()
-                batch.append(item)
-                sleeps = 0
-            else:
-                sleeps += 1
+        batch = [await self.to_process.get()]
+        while len(batch) < self.batch_size and not self.to_process.empty():
+            batch.append(self.to_process.get_nowait())
+        await self.rate_controller.acquire(len(batch))
         return batch
 
     async def get_client(self, session):
@@ -366,28 +468,20 @@ class Updater:
             username=credentials["username"],
             password=credentials["password"],
         )
+        client.office_vendor_id = credentials["id"]
         if self.vendor_params.needs_login:
-            await client.login()
+            await client.authenticate()
         return client
     
     async def process_batch_and_update_stats(self, client, batch):
         try:
-            await self.process(client, batch)  # Await the processing to complete
-            for _ in batch:
-                self.to_process.task_done()
-            # Update stats after processing is complete
-            stats = self.statbuffer.stats()
-            logger.debug("Stats: %s", stats)
-            if stats.total > 10 and time.monotonic() - self.last_check > 20:
-                if stats.error_rate > 0:
-                    self.errors += 1
-                    self.target_rate /= 1.05
-                else:
-                    self.target_rate *= 1 + 0.05 / (self.errors + 1)
-                self.last_check = time.monotonic()
-                logger.debug("New target rate: %s", self.target_rate)
+            await self.process(client, batch)
+            logger.debug("Stats: %s, request rate: %s", self.statbuffer.stats(), self.rate_controller.rate)
         except Exception as e:
             logger.exception("Batch processor raised an error: %s", e)
+        finally:
+            for _ in batch:
+                self.to_process.task_done()
 
     async def consumer(self, client):
         logger.debug("Started consumer")
@@ -399,15 +493,232 @@ class Updater:
         await self.producer_started.wait()
         await self.to_process.join()
 
+    async def get_rate_controller(self) -> RateController:
+        return await RateController.for_vendor(self.vendor.slug, self.vendor_params.request_rate)
+
     async def fetch(self):
         logger.debug("Getting credentials")
-        async with ClientSession() as session:
-            client = await self.get_client(session)
-            worker_task = asyncio.create_task(self.consumer(client))
-            producer_task = asyncio.create_task(self.producer())
-            await self.complete()
-            worker_task.cancel()
-            producer_task.cancel()
+        self.rate_controller = await self.get_rate_controller()
+        try:
+            async with ClientSession() as session:
+                client = await self.get_client(session)
+                client.rate_controller = self.rate_controller
+                worker_task = asyncio.create_task(self.consumer(client))
+                producer_task = asyncio.create_task(self.producer())
+                try:
+                    await self.complete()
+                finally:
+                    worker_task.cancel()
+                    producer_task.cancel()
+        finally:
+            await self.write_buffer.flush()
+            await self.rate_controller.asave()
+
+
+class VendorRefreshEngine(Updater):
+    """
+    Refreshes prices of a vendor for a group of offices at once.
+
+    Expired inventory office products are deduplicated by vendor product, so each
+    vendor product is fetched only once and the result is written back to every
+    office product of the group that refers to it. Several consumers share the vendor `RateController`.
+    Offices are grouped by `get_refresh_groups`, all together only when vendor prices don't depend on the account.
+    """
+
+    def __init__(
+        self,
+        vendor: Vendor,
+        consumers: int = ENGINE_CONSUMERS,
+        limit: int = ENGINE_BULK_SIZE,
+        credentials: Optional[dict] = None,
+        office_ids: Optional[List[int]] = None,
+    ):
+        super().__init__(vendor)
+        self.consumers = consumers
+        self.limit = limit
+        self._crendentials = credentials
+        self.office_ids = office_ids
+        # unbounded, because consumers put rescheduled tasks back while the producer is still feeding
+        self.to_process: Queue[ProcessTask] = Queue()
+        # vendor product id => office product ids sharing its price
+        self.office_product_ids: Dict[int, List[int]] = {}
+        self.has_more = False
+        self.updated_products = 0
+        self.updated_office_products = 0
+        self.failed_products = 0
+
+    async def get_credentials(self):
+        if not self._crendentials:
+            credentials = (
+                await OfficeVendor.objects.filter(vendor=self.vendor, office__company__is_active=True)
+                .order_by("-login_success", "-updated_at")
+                .values("id", "username", "password")
+                .afirst()
+            )
+            if not credentials:
+                raise MissingCredentials()
+            self._crendentials = credentials
+        return self._crendentials
+
+    def get_products(self) -> List[OfficeProduct]:
+        office_products = OfficeProduct.objects.filter(
+            vendor=self.vendor,
+            is_inventory=True,
+            product__isnull=False,
+            office__company__is_active=True,
+            office__connected_vendors__vendor=self.vendor,
+        )
+        if self.office_ids is not None:
+            office_products = office_products.filter(office_id__in=self.office_ids)
+        office_products = (
+            office_products.filter(Q(price_expiration__lt=Now()) | Q(price_expiration__isnull=True))
+            .exclude(product_vendor_status__in=(STATUS_EXHAUSTED,))
+            .order_by("price_expiration")
+            .values_list("id", "product_id")
+        )
+        representatives: Dict[int, int] = {}
+        for office_product_id, product_id in office_products.iterator():
+            if product_id not in self.office_product_ids:
+                if len(self.office_product_ids) >= self.limit:
+                    self.has_more = True
+                    continue
+                self.office_product_ids[product_id] = []
+                representatives[product_id] = office_product_id
+            self.office_product_ids[product_id].append(office_product_id)
+
+        logger.info(
+            "Found %s products shared by %s office products for %s",
+            len(self.office_product_ids),
+            sum(len(ids) for ids in self.office_product_ids.values()),
+            self.vendor.slug,
+        )
+        return list(
+            OfficeProduct.objects.select_related("product").filter(pk__in=representatives.values()).order_by(
+                "price_expiration"
+            )
+        )
+
+    def _office_product_ids(self, product: OfficeProduct) -> List[int]:
+        return self.office_product_ids.get(product.product_id, [product.pk])
+
+    async def mark_status(self, product: OfficeProduct, status: str):
+        current_time = timezone.localtime()
+        await self.write_buffer.update_office_products(
+            self._office_product_ids(product),
+            product_vendor_status=status,
+            last_price_updated=current_time,
+            price_expiration=current_time + get_vendor_age(self.vendor, product),
+        )
+        if status == STATUS_EXHAUSTED:
+            self.failed_products += 1
+
+    async def update_price(self, product: OfficeProduct, price_info: PriceInfo):
+        update_time = timezone.localtime()
+        if price_info.image:
+            await self.write_buffer.update_images(product.product_id, image=price_info.image, updated_at=update_time)
+        if price_info.description:
+            await self.write_buffer.update_product(product.product_id, description=price_info.description)
+        office_product_ids = self._office_product_ids(product)
+        await self.write_buffer.update_office_products(
+            office_product_ids,
+            price=price_info.price,
+            last_price_updated=update_time,
+            product_vendor_status=price_info.product_vendor_status,
+            price_expiration=update_time + get_vendor_age(self.vendor, product),
+        )
+        self.updated_products += 1
+        self.updated_office_products += len(office_product_ids)
+
+    async def fetch(self) -> RefreshStats:
+        started = time.monotonic()
+        self.rate_controller = await self.get_rate_controller()
+        try:
+            async with ClientSession() as session:
+                client = await self.get_client(session)
+                client.rate_controller = self.rate_controller
+                worker_tasks = [asyncio.create_task(self.consumer(client)) for _ in range(self.consumers)]
+                producer_task = asyncio.create_task(self.producer())
+                try:
+                    await self.complete()
+                finally:
+                    for worker_task in worker_tasks:
+                        worker_task.cancel()
+                    producer_task.cancel()
+        finally:
+            await self.write_buffer.flush()
+            await self.rate_controller.asave()
+
+        stats = RefreshStats(
+            vendor=self.vendor.slug,
+            products=self.updated_products,
+            office_products=self.updated_office_products,
+            errors=self.failed_products,
+            elapsed=time.monotonic() - started,
+            has_more=self.has_more,
+        )
+        logger.info(
+            "Refreshed %s: %s products (%.2f/s), %s office products (%.2f/s), %s errors, final rate %.2f, "
+            "%s rows flushed (%.1f rows/s)",
+            stats.vendor,
+            stats.products,
+            stats.rate,
+            stats.office_products,
+            stats.office_product_rate,
+            stats.errors,
+            self.rate_controller.rate,
+            self.write_buffer.flushed_rows,
+            self.write_buffer.rows_per_second,
+        )
+        return stats
+
+
+async def get_refresh_groups(vendor: Vendor) -> List[Tuple[Optional[dict], Optional[List[int]]]]:
+    """
+    Credentials and office ids sharing prices of the vendor.
+    Offices logged in with the same account see the same prices, other offices may have negotiated their own.
+    """
+    if VENDOR_PARAMS[vendor.slug].shared_prices:
+        return [(None, None)]
+    groups: Dict[Tuple[str, str], Tuple[dict, List[int]]] = {}
+    office_vendors = (
+        OfficeVendor.objects.filter(vendor=vendor, office__company__is_active=True)
+        .order_by("-login_success", "-updated_at")
+        .values("id", "username", "password", "office_id")
+    )
+    async for office_vendor in office_vendors:
+        office_id = office_vendor.pop("office_id")
+        key = (office_vendor["username"], office_vendor["password"])
+        groups.setdefault(key, (office_vendor, []))[1].append(office_id)
+    return list(groups.values())
+
+
+async def refresh_vendor(slug: str, consumers: Optional[int] = None) -> RefreshStats:
+    logger.info(f"Refreshing {slug} prices for all offices")
+    started = time.monotonic()
+    vendor = await Vendor.objects.aget(slug=slug)
+    groups = await get_refresh_groups(vendor)
+    if not groups:
+        raise MissingCredentials()
+    results = []
+    for credentials, office_ids in groups:
+        engine = VendorRefreshEngine(
+            vendor=vendor, consumers=consumers or ENGINE_CONSUMERS, credentials=credentials, office_ids=office_ids
+        )
+        try:
+            results.append(await engine.fetch())
+        except Exception as e:
+            # a failing account shouldn't keep offices of the other accounts stale
+            logger.exception("Refreshing %s prices of offices %s failed: %s", slug, office_ids, e)
+            if len(groups) == 1:
+                raise
+    return RefreshStats(
+        vendor=slug,
+        products=sum(stats.products for stats in results),
+        office_products=sum(stats.office_products for stats in results),
+        errors=sum(stats.errors for stats in results),
+        elapsed=time.monotonic() - started,
+        has_more=any(stats.has_more for stats in results),
+    )
 
 
 async def fetch_for_vendor(slug, office_id):
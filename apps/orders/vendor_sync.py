@@ -0,0 +1,181 @@
+"""
+Nightly sync of orders placed on vendor sites.
+
+Every vendor gets its own concurrency limit, so a slow vendor doesn't hold back the others.
+Completed order ids and sync dates of all office vendors are loaded with a few queries before scheduling,
+and a high-water mark per office vendor makes every run pull only orders placed since the previous one,
+or since the oldest order still open on our side if it's older.
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional
+
+from aiohttp import ClientSession, ClientTimeout
+from django.db.models import Min
+
+from apps.accounts.models import OfficeVendor, VendorOrderSync
+from apps.common.choices import OrderStatus
+from apps.orders.models import VendorOrder
+from apps.scrapers.errors import VendorAuthenticationFailed
+from apps.scrapers.scraper_factory import ScraperFactory
+
+logger = logging.getLogger(__name__)
+
+VENDOR_SYNC_CONCURRENCY = 2
+# vendors logging in with Selenium run a browser per office vendor
+VENDOR_SYNC_CONCURRENCY_OVERRIDES = {"patterson": 1}
+# orders may show up on vendor side a few days after they were placed
+SYNC_OVERLAP_DAYS = 3
+
+
+class OrderSyncFailed(Exception):
+    pass
+
+
+class SyncPlan(NamedTuple):
+    completed_order_ids: List[str]
+    from_date: Optional[datetime.date]
+
+
+@dataclass
+class VendorSyncStats:
+    office_vendors: int = 0
+    failed: int = 0
+    orders: int = 0
+    duration: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.office_vendors} office vendors ({self.failed} failed), "
+            f"{self.orders} orders in {self.duration:.1f}s"
+        )
+
+
+def get_sync_plans(office_vendors: List[OfficeVendor]) -> Dict[int, SyncPlan]:
+    office_ids = {office_vendor.office_id for office_vendor in office_vendors}
+    vendor_ids = {office_vendor.vendor_id for office_vendor in office_vendors}
+    vendor_orders = VendorOrder.objects.filter(order__office_id__in=office_ids, vendor_id__in=vendor_ids)
+
+    completed_order_ids = defaultdict(list)
+    for office_id, vendor_id, vendor_slug, order_id, order_reference in (
+        vendor_orders.filter(status=OrderStatus.CLOSED)
+        .values_list("order__office_id", "vendor_id", "vendor__slug", "vendor_order_id", "vendor_order_reference")
+        .iterator()
+    ):
+        completed_order_ids[(office_id, vendor_id)].append(
+            order_reference if vendor_slug == "henry_schein" else order_id
+        )
+
+    oldest_open_order_dates = {
+        (row["order__office_id"], row["vendor_id"]): row["oldest"]
+        for row in vendor_orders.filter(status=OrderStatus.OPEN)
+        .values("order__office_id", "vendor_id")
+        .annotate(oldest=Min("order_date"))
+    }
+    synced_to = dict(
+        VendorOrderSync.objects.filter(office_vendor__in=office_vendors).values_list("office_vendor_id", "synced_to")
+    )
+
+    plans = {}
+    for office_vendor in office_vendors:
+        key = (office_vendor.office_id, office_vendor.vendor_id)
+        high_water_mark = synced_to.get(office_vendor.id)
+        from_date = oldest_open_order_dates.get(key)
+        if high_water_mark:
+            # open orders placed before the high-water mark still have to be refreshed
+            overlap_date = high_water_mark - datetime.timedelta(days=SYNC_OVERLAP_DAYS)
+            from_date = min(from_date, overlap_date) if from_date else overlap_date
+        plans[office_vendor.id] = SyncPlan(completed_order_ids=completed_order_ids[key], from_date=from_date)
+    return plans
+
+
+async def sync_office_vendor(
+    sem: asyncio.Semaphore,
+    session: ClientSession,
+    office_vendor: OfficeVendor,
+    plan: SyncPlan,
+    to_date: datetime.date,
+) -> int:
+    """Pull orders of the office vendor placed since the plan date, returning the number of saved orders"""
+    async with sem:
+        scraper = ScraperFactory.create_scraper(
+            vendor=office_vendor.vendor,
+            session=session,
+            username=office_vendor.username,
+            password=office_vendor.password,
+        )
+        if not hasattr(scraper, "get_orders"):
+            return 0
+        scraper.office_vendor_id = office_vendor.id
+        # scrapers mostly report a failed login by returning False instead of raising
+        if await scraper.authenticate() is False:
+            raise VendorAuthenticationFailed(f"Failed to log into office vendor {office_vendor.id}")
+
+        started = time.monotonic()
+        async with scraper.batch_orders(office_vendor.office) as ingestor:
+            await scraper.get_orders(
+                office=office_vendor.office,
+                perform_login=False,
+                from_date=plan.from_date,
+                to_date=to_date,
+                completed_order_ids=plan.completed_order_ids,
+            )
+        if ingestor.failed_batches:
+            # the high-water mark stays, so the next sync pulls the failed orders again
+            raise OrderSyncFailed(
+                f"{ingestor.failed_batches} order batches of office vendor {office_vendor.id} failed"
+            )
+        await VendorOrderSync.objects.aupdate_or_create(
+            office_vendor=office_vendor,
+            defaults={
+                "synced_to": to_date,
+                "last_duration": time.monotonic() - started,
+                "last_order_count": ingestor.ingested_orders,
+            },
+        )
+        return ingestor.ingested_orders
+
+
+async def sync_with_vendors(
+    office_vendors: List[OfficeVendor], plans: Dict[int, SyncPlan], to_date: datetime.date
+) -> Dict[str, VendorSyncStats]:
+    semaphores = {}
+    by_vendor = defaultdict(list)
+    for office_vendor in office_vendors:
+        slug = office_vendor.vendor.slug
+        if slug not in semaphores:
+            semaphores[slug] = asyncio.Semaphore(VENDOR_SYNC_CONCURRENCY_OVERRIDES.get(slug, VENDOR_SYNC_CONCURRENCY))
+        by_vendor[slug].append(office_vendor)
+
+    stats = defaultdict(VendorSyncStats)
+
+    async def sync_vendor(slug: str, vendor_office_vendors: List[OfficeVendor]):
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(
+                sync_office_vendor(semaphores[slug], session, office_vendor, plans[office_vendor.id], to_date)
+                for office_vendor in vendor_office_vendors
+            ),
+            return_exceptions=True,
+        )
+        vendor_stats = stats[slug]
+        vendor_stats.office_vendors = len(results)
+        vendor_stats.duration = time.monotonic() - started
+        for office_vendor, result in zip(vendor_office_vendors, results):
+            if isinstance(result, BaseException):
+                vendor_stats.failed += 1
+                logger.warning("Syncing orders of office vendor %s failed: %r", office_vendor.id, result)
+            else:
+                vendor_stats.orders += result
+
+    async with ClientSession(timeout=ClientTimeout(30)) as session:
+        await asyncio.gather(*(sync_vendor(slug, vendor_ovs) for slug, vendor_ovs in by_vendor.items()))
+
+    for slug, vendor_stats in sorted(stats.items()):
+        logger.info("Synced %s: %s", slug, vendor_stats)
+    return dict(stats)
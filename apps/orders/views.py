@@ -12,7 +12,7 @@ from datetime import timedelta
 from decimal import Decimal
 from functools import reduce
 from itertools import chain
-from typing import Union
+from typing import Optional, Union
 
 from asgiref.sync import sync_to_async
 from dateutil.relativedelta import relativedelta
@@ -20,7 +20,6 @@ from django.conf import settings
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.core.cache import cache
 from django.core.mail import send_mail
-from django.core.paginator import Paginator
 from django.db import models, transaction
 from django.db.models import (
     Case,
@@ -91,6 +90,7 @@ from apps.orders.helpers import (
     ProductHelper,
 )
 from apps.orders.services.order import OrderService
+from apps.scrapers import invoices
 from apps.scrapers.ebay_search import EbaySearch
 from apps.scrapers.errors import VendorNotSupported
 from apps.scrapers.scraper_factory import ScraperFactory
@@ -103,7 +103,7 @@ from services.api_client import (
     DentalCityOrderDetail,
     DentalCityShippingInfo,
 )
-from services.opendental import OpenDentalClient
+from services.opendental import query_template as query_opendental_template
 
 from ..accounts.helper import BudgetwiseSpend, OfficeBudgetHelper
 from ..accounts.views.crazy_dental_integration import (
@@ -147,6 +147,8 @@ class OrderViewSet(AsyncMixin, ModelViewSet):
                 continue
             ret.append(
                 {
+                    "id": vendor_order.id,
+                    "office_vendor_id": office_vendors[vendor_order.vendor.id].id,
                     "vendor_order_id": vendor_order.vendor_order_id,
                     "invoice_link": vendor_order.invoice_link,
                     "vendor": vendor_order.vendor,
@@ -203,9 +205,13 @@ class OrderViewSet(AsyncMixin, ModelViewSet):
                 username=vendor_order["username"],
                 password=vendor_order["password"],
             )
+            scraper.office_vendor_id = vendor_order["office_vendor_id"]
             tasks.append(
-                scraper.download_invoice(
-                    invoice_link=vendor_order["invoice_link"], order_id=vendor_order["vendor_order_id"]
+                invoices.get_invoice(
+                    scraper,
+                    vendor_order["id"],
+                    invoice_link=vendor_order["invoice_link"],
+                    order_id=vendor_order["vendor_order_id"],
                 )
             )
         ret = await asyncio.gather(*tasks, return_exceptions=True)
@@ -430,6 +436,8 @@ class VendorOrderViewSet(AsyncMixin, ModelViewSet):
             return {"is_invoice_available": None}
         else:
             return {
+                "id": vendor_order.id,
+                "office_vendor_id": office_vendor.id,
                 "vendor_order_id": vendor_order.vendor_order_id,
                 "order_date": vendor_order.order_date,
                 "invoice_link": vendor_order.invoice_link,
@@ -489,7 +497,10 @@ class VendorOrderViewSet(AsyncMixin, ModelViewSet):
             username=vendor_order["username"],
             password=vendor_order["password"],
         )
-        content = await scraper.download_invoice(
+        scraper.office_vendor_id = vendor_order["office_vendor_id"]
+        content = await invoices.get_invoice(
+            scraper,
+            vendor_order["id"],
             invoice_link=vendor_order["invoice_link"],
             order_id=vendor_order["vendor_order_id"],
             vendor=vendor_order["vendor"].name,
@@ -2114,6 +2125,7 @@ class SearchProductAPIView(AsyncMixin, APIView, SearchProductPagination):
                 )
             except VendorNotSupported:
                 continue
+            scraper.office_vendor_id = office_vendor.id
             current_page = vendors_meta.get(vendor_slug, {}).get("page", 0)
             tasks.append(
                 scraper.search_products(query=keyword, page=current_page + 1, min_price=min_price, max_price=max_price)
@@ -2203,7 +2215,7 @@ class ProductV2ViewSet(AsyncMixin, ModelViewSet):
     # filterset_class = f.ProductV2Filter
     http_method_names = ["get"]
 
-    def get_queryset(self):
+    def get_queryset(self, offset: int = 0, limit: Optional[int] = None):
         query = self.request.GET.get("search", "")
         SearchHistory.objects.create(user=self.request.user, query=query)
         office_pk = self.request.query_params.get("office_pk")
@@ -2216,7 +2228,7 @@ class ProductV2ViewSet(AsyncMixin, ModelViewSet):
 
         selected_products = selected_products.split(",") if selected_products else []
         print("selected_products", selected_products)
-        products, available_vendors = ProductHelper.get_products_v3(
+        products, available_vendors, total = ProductHelper.get_products_v3(
             query=query,
             office=office_pk,
             fetch_parents=True,
@@ -2224,8 +2236,11 @@ class ProductV2ViewSet(AsyncMixin, ModelViewSet):
             vendors=vendors,
             price_from=price_from,
             price_to=price_to,
+            offset=offset,
+            limit=limit,
         )
         self.available_vendors = available_vendors
+        self.total_products = total
         print("products", products)
         print("available_vendors", available_vendors)
         return products
@@ -2256,9 +2271,13 @@ class ProductV2ViewSet(AsyncMixin, ModelViewSet):
         price_from = self.request.query_params.get("price_from")
         price_to = self.request.query_params.get("price_to")
 
-        queryset = self.get_queryset()
         count_per_page = int(self.request.query_params.get("per_page", 10))
         current_page = int(self.request.query_params.get("page", 1))
+        if current_page < 1 or count_per_page < 1:
+            return Response({"message": "The page number is incorrect!"}, status=HTTP_400_BAD_REQUEST)
+        bottom = (current_page - 1) * count_per_page
+        top = bottom + count_per_page
+        queryset = self.get_queryset(offset=bottom, limit=count_per_page)
 
         # Temporarily block Amazon Search
         # if "amazon" in vendors:
@@ -2275,9 +2294,8 @@ class ProductV2ViewSet(AsyncMixin, ModelViewSet):
         #         amazon_product_ids = [i["product_id"] for i in products_fly["products"]]
         #         queryset = queryset | Product.objects.filter(product_id__in=amazon_product_ids)
 
-        # Fetching one more item to make sure if there is some more
-        queryset = queryset[: current_page * count_per_page + 1]
         product_list = list(queryset)
+        total = self.total_products
 
         if "ebay" in vendors:
             try:
@@ -2285,61 +2303,52 @@ class ProductV2ViewSet(AsyncMixin, ModelViewSet):
 
                 if ebay_products:
                     self.available_vendors.append("ebay")
-                    product_list.extend(ebay_products)
+                    # ebay products come after all the searched ones
+                    product_list.extend(ebay_products[max(bottom - total, 0) :])
+                    total += len(ebay_products)
             except Exception:  # noqa
                 print("Ebay search exception")
 
-        pagination_obj = Paginator(product_list, count_per_page)
-
         ret = {
             "vendor_slugs": getattr(self, "available_vendors", None),
             "products": [],
         }
 
-        if current_page < 1 or pagination_obj.num_pages < current_page:
+        if current_page > 1 and bottom >= total:
             return Response({"message": "The page number is incorrect!"}, status=HTTP_400_BAD_REQUEST)
 
-        page = pagination_obj.page(current_page)
-
-        if page is not None:
-            product_data = []
-            for page_item in page:
-                if isinstance(page_item, m.Product):
-                    serializer = self.get_serializer(page_item)
-                    serialized_data = serializer.data
-                    serialized_data["searched_data"] = False
-                    product_data.append(serialized_data)
-                else:
-                    page_item["searched_data"] = True
-                    product_data.append(page_item)
-            ret["products"] = product_data
-            bottom = (current_page - 1) * count_per_page
-            top = bottom + count_per_page
-
-            if price_to is not None or price_from is not None:
-                ret["products"].sort(
-                    key=lambda parent: float(parent["children"][0]["product_price"])
-                    if parent["children"]
-                    else float("inf")
-                )
-
-            return Response(
-                {
-                    "total": -1,
-                    "from": bottom + 1,
-                    "to": top,
-                    "per_page": count_per_page,
-                    "current_page": page.number,
-                    "next_page": page.next_page_number() if page.has_next() else None,
-                    "prev_page": page.previous_page_number() if page.has_previous() else None,
-                    "data": ret,
-                    # "log": log,
-                }
+        product_data = []
+        for page_item in product_list[:count_per_page]:
+            if isinstance(page_item, m.Product):
+                serializer = self.get_serializer(page_item)
+                serialized_data = serializer.data
+                serialized_data["searched_data"] = False
+                product_data.append(serialized_data)
+            else:
+                page_item["searched_data"] = True
+                product_data.append(page_item)
+        ret["products"] = product_data
+
+        if price_to is not None or price_from is not None:
+            ret["products"].sort(
+                key=lambda parent: float(parent["children"][0]["product_price"])
+                if parent["children"]
+                else float("inf")
             )
 
-        serializer = self.get_serializer(product_list, many=True)
-        ret["products"] = serializer.data
-        return Response(ret)
+        return Response(
+            {
+                "total": total,
+                "from": bottom + 1,
+                "to": top,
+                "per_page": count_per_page,
+                "current_page": current_page,
+                "next_page": current_page + 1 if total > top else None,
+                "prev_page": current_page - 1 if current_page > 1 else None,
+                "data": ret,
+                # "log": log,
+            }
+        )
 
     @action(detail=False, url_path="search/vendors")
     async def search_from_vendors(self, request, *args, **kwargs):
@@ -2455,11 +2464,13 @@ class ProcedureViewSet(AsyncMixin, ModelViewSet):
 
         ret_schedule = []
         try:
-            with open("query/proc_schedule.sql", "r") as f:
-                raw_sql = f.read()
-            query = raw_sql.format(day_from=(day_from if day_from > today else today), day_to=day_to, codes="")
-            od_client = OpenDentalClient(dental_api.key)
-            ret_schedule, status = od_client.query(query)
+            ret_schedule, status = query_opendental_template(
+                dental_api.key,
+                "proc_schedule",
+                day_from=(day_from if day_from > today else today),
+                day_to=day_to,
+                codes="",
+            )
             if status != HTTP_200_OK:
                 return Response(status=status, data={"message": f"{ret_schedule}"})
         except Exception as e:
@@ -2556,20 +2567,17 @@ class ProcedureViewSet(AsyncMixin, ModelViewSet):
                 proc_total[code]["avg_count"] = round(count * get_week_count(day_range) / 12)
 
         try:
-            od_client = OpenDentalClient(dental_api)
             # This might be needed later to grab data from db.
-            # with open("query/proc_result_new.sql", "r") as f:
-            #     raw_sql = f.read()
-            # query = raw_sql.format(day_from=day_from, day_to=day_to, proc_codes=proccodes_comma)
-            # json_procedure = od_client.query(query)[0]
+            # query_opendental_template(dental_api.key, "proc_result_new", day_from, day_to, proc_codes=proccodes_comma)
 
-            with open(settings.BASE_DIR / "query/proc_schedule.sql", "r") as f:
-                raw_sql = f.read()
             proccodes_dash = "|".join(proc_total.keys())
-            query = raw_sql.format(
-                day_from=(day_from if day_from > today else today), day_to=day_to, codes=proccodes_dash
+            ret_schedule, status = query_opendental_template(
+                dental_api.key,
+                "proc_schedule",
+                day_from=(day_from if day_from > today else today),
+                day_to=day_to,
+                codes=proccodes_dash,
             )
-            ret_schedule, status = od_client.query(query)
             if status != HTTP_200_OK:
                 return Response(status=status, data={"message": f"{ret_schedule}"})
             for item in ret_schedule:
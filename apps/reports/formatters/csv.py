@@ -1,43 +1,57 @@
 import csv
 import io
 import re
-from typing import List, NamedTuple
+from typing import Iterable, Iterator, List, NamedTuple
 
+CSV_FLUSH_ROWS = 1000
 
-def export_to_csv(rows: List) -> str:
+
+def format_row(row) -> list:
+    # Check if each attribute is not None before replacing '\n' with ''
+    if row.item_description is not None:
+        item_description = re.sub(r"\n+", " ", row.item_description)
+    else:
+        item_description = ""
+
+    #
+    item_description = item_description.split("  ")[0]
+    item_description = item_description.split(" 	")[0]
+    item_description = item_description.replace("\n", "") if item_description is not None else ""
+
+    category = row.category.replace("\n", "") if row.category is not None else ""
+    nickname = row.nickname.replace("\n", "") if row.nickname is not None else ""
+    last_ordered_from = row.last_ordered_from.replace("\n", "") if row.last_ordered_from is not None else ""
+    last_ordered_price = row.last_ordered_price
+
+    return [
+        category,
+        item_description,
+        nickname,
+        last_ordered_from,
+        row.last_ordered_on,
+        last_ordered_price,
+        row.last_quantity_ordered,
+    ]
+
+
+def iter_csv(fieldnames: Iterable[str], chunks: Iterable[List], flush_rows: int = CSV_FLUSH_ROWS) -> Iterator[str]:
+    """Yield the CSV in pieces of at most `flush_rows` rows while consuming chunks of rows"""
     buffer = io.StringIO()
     writer = csv.writer(buffer)
-    nt_class: NamedTuple = rows[0].__class__
-    fieldnames = nt_class._fields
     writer.writerow(fieldnames)
+    buffered_rows = 0
+    for rows in chunks:
+        for row in rows:
+            writer.writerow(format_row(row))
+            buffered_rows += 1
+            if buffered_rows >= flush_rows:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                buffered_rows = 0
+    yield buffer.getvalue()
+
 
-    for row in rows:
-        # Check if each attribute is not None before replacing '\n' with ''
-        if row.item_description is not None:
-            item_description = re.sub(r"\n+", " ", row.item_description)
-        else:
-            item_description = ""
-
-        #
-        item_description = item_description.split("  ")[0]
-        item_description = item_description.split(" 	")[0]
-        item_description = item_description.replace("\n", "") if item_description is not None else ""
-
-        category = row.category.replace("\n", "") if row.category is not None else ""
-        nickname = row.nickname.replace("\n", "") if row.nickname is not None else ""
-        last_ordered_from = row.last_ordered_from.replace("\n", "") if row.last_ordered_from is not None else ""
-        last_ordered_price = row.last_ordered_price
-
-        writer.writerow(
-            [
-                category,
-                item_description,
-                nickname,
-                last_ordered_from,
-                row.last_ordered_on,
-                last_ordered_price,
-                row.last_quantity_ordered,
-            ]
-        )
-
-    return buffer.getvalue()
+def export_to_csv(rows: List) -> str:
+    nt_class: NamedTuple = rows[0].__class__
+    return "".join(iter_csv(nt_class._fields, [rows]))
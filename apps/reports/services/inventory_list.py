@@ -1,9 +1,11 @@
 import datetime
 import decimal
-from typing import NamedTuple
+from typing import Iterator, List, NamedTuple
 
 from django.db import connection
 
+REPORT_CHUNK_SIZE = 2000
+
 
 class InventoryItem(NamedTuple):
     category: str
@@ -52,3 +54,11 @@ def inventory_list(office_id: int):
         cur.execute(REPORT_SQL, {"office_id": office_id})
         result = [InventoryItem(*row) for row in cur.fetchall()]
     return result
+
+
+def iter_inventory_list(office_id: int, chunk_size: int = REPORT_CHUNK_SIZE) -> Iterator[List[InventoryItem]]:
+    """Yield chunks of the report read through a server-side cursor, so rows aren't loaded all at once"""
+    with connection.chunked_cursor() as cur:
+        cur.execute(REPORT_SQL, {"office_id": office_id})
+        while rows := cur.fetchmany(chunk_size):
+            yield [InventoryItem(*row) for row in rows]
@@ -0,0 +1,58 @@
+import asyncio
+import datetime
+import decimal
+
+from apps.reports.formatters.csv import export_to_csv, iter_csv
+from apps.reports.services.inventory_list import InventoryItem
+from apps.reports.utils import iterate_in_thread
+
+
+def make_item(i: int) -> InventoryItem:
+    return InventoryItem(
+        category="Gloves\n",
+        item_description=f"Nitrile gloves {i}\n\nsize M",
+        nickname=None,
+        last_ordered_from="Henry Schein",
+        last_ordered_on=datetime.date(2023, 1, 1),
+        last_quantity_ordered=i,
+        last_ordered_price=decimal.Decimal("9.99"),
+    )
+
+
+def test_streamed_csv_matches_export():
+    rows = [make_item(i) for i in range(25)]
+    chunks = [rows[i : i + 10] for i in range(0, len(rows), 10)]
+
+    pieces = list(iter_csv(InventoryItem._fields, chunks, flush_rows=7))
+
+    assert "".join(pieces) == export_to_csv(rows)
+    assert len(pieces) == 4
+    assert pieces[0].startswith("category,item_description,")
+    assert "Nitrile gloves 0 size M" in pieces[0]
+
+
+def test_empty_report_has_header():
+    assert "".join(iter_csv(InventoryItem._fields, [])).startswith("category,")
+
+
+def test_iterate_in_thread_closes_iterator():
+    closed = []
+
+    def pieces():
+        try:
+            yield from ["a", "b", "c"]
+        finally:
+            closed.append(True)
+
+    async def take_two():
+        result = []
+        iterator = iterate_in_thread(pieces())
+        async for piece in iterator:
+            result.append(piece)
+            if len(result) == 2:
+                break
+        await iterator.aclose()
+        return result
+
+    assert asyncio.run(take_two()) == ["a", "b"]
+    assert closed == [True]
@@ -1,5 +1,10 @@
+from typing import AsyncIterator, Iterator, TypeVar
 from urllib.parse import quote
 
+from asgiref.sync import sync_to_async
+
+T = TypeVar("T")
+
 
 def get_content_disposition_header(filename):
     try:
@@ -7,4 +12,21 @@ def get_content_disposition_header(filename):
         file_expr = 'filename="{}"'.format(filename)
     except UnicodeEncodeError:
         file_expr = "filename*=utf-8''{}".format(quote(filename))
-    return f"attachment; {file_expr}"
\ No newline at end of file
+    return f"attachment; {file_expr}"
+
+
+async def iterate_in_thread(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Consume a sync iterator piece by piece from the thread running sync code,
+    so an ASGI StreamingHttpResponse sends every piece as it's ready instead of collecting the iterator first.
+    The thread is kept, so database cursors opened by the iterator stay on their connection.
+    """
+    sentinel = object()
+    next_piece = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (piece := await next_piece(iterator, sentinel)) is not sentinel:
+            yield piece
+    finally:
+        # closing a generator exits its cursor and transaction blocks in the same thread
+        if hasattr(iterator, "close"):
+            await sync_to_async(iterator.close, thread_sensitive=True)()
@@ -1,12 +1,12 @@
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.views import APIView
 
 from apps.accounts.models import CompanyMember, Office, User
-from apps.reports.formatters.csv import export_to_csv
-from apps.reports.services.inventory_list import inventory_list
-from apps.reports.utils import get_content_disposition_header
+from apps.reports.formatters.csv import iter_csv
+from apps.reports.services.inventory_list import InventoryItem, iter_inventory_list
+from apps.reports.utils import get_content_disposition_header, iterate_in_thread
 
 
 class InventoryListAPIView(APIView):
@@ -18,9 +18,9 @@ class InventoryListAPIView(APIView):
             raise ValidationError("Office does not exist")
         if not CompanyMember.objects.filter(office_id=office.id, user=user).exists():
             raise PermissionDenied("User does not have permissions to access this endpoint")
-        rows = inventory_list(office_id)
+        content = iter_csv(InventoryItem._fields, iter_inventory_list(office.id))
         date_str = timezone.localtime().strftime("%Y%m%d%H%M")
-        response = HttpResponse(export_to_csv(rows), content_type="text/csv")
+        response = StreamingHttpResponse(iterate_in_thread(content), content_type="text/csv")
         filename = f"{office.name}-{date_str}.csv"
         response.headers["Content-Disposition"] = get_content_disposition_header(filename)
         return response
@@ -7,6 +7,7 @@ import time
 import traceback
 import uuid
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from decimal import Decimal
 from http.cookies import SimpleCookie
 from typing import Dict, List, Optional, Tuple, Union
@@ -23,15 +24,15 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from slugify import slugify
 
-from apps.accounts.constants import DEFAULT_FRONT_OFFICE_BUDGET_VENDORS
 from apps.accounts.helper import OfficeBudgetHelper
 from apps.accounts.models import OfficeVendor, ShippingMethod, Subaccount
 from apps.common import messages as msgs
-from apps.common.choices import BUDGET_SPEND_TYPE, OrderType
 from apps.common.month import Month
 from apps.orders.services.product import ProductService
 from apps.scrapers.errors import DownloadInvoiceError, VendorAuthenticationFailed
+from apps.scrapers import invoices
 from apps.scrapers.headers.base import HTTP_HEADERS
+from apps.scrapers.order_ingestion import OrderIngestor
 from apps.scrapers.schema import Order, Product, ProductCategory, VendorOrderDetail
 from apps.scrapers.semaphore import fake_semaphore
 from apps.scrapers.utils import catch_network, semaphore_coroutine
@@ -45,6 +46,7 @@ from apps.types.scraper import (
     ProductSearch,
     SmartProductID,
 )
+from apps.vendor_clients import session_store
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +55,8 @@ class Scraper:
     aiohttp_mode = True
     selenium_mode = False
     selenium_mode_headless = True
+    # page served only to logged in users, restored sessions are checked against it
+    SESSION_CHECK_URL: Optional[str] = None
 
 
     def __init__(
@@ -69,6 +73,9 @@ class Scraper:
         self.password = password
         self.orders = {}
         self.objs = {"product_categories": defaultdict(dict)}
+        self.order_ingestor: Optional[OrderIngestor] = None
+        # set to share authenticated sessions of the office vendor through the session store
+        self.office_vendor_id: Optional[int] = None
         self.logged_in = True
         self.ssl_context = ssl.create_default_context(cafile=certifi.where())
         self.driver = self.setup_driver(self.selenium_mode_headless) if self.selenium_mode else None
@@ -220,13 +227,30 @@ class Scraper:
 
             except VendorAuthenticationFailed as auth_error:
                 logger.error("VendorAuthenticationFailed: %s", auth_error)
+                return False
 
             except Exception as e:
                 logger.error("An unexpected error occurred: %s", e)
+                return False
 
     async def _check_authenticated(self, response: Union[ClientResponse, Response]) -> bool:
         return True
 
+    def can_check_session(self) -> bool:
+        return self.SESSION_CHECK_URL is not None
+
+    async def check_session(self) -> bool:
+        """Check whether restored session cookies are still authenticated"""
+        if self.SESSION_CHECK_URL is None:
+            # unchecked sessions are stored only for a short while
+            return True
+        return await session_store.is_authenticated_page(self.session, self.SESSION_CHECK_URL, headers=HTTP_HEADERS)
+
+    async def authenticate(self, force: bool = False):
+        if self.office_vendor_id is None:
+            return await self.login()
+        return await session_store.login(self, self.office_vendor_id, force=force)
+
     async def _get_login_data(self, *args, **kwargs) -> LoginInformation:
         pass
 
@@ -315,7 +339,7 @@ class Scraper:
             raise DownloadInvoiceError(f"{self.vendor} does not implement Downloading Invoice")
 
         if vendor != 'Benco':
-            await self.login()
+            await self.authenticate()
 
         if hasattr(self, "_download_invoice") and callable(self._download_invoice) and vendor != 'Benco':
             self.content = await self._download_invoice(**kwargs)
@@ -372,47 +396,46 @@ class Scraper:
         return html_content.encode("utf-8")
 
     async def html2pdf(self, data: InvoiceFile):
-        return await self.run_command(
-            cmd="xvfb-run -a -s '-screen 0 1024x768x24' wkhtmltopdf --quiet - - | cat", data=data
-        )
+        return await invoices.renderer.render(data)
+
+    def get_product_category(self, category_hierarchy: Optional[List[str]], vendor_slug: str):
+        """Return category matching the vendor root category, "other" category if there is no match"""
+        from apps.orders.models import ProductCategory as ProductCategoryModel
+
+        other_category = self.objs["product_categories"].get("other_category", None)
+        if other_category is None:
+            other_category = ProductCategoryModel.objects.filter(slug="other").first()
+            self.objs["product_categories"]["other_category"] = other_category
+
+        if category_hierarchy:
+            product_root_category = slugify(category_hierarchy[0])
+            product_category = self.objs["product_categories"].get(product_root_category, None)
+            if product_category is None:
+                q = {f"vendor_categories__{vendor_slug}__contains": product_root_category}
+                product_category = ProductCategoryModel.objects.filter(**q).first()
+                self.objs["product_categories"][product_root_category] = product_category
+        else:
+            product_category = None
+        logger.debug("Product category: %s", product_category)
+        return product_category or other_category
 
     def save_single_product_to_db(self, product_data, office=None, is_inventory=False, keyword=None, order_date=None):
         """save product to product table"""
         try:
             logger.debug("Saving %s to db", product_data)
-            from django.db.models import Q
-
             from apps.orders.models import OfficeProduct as OfficeProductModel
             from apps.orders.models import (
                 OfficeProductCategory as OfficeProductCategoryModel,
             )
             from apps.orders.models import Product as ProductModel
-            from apps.orders.models import ProductCategory as ProductCategoryModel
             from apps.orders.models import ProductImage as ProductImageModel
 
-            other_category = self.objs["product_categories"].get("other_category", None)
-            if other_category is None:
-                other_category = ProductCategoryModel.objects.filter(slug="other").first()
-                self.objs["product_categories"]["other_category"] = other_category
-
             vendor_data = product_data.pop("vendor")
             product_images = product_data.pop("images", [])
             product_id = product_data.pop("product_id")
             product_category_hierarchy = product_data.pop("category")
 
-            if product_category_hierarchy:
-                product_root_category = slugify(product_category_hierarchy[0])
-                product_category = self.objs["product_categories"].get(product_root_category, None)
-                if product_category is None:
-                    q = {f"vendor_categories__{vendor_data['slug']}__contains": product_root_category}
-                    q = Q(**q)
-                    product_category = ProductCategoryModel.objects.filter(q).first()
-                    self.objs["product_categories"][product_root_category] = product_category
-            else:
-                product_category = None
-            logger.debug("Product category: %s", product_category)
-
-            product_data["category"] = product_category or other_category
+            product_data["category"] = self.get_product_category(product_category_hierarchy, vendor_data["slug"])
             product_price = product_data.pop("price")
             if "nickname" in product_data:
                 product_data.pop("nickname")
@@ -495,92 +518,6 @@ class Scraper:
             traceback.print_exc()
         return []
 
-    def find_vendor_order(self, office, order_data: dict, order_products: list):
-        from apps.orders.models import VendorOrder as VendorOrderModel
-
-        vendor_order_reference = order_data.get("vendor_order_reference", "")
-        order_id = order_data.get("order_id", "")
-
-        # Try vendor order reference first
-        logger.info("venor_order_reference = %s", vendor_order_reference)
-        if vendor_order_reference:
-            vendor_order = VendorOrderModel.objects.filter(
-                order__office=office, vendor=self.vendor, vendor_order_reference=vendor_order_reference
-            ).first()
-            if vendor_order:
-                logger.info("Found vendor order id=%s by reference", vendor_order.id)
-                return vendor_order
-
-        # Try order_id
-        logger.info("Order ID = %s", order_id)
-        if order_id:
-            vendor_order = VendorOrderModel.objects.filter(
-                order__office=office, vendor=self.vendor, vendor_order_id=order_id
-            ).first()
-            if vendor_order:
-                logger.info("Found vendor order id=%s by order ID", vendor_order.id)
-                return vendor_order
-
-        # Try to find by date and products
-        open_vendor_orders = list(
-            VendorOrderModel.objects.filter(
-                order__office=office, vendor=self.vendor, order_date=order_data["order_date"]
-            )
-        )
-        logger.info("Total vendor orders to look through - %s", len(open_vendor_orders))
-        for vendor_order in open_vendor_orders:
-            vendor_order_products = list(vendor_order.order_products.select_related("product"))
-            origin_product_ids = {i.product.product_id for i in vendor_order_products}
-            coming_product_ids = {o["product"]["product_id"] for o in order_products}
-            product_match = (
-                any(origin_product_ids) and any(coming_product_ids) and origin_product_ids == coming_product_ids
-            )
-            logger.info(
-                "DB product ids = %s, data product ids = %s. Match? %s",
-                origin_product_ids,
-                coming_product_ids,
-                product_match,
-            )
-            if product_match:
-                return vendor_order
-        logger.info("Vendor order was not found in db")
-
-    def create_vendor_order(self, order_data, order_products, office):
-        from apps.orders.models import Order as OrderModel
-        from apps.orders.models import VendorOrder as VendorOrderModel
-
-        logger.debug("Create new vendor order information")
-        order = OrderModel.objects.create(
-            office=office,
-            status=order_data["status"],
-            order_date=order_data["order_date"],
-            total_items=order_data["total_items"],
-            total_amount=order_data["total_amount"],
-            order_type=OrderType.VENDOR_DIRECT,
-        )
-        vendor_order = VendorOrderModel.from_dataclass(vendor=self.vendor, order=order, dict_data=order_data)
-        return vendor_order
-
-    def update_vendor_order(self, vendor_order, order_data, order_products):
-        logger.info("Updating vendor order")
-        vendor_order.vendor_order_id = order_data["order_id"]
-        vendor_order.status = order_data["status"]
-        vendor_order.vendor_order_reference = order_data.get("vendor_order_reference", "")
-        vendor_order.total_amount = Decimal(order_data.get("total_amount", 0.0))
-        vendor_order.invoice_link = order_data.get("invoice_link", "")
-        vendor_order.save()
-
-        vendor_order_products = vendor_order.order_products.select_related("product")
-        for order_product in order_products:
-            vendor_order_product = vendor_order_products.filter(
-                product__product_id=order_product["product"]["product_id"]
-            ).first()
-            if not vendor_order_product:
-                continue
-            vendor_order_product.status = self.normalize_order_product_status(order_product["status"])
-            vendor_order_product.tracking_link = order_product.get("tracking_link")
-            vendor_order_product.save()
-
     def adjust_office_budget(self, office, vendor_order):
         order_date = vendor_order.order_date
 
@@ -600,55 +537,23 @@ class Scraper:
             spend=F("spend") + vendor_order.total_amount
         )
 
-    @sync_to_async
-    def save_order_to_db(self, office, order: Order):
+    @asynccontextmanager
+    async def batch_orders(self, office):
+        """Collect orders saved with `save_order_to_db` and write them to the database in batches"""
+        self.order_ingestor = OrderIngestor(self, office)
         try:
-            logger.debug("Saving order to db: %s", order)
-            from apps.orders.models import VendorOrderProduct as VendorOrderProductModel
-
-            order_data = order.to_dict()
-
-            order_data.pop("shipping_address")
-            order_products = order_data.pop("products")
+            yield self.order_ingestor
+            await self.order_ingestor.flush()
+        finally:
+            self.order_ingestor = None
 
-            order_data["vendor_status"] = order_data["status"]
-            order_data["status"] = Scraper.normalize_order_status(order_data["vendor_status"])
-            order_date = order_data["order_date"]
-
-            vendor_order = Scraper.find_vendor_order(self, office, order_data, order_products)
-            if vendor_order:
-                Scraper.update_vendor_order(self, vendor_order, order_data, order_products)
+    async def save_order_to_db(self, office, order: Order):
+        logger.debug("Saving order to db: %s", order)
+        try:
+            if self.order_ingestor is not None and self.order_ingestor.office == office:
+                await self.order_ingestor.add(order)
             else:
-                logger.info("Creating vendor order")
-                vendor_order = Scraper.create_vendor_order(self, order_data, order_products, office)
-            for order_product in order_products:
-                product_data = order_product.pop("product")
-                product, _ = self.save_single_product_to_db(
-                    product_data, office, is_inventory=True, order_date=order_date
-                )
-                order_product["vendor_status"] = order_product["status"]
-                order_product["status"] = Scraper.normalize_order_product_status(order_product["vendor_status"])
-                if vendor_order.vendor.slug in DEFAULT_FRONT_OFFICE_BUDGET_VENDORS:
-                    order_product["budget_spend_type"] = BUDGET_SPEND_TYPE.FRONT_OFFICE_SUPPLY_SPEND_BUDGET.value
-                else:
-                    order_product["budget_spend_type"] = BUDGET_SPEND_TYPE.DENTAL_SUPPLY_SPEND_BUDGET.value
-
-                logger.debug(
-                    "Setting status to %s, spend_type to %s",
-                    order_product["status"],
-                    order_product["budget_spend_type"],
-                )
-                print("vendor_order =====", vendor_order)
-                print("product ======", product)
-                print("order_product ===, order_product", order_product)
-                vop, created = VendorOrderProductModel.objects.update_or_create(
-                    vendor_order=vendor_order,
-                    product=product,
-                    defaults=order_product,
-                )
-                logger.debug("Vendor order product %s, created=%s", vop, created)
-                print("!!!!!!!!!!!!!!!!!!!!!!!!!vop!!!!!!!!!!!!!created", vop, created)
-            print("Vendor order product done")
+                await sync_to_async(OrderIngestor(self, office).ingest)([order])
         except Exception as e:
             print(f"An error occurred ----: {e}")
             # Handle the error as per your requirement
@@ -708,7 +613,7 @@ class Scraper:
         page_size = 0
 
         if self.vendor.slug not in ["ultradent", "amazon"]:
-            await self.login()
+            await self.authenticate()
 
         while True:
             product_search = await self._search_products(
@@ -784,7 +689,7 @@ class Scraper:
         if self.vendor.slug == "ultradent":
             return
 
-        await self.login()
+        await self.authenticate()
 
         page = 1
         products_objs = []
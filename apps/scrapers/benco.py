@@ -86,6 +86,13 @@ class BencoScraper(Scraper):
             except IndexError:
                 return True, {}
 
+    def can_check_session(self) -> bool:
+        return True
+
+    async def check_session(self) -> bool:
+        is_already_login, _ = await self._get_check_login_state()
+        return is_already_login
+
     async def _get_login_data(self, *args, **kwargs) -> LoginInformation:
         async with self.session.get("https://shop.benco.com/Login/Login", headers=PRE_LOGIN_HEADERS) as resp:
             text = await resp.text()
@@ -54,6 +54,7 @@ class DentalCityScraper(Scraper):
     TRACKING_BASE_URL = "https://narvar.com/tracking/itemvisibility/v1/henryschein-dental/orders"
     INVOICE_TYPE = InvoiceType.HTML_INVOICE
     INVOICE_FORMAT = InvoiceFormat.USE_ORDO_FORMAT
+    SESSION_CHECK_URL = "https://www.dentalcity.com/profile/myorders/"
 
     async def _check_authenticated(self, response: ClientResponse) -> bool:
         text = await response.text()
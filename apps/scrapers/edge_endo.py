@@ -128,6 +128,7 @@ class EdgeEndoScraper(Scraper):
     sleepAmount = 10
     driver = None
     BASE_URL = "https://store.edgeendo.com"
+    SESSION_CHECK_URL = "https://store.edgeendo.com/account.aspx"
 
     def setup_driver(self):
         user_agent = (
@@ -76,6 +76,7 @@ class HenryScheinScraper(Scraper):
     TRACKING_BASE_URL = "https://narvar.com/tracking/itemvisibility/v1/henryschein-dental/orders"
     INVOICE_TYPE = InvoiceType.PDF_INVOICE
     INVOICE_FORMAT = InvoiceFormat.USE_VENDOR_FORMAT
+    SESSION_CHECK_URL = "https://www.henryschein.com/us-en/Orders/OrderStatus.aspx"
 
     def update_vendor_products_price(self, vendor_slug, office_id=None):
         try:
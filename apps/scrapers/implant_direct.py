@@ -52,6 +52,7 @@ class ImplantDirectScraper(Scraper):
     INVOICE_TYPE = InvoiceType.HTML_INVOICE
     INVOICE_FORMAT = InvoiceFormat.USE_VENDOR_FORMAT
     BASE_URL = "https://store.implantdirect.com"
+    SESSION_CHECK_URL = "https://store.implantdirect.com/us/en/customer/account/"
 
     def extractContent(dom, xpath):
         return re.sub(r"\s+", " ", " ".join(dom.xpath(xpath).extract())).strip()
@@ -0,0 +1,173 @@
+"""
+Rendering and caching of vendor order invoices.
+
+Downloaded (and rendered) invoices are stored in private storage under a key of the vendor order
+and its invoice link, so downloading an invoice again doesn't log into the vendor nor render it again.
+HTML invoices are rendered by wkhtmltopdf on a single long running Xvfb display
+with a limited number of renders at once, instead of starting a new X server for every invoice.
+"""
+
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import ClientSession, ClientTimeout
+from asgiref.sync import sync_to_async
+from django.core.files.base import ContentFile
+
+from apps.common.storage_backends import PrivateMediaStorage
+from apps.scrapers.errors import DownloadInvoiceError
+from apps.types.scraper import InvoiceFile
+
+logger = logging.getLogger(__name__)
+
+INVOICE_RENDER_CONCURRENCY = 2
+XVFB_SCREEN = "1024x768x24"
+
+_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+
+class InvoiceRenderer:
+    """Renders HTML into PDF with wkhtmltopdf, sharing one Xvfb display between renders"""
+
+    def __init__(self, concurrency: int = INVOICE_RENDER_CONCURRENCY):
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="invoice-renderer")
+        self.xvfb: Optional[subprocess.Popen] = None
+        self.display: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _start_xvfb(self) -> Optional[str]:
+        read_fd, write_fd = os.pipe()
+        try:
+            # Xvfb picks a free display number and writes it to the given file descriptor once it is ready
+            self.xvfb = subprocess.Popen(
+                ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"],
+                pass_fds=(write_fd,),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        finally:
+            os.close(write_fd)
+        with os.fdopen(read_fd) as display_file:
+            display = display_file.readline().strip()
+        if not display:
+            logger.warning("Xvfb exited with %s before reporting a display", self.xvfb.wait())
+            self.xvfb = None
+            return None
+        logger.info("Started Xvfb on display :%s", display)
+        return f":{display}"
+
+    def get_display(self) -> Optional[str]:
+        with self._lock:
+            if self.xvfb is None or self.xvfb.poll() is not None:
+                self.display = self._start_xvfb() if shutil.which("Xvfb") else None
+            return self.display
+
+    def render_sync(self, data: bytes) -> bytes:
+        display = self.get_display()
+        if display is None:
+            cmd = ["xvfb-run", "-a", "-s", f"-screen 0 {XVFB_SCREEN}", "wkhtmltopdf", "--quiet", "-", "-"]
+            env = None
+        else:
+            cmd = ["wkhtmltopdf", "--quiet", "-", "-"]
+            env = {**os.environ, "DISPLAY": display}
+        proc = subprocess.run(cmd, input=data, capture_output=True, env=env)
+        if proc.stderr or not proc.stdout:
+            raise DownloadInvoiceError(proc.stderr.decode(errors="replace") or f"wkhtmltopdf exited {proc.returncode}")
+        return proc.stdout
+
+    async def render(self, data: InvoiceFile) -> bytes:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.render_sync, data)
+
+
+renderer = InvoiceRenderer()
+
+
+@functools.lru_cache(maxsize=None)
+def get_invoice_storage():
+    return PrivateMediaStorage()
+
+
+def get_invoice_path(vendor_order_id: int, invoice_link: Optional[str]) -> str:
+    digest = hashlib.sha256(f"{vendor_order_id}:{invoice_link or ''}".encode()).hexdigest()[:16]
+    return f"invoices/{vendor_order_id}/{digest}.pdf"
+
+
+def _get_locks() -> Dict[str, asyncio.Lock]:
+    return _locks.setdefault(asyncio.get_running_loop(), {})
+
+
+def _read_invoice(storage, path: str) -> Optional[bytes]:
+    if not storage.exists(path):
+        return None
+    with storage.open(path, "rb") as f:
+        return f.read()
+
+
+async def get_invoice(scraper, vendor_order_id: int, storage=None, **kwargs) -> bytes:
+    """Return stored invoice of the vendor order, downloading it with the scraper for the first time"""
+    storage = storage or get_invoice_storage()
+    path = get_invoice_path(vendor_order_id, kwargs.get("invoice_link"))
+    # repeated clicks wait for the first download instead of starting their own
+    locks = _get_locks()
+    lock = locks.setdefault(path, asyncio.Lock())
+    try:
+        async with lock:
+            content = await sync_to_async(_read_invoice)(storage, path)
+            if content is not None:
+                logger.debug("Invoice of vendor order %s found in %s", vendor_order_id, path)
+                return content
+            content = await scraper.download_invoice(**kwargs)
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            await sync_to_async(storage.save)(path, ContentFile(content))
+            return content
+    finally:
+        if not lock.locked():
+            locks.pop(path, None)
+
+
+async def prefetch_invoices(vendor_orders: List[Tuple]):
+    """Download and store invoices of (vendor order, office vendor) pairs, so users get them from storage"""
+    from apps.scrapers.scraper_factory import ScraperFactory
+
+    sem = asyncio.Semaphore(INVOICE_RENDER_CONCURRENCY)
+
+    async def prefetch(session, vendor_order, office_vendor):
+        async with sem:
+            scraper = ScraperFactory.create_scraper(
+                vendor=vendor_order.vendor,
+                session=session,
+                username=office_vendor.username,
+                password=office_vendor.password,
+            )
+            if getattr(scraper, "INVOICE_TYPE", None) is None:
+                return
+            scraper.office_vendor_id = office_vendor.id
+            await get_invoice(
+                scraper,
+                vendor_order.id,
+                invoice_link=vendor_order.invoice_link,
+                order_id=vendor_order.vendor_order_id,
+                vendor=vendor_order.vendor.name,
+            )
+
+    async with ClientSession(timeout=ClientTimeout(30)) as session:
+        results = await asyncio.gather(
+            *(prefetch(session, vendor_order, office_vendor) for vendor_order, office_vendor in vendor_orders),
+            return_exceptions=True,
+        )
+    for (vendor_order, _), result in zip(vendor_orders, results):
+        if isinstance(result, BaseException):
+            logger.warning("Prefetching invoice of vendor order %s failed: %r", vendor_order.id, result)
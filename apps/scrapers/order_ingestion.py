@@ -0,0 +1,402 @@
+"""
+Bulk ingestion of scraped order history.
+
+Scraped orders are collected into batches and each batch is written with set based lookups:
+vendor orders are matched by reference, order id or order date and product ids with one query each,
+products, office products and vendor order products are resolved with one query per table
+and written with bulk_create, instead of 6-10 queries for every order line.
+"""
+
+import datetime
+import logging
+import time
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.constants import DEFAULT_FRONT_OFFICE_BUDGET_VENDORS
+from apps.accounts.models import OfficeVendor
+from apps.common.choices import BUDGET_SPEND_TYPE, OrderType
+from apps.orders import search_cache
+from apps.orders.models import OfficeProduct as OfficeProductModel
+from apps.orders.models import OfficeProductCategory as OfficeProductCategoryModel
+from apps.orders.models import Order as OrderModel
+from apps.orders.models import Product as ProductModel
+from apps.orders.models import ProductCategory as ProductCategoryModel
+from apps.orders.models import ProductImage as ProductImageModel
+from apps.orders.models import VendorOrder as VendorOrderModel
+from apps.orders.models import VendorOrderProduct as VendorOrderProductModel
+from apps.orders.services.product import ProductService
+from apps.scrapers.schema import Order
+
+logger = logging.getLogger(__name__)
+
+ORDER_INGESTION_BATCH_SIZE = 50
+# invoices are prefetched only for recent orders, backfilled order history is downloaded on demand
+INVOICE_PREFETCH_DAYS = 7
+# vendors whose invoice download drives a browser
+BROWSER_INVOICE_VENDORS = {"benco"}
+
+VENDOR_ORDER_FIELDS = ["vendor_order_id", "status", "vendor_order_reference", "total_amount", "invoice_link"]
+OFFICE_PRODUCT_FIELDS = [
+    "price",
+    "office_product_category",
+    "is_inventory",
+    "last_order_date",
+    "last_order_price",
+]
+VENDOR_ORDER_PRODUCT_FIELDS = [
+    "quantity",
+    "unit_price",
+    "status",
+    "vendor_status",
+    "tracking_link",
+    "tracking_number",
+    "budget_spend_type",
+]
+
+
+class OrderIngestor:
+    """Collects scraped orders of an office and writes them to the database in batches"""
+
+    def __init__(self, scraper, office, batch_size: int = ORDER_INGESTION_BATCH_SIZE):
+        self.scraper = scraper
+        self.vendor = scraper.vendor
+        self.office = office
+        self.batch_size = batch_size
+        self.orders: List[Order] = []
+        self.categories: Dict[str, Optional[ProductCategoryModel]] = {}
+        self.started = time.monotonic()
+        self.ingested_orders = 0
+        self.flushed_rows = 0
+        self.new_invoice_vendor_order_ids: List[int] = []
+        self.failed_batches = 0
+        self.prefetches_invoices = self.vendor.slug not in BROWSER_INVOICE_VENDORS and not getattr(
+            scraper, "selenium_mode", False
+        )
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.flushed_rows / elapsed if elapsed else 0.0
+
+    async def add(self, order: Order):
+        self.orders.append(order)
+        if len(self.orders) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        # take the batch before switching threads, so orders added meanwhile go to the next one
+        orders, self.orders = self.orders, []
+        if not orders:
+            return
+        try:
+            await sync_to_async(self.ingest)(orders)
+        except Exception:
+            # a failed batch is rolled back as a whole, the rest of the order history is still saved
+            self.failed_batches += 1
+            logger.exception("Failed to ingest %s %s orders", len(orders), self.vendor.slug)
+
+    def ingest(self, orders: List[Order]):
+        started = time.monotonic()
+        self.new_invoice_vendor_order_ids = []
+        with transaction.atomic():
+            rows = self._ingest([self._normalize(order) for order in orders])
+        search_cache.invalidate_office_search_results(self.office.id)
+        self._prefetch_invoices()
+        self.ingested_orders += len(orders)
+        self.flushed_rows += rows
+        logger.info(
+            "Ingested %s %s orders, %s rows in %.2fs (%s rows total, %.1f rows/s)",
+            len(orders),
+            self.vendor.slug,
+            rows,
+            time.monotonic() - started,
+            self.flushed_rows,
+            self.rows_per_second,
+        )
+
+    def _should_prefetch_invoice(self, order: dict) -> bool:
+        if not self.prefetches_invoices or not order["invoice_link"]:
+            return False
+        return order["order_date"] >= timezone.localdate() - datetime.timedelta(days=INVOICE_PREFETCH_DAYS)
+
+    def _prefetch_invoices(self):
+        from apps.orders.tasks import prefetch_invoices
+
+        vendor_order_ids, self.new_invoice_vendor_order_ids = self.new_invoice_vendor_order_ids, []
+        if vendor_order_ids:
+            prefetch_invoices.delay(vendor_order_ids)
+
+    def _normalize(self, order: Order) -> dict:
+        order_data = order.to_dict()
+        order_data.pop("shipping_address")
+        order_data["vendor_status"] = order_data["status"]
+        order_data["status"] = self.scraper.normalize_order_status(order_data["vendor_status"])
+        if self.vendor.slug in DEFAULT_FRONT_OFFICE_BUDGET_VENDORS:
+            budget_spend_type = BUDGET_SPEND_TYPE.FRONT_OFFICE_SUPPLY_SPEND_BUDGET.value
+        else:
+            budget_spend_type = BUDGET_SPEND_TYPE.DENTAL_SUPPLY_SPEND_BUDGET.value
+        for order_product in order_data["products"]:
+            order_product["vendor_status"] = order_product["status"]
+            order_product["status"] = self.scraper.normalize_order_product_status(order_product["vendor_status"])
+            order_product["budget_spend_type"] = budget_spend_type
+        return order_data
+
+    def _ingest(self, orders: List[dict]) -> int:
+        vendor_orders = self._resolve_vendor_orders(orders)
+        products = self._resolve_products(orders)
+        office_products = self._write_office_products(orders, products)
+        vendor_order_products = self._write_vendor_order_products(orders, vendor_orders, products)
+        return len(vendor_orders) + len(products) + office_products + vendor_order_products
+
+    def _match_vendor_orders(self, orders: List[dict]) -> List[Optional[VendorOrderModel]]:
+        """Find existing vendor orders by reference, then by order id, then by order date and product ids"""
+        vendor_orders = VendorOrderModel.objects.filter(order__office=self.office, vendor=self.vendor).order_by("pk")
+
+        references = {order["vendor_order_reference"] for order in orders if order["vendor_order_reference"]}
+        by_reference = {}
+        for vendor_order in vendor_orders.filter(vendor_order_reference__in=references):
+            by_reference.setdefault(vendor_order.vendor_order_reference, vendor_order)
+
+        order_ids = {order["order_id"] for order in orders if order["order_id"]}
+        by_order_id = {}
+        for vendor_order in vendor_orders.filter(vendor_order_id__in=order_ids):
+            by_order_id.setdefault(vendor_order.vendor_order_id, vendor_order)
+
+        matched = [
+            by_reference.get(order["vendor_order_reference"]) or by_order_id.get(order["order_id"]) for order in orders
+        ]
+
+        order_dates = {order["order_date"] for order, vendor_order in zip(orders, matched) if vendor_order is None}
+        if order_dates:
+            candidates = {
+                vendor_order.pk: vendor_order for vendor_order in vendor_orders.filter(order_date__in=order_dates)
+            }
+            product_ids = {pk: set() for pk in candidates}
+            for vendor_order_id, product_id in VendorOrderProductModel.objects.filter(
+                vendor_order_id__in=candidates.keys()
+            ).values_list("vendor_order_id", "product__product_id"):
+                product_ids[vendor_order_id].add(product_id)
+
+            for i, order in enumerate(orders):
+                if matched[i] is not None:
+                    continue
+                coming_product_ids = {order_product["product"]["product_id"] for order_product in order["products"]}
+                if not any(coming_product_ids):
+                    continue
+                for pk, vendor_order in candidates.items():
+                    if vendor_order.order_date == order["order_date"] and product_ids[pk] == coming_product_ids:
+                        matched[i] = vendor_order
+                        break
+        return matched
+
+    def _resolve_vendor_orders(self, orders: List[dict]) -> List[VendorOrderModel]:
+        """Update matched vendor orders and create the missing ones, returning vendor order of every order"""
+        matched = self._match_vendor_orders(orders)
+
+        # the same order may be scraped twice within a batch, create it once
+        created_by_key = {}
+        new_orders = []
+        for i, order in enumerate(orders):
+            if matched[i] is not None:
+                continue
+            key = order["vendor_order_reference"] or order["order_id"]
+            if key and key in created_by_key:
+                matched[i] = created_by_key[key]
+                continue
+            new_orders.append(i)
+            matched[i] = VendorOrderModel(
+                vendor=self.vendor,
+                vendor_order_id=order["order_id"],
+                vendor_order_reference=order["vendor_order_reference"],
+                total_amount=order["total_amount"],
+                total_items=order["total_items"],
+                currency=order["currency"],
+                order_date=order["order_date"],
+                status=order["status"],
+                vendor_status=order["vendor_status"],
+                invoice_link=order["invoice_link"],
+            )
+            if key:
+                created_by_key[key] = matched[i]
+
+        existing = {}
+        for order, vendor_order in zip(orders, matched):
+            if vendor_order.pk is None:
+                continue
+            if order["invoice_link"] != vendor_order.invoice_link and self._should_prefetch_invoice(order):
+                self.new_invoice_vendor_order_ids.append(vendor_order.pk)
+            vendor_order.vendor_order_id = order["order_id"]
+            vendor_order.status = order["status"]
+            vendor_order.vendor_order_reference = order["vendor_order_reference"] or ""
+            vendor_order.total_amount = order["total_amount"] or 0
+            vendor_order.invoice_link = order["invoice_link"] or ""
+            existing[vendor_order.pk] = vendor_order
+        if existing:
+            VendorOrderModel.objects.bulk_update(existing.values(), VENDOR_ORDER_FIELDS)
+
+        if new_orders:
+            parent_orders = OrderModel.objects.bulk_create(
+                [
+                    OrderModel(
+                        office=self.office,
+                        status=orders[i]["status"],
+                        order_date=orders[i]["order_date"],
+                        total_items=orders[i]["total_items"],
+                        total_amount=orders[i]["total_amount"],
+                        order_type=OrderType.VENDOR_DIRECT,
+                    )
+                    for i in new_orders
+                ]
+            )
+            # bulk_create doesn't send post_save, so set the default shipping option like the signal does
+            office_vendor = OfficeVendor.objects.filter(office=self.office, vendor=self.vendor).first()
+            for i, parent_order in zip(new_orders, parent_orders):
+                matched[i].order = parent_order
+                if office_vendor:
+                    matched[i].shipping_option = office_vendor.default_shipping_option
+            VendorOrderModel.objects.bulk_create([matched[i] for i in new_orders])
+            self.new_invoice_vendor_order_ids.extend(
+                matched[i].pk for i in new_orders if self._should_prefetch_invoice(orders[i])
+            )
+        return matched
+
+    def _resolve_products(self, orders: List[dict]) -> Dict[str, ProductModel]:
+        """Return products by vendor product id, creating the ones seen for the first time"""
+        products_data = {}
+        for order in orders:
+            for order_product in order["products"]:
+                products_data[order_product["product"]["product_id"]] = order_product["product"]
+
+        self.categories = {
+            product_id: self.scraper.get_product_category(product_data["category"], self.vendor.slug)
+            for product_id, product_data in products_data.items()
+        }
+        products = ProductModel.objects.filter(vendor=self.vendor, product_id__in=products_data.keys())
+        products = {product.product_id: product for product in products}
+
+        new_products = []
+        for product_id, product_data in products_data.items():
+            if product_id in products:
+                continue
+            new_products.append(
+                ProductModel(
+                    vendor=self.vendor,
+                    product_id=product_id,
+                    name=product_data["name"],
+                    description=product_data["description"],
+                    url=product_data["url"],
+                    product_unit=product_data["product_unit"],
+                    category=self.categories[product_id],
+                )
+            )
+        if not new_products:
+            return products
+
+        # the same product may be created meanwhile by another scraper, keep it as it is
+        ProductModel.objects.bulk_create(
+            new_products,
+            update_conflicts=True,
+            unique_fields=["vendor", "product_id"],
+            update_fields=["vendor"],
+        )
+        created = ProductModel.objects.filter(
+            vendor=self.vendor, product_id__in=[product.product_id for product in new_products]
+        )
+        for product in created:
+            products[product.product_id] = product
+
+        parents = []
+        for product in new_products:
+            product = products[product.product_id]
+            if product.manufacturer_number:
+                product.parent_id = ProductService.get_or_create_parent_id(product)
+                parents.append(product)
+        if parents:
+            ProductModel.objects.bulk_update(parents, ["parent"])
+
+        ProductImageModel.objects.bulk_create(
+            [
+                ProductImageModel(product=products[product.product_id], image=image["image"])
+                for product in new_products
+                for image in products_data[product.product_id]["images"] or []
+            ]
+        )
+        return products
+
+    def _write_office_products(self, orders: List[dict], products: Dict[str, ProductModel]) -> int:
+        category_slugs = {category.slug for category in self.categories.values() if category}
+        office_product_categories = {}
+        for category in OfficeProductCategoryModel.objects.filter(
+            office=self.office, slug__in=category_slugs
+        ).order_by("pk"):
+            office_product_categories.setdefault(category.slug, category)
+
+        office_products = {
+            office_product.product_id: office_product
+            for office_product in OfficeProductModel.objects.filter(office=self.office, product__in=products.values())
+        }
+        now = timezone.now()
+        for order in orders:
+            for order_product in order["products"]:
+                product = products[order_product["product"]["product_id"]]
+                price = order_product["product"]["price"]
+                office_product = office_products.get(product.id)
+                if office_product is None:
+                    office_product = office_products[product.id] = OfficeProductModel(
+                        office=self.office, product=product, price_expiration=now
+                    )
+                office_product.price = price
+                office_product.is_inventory = True
+                category = self.categories[product.product_id]
+                office_product.office_product_category = office_product_categories.get(
+                    category.slug if category else None
+                )
+                order_date = order["order_date"]
+                if order_date and (
+                    office_product.last_order_date is None or office_product.last_order_date < order_date
+                ):
+                    office_product.last_order_date = order_date
+                    office_product.last_order_price = price
+
+        OfficeProductModel.objects.bulk_create(
+            office_products.values(),
+            update_conflicts=True,
+            unique_fields=["office", "product"],
+            update_fields=OFFICE_PRODUCT_FIELDS,
+        )
+        return len(office_products)
+
+    def _write_vendor_order_products(
+        self, orders: List[dict], vendor_orders: List[VendorOrderModel], products: Dict[str, ProductModel]
+    ) -> int:
+        # there is no unique constraint on vendor order and product, so existing rows are looked up and updated
+        existing = {}
+        for vendor_order_product in VendorOrderProductModel.objects.filter(
+            vendor_order__in=[vendor_order.pk for vendor_order in vendor_orders]
+        ).order_by("pk"):
+            existing.setdefault(
+                (vendor_order_product.vendor_order_id, vendor_order_product.product_id), vendor_order_product
+            )
+        vendor_order_products = {}
+        for order, vendor_order in zip(orders, vendor_orders):
+            for order_product in order["products"]:
+                product = products[order_product["product"]["product_id"]]
+                key = (vendor_order.pk, product.id)
+                vendor_order_product = existing.get(key) or VendorOrderProductModel(
+                    vendor_order=vendor_order, product=product
+                )
+                for field in VENDOR_ORDER_PRODUCT_FIELDS:
+                    setattr(vendor_order_product, field, order_product.get(field))
+                vendor_order_products[key] = vendor_order_product
+
+        to_update = [row for row in vendor_order_products.values() if row.pk is not None]
+        to_create = [row for row in vendor_order_products.values() if row.pk is None]
+        if to_update:
+            VendorOrderProductModel.objects.bulk_update(to_update, VENDOR_ORDER_PRODUCT_FIELDS)
+        if to_create:
+            VendorOrderProductModel.objects.bulk_create(to_create)
+        return len(vendor_order_products)
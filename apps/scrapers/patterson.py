@@ -63,6 +63,7 @@ class PattersonScraper(Scraper):
     INVOICE_FORMAT = InvoiceFormat.USE_VENDOR_FORMAT
     aiohttp_mode = False
     selenium_mode = True
+    SESSION_CHECK_URL = "https://www.pattersondental.com/ShoppingCart"
 
     def extract_content(self, ele):
         text = re.sub(r"\s+", " ", " ".join(ele.xpath(".//text()").extract()))
@@ -31,6 +31,7 @@ def clean_text(xpath, dom):
 class PearsonScraper(Scraper):
     INVOICE_TYPE = InvoiceType.HTML_INVOICE
     INVOICE_FORMAT = InvoiceFormat.USE_VENDOR_FORMAT
+    SESSION_CHECK_URL = "https://www.pearsondental.com/order/c-olist.asp"
 
     async def _get_login_data(self, *args, **kwargs) -> Optional[types.LoginInformation]:
         async with self.session.get(url="https://www.pearsondental.com/login.asp", headers=HOME_HEADERS):
@@ -29,6 +29,7 @@ from apps.types.orders import CartProduct
 
 
 class PureLifeScraper(Scraper):
+    SESSION_CHECK_URL = "https://www.purelifedental.com/orderedproducts/customer/"
 
     def __init__(
         self, 
@@ -0,0 +1,10 @@
+import pytest
+
+from apps.common import loop_monitor
+
+
+@pytest.fixture(autouse=True)
+def forbid_blocking_calls():
+    """Fail scraper tests which block the event loop"""
+    with loop_monitor.forbid_blocking():
+        yield
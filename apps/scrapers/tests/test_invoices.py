@@ -0,0 +1,40 @@
+import asyncio
+
+from django.core.files.storage import FileSystemStorage
+
+from apps.scrapers import invoices
+
+
+class FakeScraper:
+    def __init__(self):
+        self.downloads = 0
+
+    async def download_invoice(self, **kwargs):
+        self.downloads += 1
+        await asyncio.sleep(0.01)
+        return b"%PDF invoice " + kwargs["invoice_link"].encode()
+
+
+def test_invoice_path_depends_on_vendor_order_and_link():
+    path = invoices.get_invoice_path(1, "https://vendor.com/invoice/1")
+    assert path == invoices.get_invoice_path(1, "https://vendor.com/invoice/1")
+    assert path != invoices.get_invoice_path(2, "https://vendor.com/invoice/1")
+    assert path != invoices.get_invoice_path(1, "https://vendor.com/invoice/2")
+
+
+def test_invoice_is_downloaded_once(tmp_path):
+    storage = FileSystemStorage(location=tmp_path)
+    scraper = FakeScraper()
+
+    async def download_repeatedly():
+        return await asyncio.gather(
+            *(invoices.get_invoice(scraper, 1, storage=storage, invoice_link="https://vendor.com/1") for _ in range(3))
+        )
+
+    contents = asyncio.run(download_repeatedly())
+    contents.append(
+        asyncio.run(invoices.get_invoice(scraper, 1, storage=storage, invoice_link="https://vendor.com/1"))
+    )
+
+    assert scraper.downloads == 1
+    assert set(contents) == {b"%PDF invoice https://vendor.com/1"}
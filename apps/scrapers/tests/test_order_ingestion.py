@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.factories import OfficeFactory, VendorFactory
+from apps.orders.models import OfficeProduct, Product, VendorOrder, VendorOrderProduct
+from apps.scrapers.base import Scraper
+from apps.scrapers.order_ingestion import OrderIngestor
+from apps.scrapers.schema import Order
+
+
+def make_order(order_id, product_ids, status="Shipped", order_date="2023-05-01", invoice_link=""):
+    return Order.from_dict(
+        {
+            "order_id": order_id,
+            "vendor_order_reference": f"ref-{order_id}",
+            "total_amount": "100.00",
+            "currency": "USD",
+            "order_date": order_date,
+            "status": status,
+            "invoice_link": invoice_link,
+            "products": [
+                {
+                    "product": {
+                        "product_id": product_id,
+                        "name": f"Product {product_id}",
+                        "description": "",
+                        "url": "",
+                        "images": [],
+                        "category": [],
+                        "price": "10.00",
+                        "vendor": {"id": "1", "name": "", "slug": "", "url": "", "logo": ""},
+                        "product_unit": "",
+                    },
+                    "quantity": 2,
+                    "unit_price": "10.00",
+                    "status": status,
+                    "tracking_link": "",
+                    "tracking_number": "",
+                }
+                for product_id in product_ids
+            ],
+        }
+    )
+
+
+class OrderIngestorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = VendorFactory(slug="henry_schein", name="Henry Schein")
+        cls.office = OfficeFactory()
+
+    def setUp(self):
+        self.scraper = Scraper(session=None, vendor=self.vendor)
+
+    def test_batch_is_written(self):
+        orders = [make_order("1", ["a", "b"]), make_order("2", ["b", "c"]), make_order("1", ["a", "b"])]
+        OrderIngestor(self.scraper, self.office).ingest(orders)
+
+        self.assertEqual(VendorOrder.objects.filter(vendor=self.vendor).count(), 2)
+        self.assertEqual(Product.objects.filter(vendor=self.vendor).count(), 3)
+        self.assertEqual(OfficeProduct.objects.filter(office=self.office, is_inventory=True).count(), 3)
+        self.assertEqual(VendorOrderProduct.objects.count(), 4)
+
+    def test_existing_order_is_updated(self):
+        OrderIngestor(self.scraper, self.office).ingest([make_order("1", ["a"], status="Processing")])
+        OrderIngestor(self.scraper, self.office).ingest([make_order("1", ["a"], status="Shipped")])
+
+        vendor_order = VendorOrder.objects.get(vendor=self.vendor)
+        self.assertEqual(vendor_order.status, self.scraper.normalize_order_status("Shipped"))
+        self.assertEqual(VendorOrderProduct.objects.filter(vendor_order=vendor_order).count(), 1)
+
+    def test_batch_orders_flushes_on_exit(self):
+        async def scrape():
+            async with self.scraper.batch_orders(self.office) as ingestor:
+                ingestor.batch_size = 2
+                for i in range(3):
+                    await self.scraper.save_order_to_db(self.office, make_order(str(i), [str(i)]))
+
+        async_to_sync(scrape)()
+
+        self.assertIsNone(self.scraper.order_ingestor)
+        self.assertEqual(VendorOrder.objects.filter(vendor=self.vendor).count(), 3)
+
+    def test_failed_batch_is_counted(self):
+        async def scrape():
+            async with self.scraper.batch_orders(self.office) as ingestor:
+                ingestor.batch_size = 2
+                for i in range(4):
+                    await self.scraper.save_order_to_db(self.office, make_order(str(i), [str(i)]))
+            return ingestor
+
+        with patch.object(OrderIngestor, "ingest", side_effect=[ValueError, None]):
+            ingestor = async_to_sync(scrape)()
+
+        self.assertEqual(ingestor.failed_batches, 1)
+
+    @patch("apps.orders.tasks.prefetch_invoices.delay")
+    def test_invoices_of_recent_orders_are_prefetched(self, prefetch_invoices):
+        today = timezone.localdate().isoformat()
+        orders = [
+            make_order("1", ["a"], order_date=today, invoice_link="https://vendor.com/invoice/1"),
+            make_order("2", ["b"], invoice_link="https://vendor.com/invoice/2"),
+            make_order("3", ["c"], order_date=today),
+        ]
+        OrderIngestor(self.scraper, self.office).ingest(orders)
+
+        prefetch_invoices.assert_called_once_with([VendorOrder.objects.get(vendor_order_id="1").pk])
+
+    @patch("apps.orders.tasks.prefetch_invoices.delay")
+    def test_browser_invoices_are_not_prefetched(self, prefetch_invoices):
+        self.vendor.slug = "benco"
+        today = timezone.localdate().isoformat()
+        OrderIngestor(self.scraper, self.office).ingest(
+            [make_order("1", ["a"], order_date=today, invoice_link="https://vendor.com/invoice/1")]
+        )
+
+        prefetch_invoices.assert_not_called()
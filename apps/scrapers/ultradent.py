@@ -76,6 +76,7 @@ class UltraDentScraper(Scraper):
     CATEGORY_HEADERS = MAIN_HEADERS
     INVOICE_TYPE = InvoiceType.HTML_INVOICE
     INVOICE_FORMAT = InvoiceFormat.USE_ORDO_FORMAT
+    SESSION_CHECK_URL = "https://www.ultradent.com/account"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
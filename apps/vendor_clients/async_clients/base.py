@@ -2,7 +2,6 @@ import asyncio
 import datetime
 import decimal
 import logging
-import time
 import traceback
 import uuid
 from asyncio import Semaphore
@@ -11,19 +10,15 @@ from typing import Any, Dict, List, NamedTuple, Optional, Union
 
 import requests
 from aiohttp import ClientResponse, ClientSession
-from asgiref.sync import sync_to_async
 from result import Err, Ok, Result
 from scrapy import Selector
 
-from apps.accounts.views.crazy_dental_integration import (
-    crazy_dental_Base_url,
-    get_vendor_customer_id,
-    oauth,
-)
 from apps.orders.models import OfficeProduct, Product
 from apps.scrapers.semaphore import fake_semaphore
-from apps.vendor_clients import errors, types
+from apps.vendor_clients import errors, session_store, types
+from apps.vendor_clients.rate_controller import RateController
 from config.utils import get_bool_config
+from services.api_client.crazy_dental import CrazyDentalPriceClient
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +39,9 @@ class ScrapingError(Exception):
 
 
 class TooManyRequests(ScrapingError):
-    pass
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
 
 
 class EmptyResults(ScrapingError):
@@ -73,6 +70,10 @@ class BaseClient:
     aiohttp_mode = True
     product_vendor_not_exist = "Discontinued"
     SELF_LOGIN_VENDORS = ["patterson", "dental_city", "darby"]
+    # Requests per second used until the rate controller learns the vendor limits
+    DEFAULT_REQUEST_RATE = 5
+    # page served only to logged in users, restored sessions are checked against it
+    SESSION_CHECK_URL: Optional[str] = None
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__()
@@ -104,6 +105,28 @@ class BaseClient:
         self.username = username
         self.password = password
         self.orders = {}
+        self.rate_controller: Optional[RateController] = None
+        # set to share authenticated sessions of the office vendor through the session store
+        self.office_vendor_id: Optional[int] = None
+
+    async def get_rate_controller(self) -> RateController:
+        if self.rate_controller is None:
+            self.rate_controller = await RateController.for_vendor(self.VENDOR_SLUG, self.DEFAULT_REQUEST_RATE)
+        return self.rate_controller
+
+    async def get_paced_product_price(self, product: types.Product, semaphore: Semaphore):
+        rate_controller = await self.get_rate_controller()
+        await rate_controller.acquire()
+        try:
+            result = await self.get_product_price(product=product, semaphore=semaphore, login_required=False)
+        except TooManyRequests as e:
+            rate_controller.record_throttled(e.retry_after)
+            raise
+        except Exception:
+            rate_controller.record_error()
+            raise
+        rate_controller.record_success()
+        return result
 
     async def get_login_data(self, *args, **kwargs) -> Optional[types.LoginInformation]:
         """Provide login credentials and additional data along with headers"""
@@ -113,6 +136,21 @@ class BaseClient:
         """Check if whether session is authenticated or not"""
         raise NotImplementedError("`check_authenticated` must be implemented")
 
+    def can_check_session(self) -> bool:
+        return self.SESSION_CHECK_URL is not None
+
+    async def check_session(self) -> bool:
+        """Check whether restored session cookies are still authenticated"""
+        if self.SESSION_CHECK_URL is None:
+            # unchecked sessions are stored only for a short while
+            return True
+        return await session_store.is_authenticated_page(self.session, self.SESSION_CHECK_URL)
+
+    async def authenticate(self, force: bool = False):
+        if self.office_vendor_id is None:
+            return await self.login()
+        return await session_store.login(self, self.office_vendor_id, force=force)
+
     async def get_order_list(
         self, from_date: Optional[datetime.date] = None, to_date: Optional[datetime.date] = None
     ) -> Dict[str, Union[Selector, dict]]:
@@ -190,7 +228,7 @@ class BaseClient:
                     return Selector(text=text)
             except Exception as e:
                 logger.exception("Got exception while getting dom => ", str(e))
-                time.sleep(1)
+                await asyncio.sleep(1)
 
     async def get_response_as_json(
         self, url: str, headers: Optional[dict] = None, query_params: Optional[dict] = None, **kwargs
@@ -286,42 +324,18 @@ class BaseClient:
                 ret[product["product_id"]] = None
         return ret
 
-    async def get_crazy_dental_products_prices_from_vendor(self, office_id, product_id):
-        get_vendor_customer_id_async = sync_to_async(get_vendor_customer_id)
-        customer_id = await get_vendor_customer_id_async(office_id=office_id)
-        headers = {"Content-Type": "application/json"}
-        params = {
-            "script": "customscript_pri_rest_product",
-            "deploy": "customdeploy_pri_rest_product_ordo4837",
-            "itemid": product_id,
-            "customerid": customer_id,
-        }
-        response = requests.get(url=crazy_dental_Base_url, params=params, headers=headers, auth=oauth)
-        if response.status_code == 200:
-            json_response = response.json()
-            if json_response["success"]:
-                data = json_response["result"]
-
-                return data
-            return []
-        return []
-
     async def get_products_prices(
         self, products: List[types.Product], login_required: bool = True, office_id=None, *args, **kwargs
     ) -> Dict[str, types.ProductPrice]:
         """Get the list of products prices"""
 
         if self.VENDOR_SLUG == "crazy_dental":
-            ret: Dict[str, types.ProductPrice] = {}
-            for product in products:
-                results = await self.get_crazy_dental_products_prices_from_vendor(
-                    office_id=login_required, product_id=product["product_id"]
-                )
-                if results:
-                    # Assuming results is a list of dictionaries containing product prices
-                    product_price = results[0]["pricing_unitprice"]
-                    ret[product["product_id"]] = {"price": product_price, "product_vendor_status": "Active"}
-            return ret
+            prices = await CrazyDentalPriceClient(self.session).get_prices(
+                office_id, [product["product_id"] for product in products]
+            )
+            return {
+                product_id: {"price": price, "product_vendor_status": "Active"} for product_id, price in prices.items()
+            }
 
         else:
             if login_required and self.VENDOR_SLUG not in self.SELF_LOGIN_VENDORS:
@@ -334,11 +348,11 @@ class BaseClient:
                 return await self._get_products_prices(products, *args, **kwargs)
             elif hasattr(self, "get_product_price"):
                 semaphore = Semaphore(value=self.MULTI_CONNECTIONS)
-                tasks = (
-                    self.get_product_price(product=product, semaphore=semaphore, login_required=False)
-                    for product in products
-                )
+                tasks = (self.get_paced_product_price(product=product, semaphore=semaphore) for product in products)
                 results = await asyncio.gather(*tasks, return_exceptions=True)
+                # the controller is created by the first paced request, there is none without products
+                if self.rate_controller is not None:
+                    await self.rate_controller.asave_if_due()
                 results = [result for result in results if isinstance(result, dict)]
                 return dict(ChainMap(*results))
             else:
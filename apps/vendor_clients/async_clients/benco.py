@@ -39,6 +39,7 @@ logger = logging.getLogger(__name__)
 class BencoClient(BaseClient):
     VENDOR_SLUG = "benco"
     GET_PRODUCT_PAGE_HEADERS = GET_PRODUCT_PAGE_HEADERS
+    SESSION_CHECK_URL = "https://shop.benco.com/Cart"
 
     async def get_login_data(self, *args, **kwargs) -> Optional[types.LoginInformation]:
         self.session = aiohttp.ClientSession()
@@ -27,6 +27,7 @@ logger = logging.getLogger(__name__)
 class DentalCityClient(BaseClient):
     VENDOR_SLUG = "dental_city"
     GET_PRODUCT_PAGE_HEADERS = GET_PRODUCT_PAGE_HEADERS
+    SESSION_CHECK_URL = "https://www.dentalcity.com/profile/myorders/"
 
     async def get_login_data(self, *args, **kwargs) -> types.LoginInformation:
         # await self.session.get("https://www.dentalcity.com/account/login", headers=LOGIN_PAGE_HEADERS)
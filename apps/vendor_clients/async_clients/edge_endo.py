@@ -20,6 +20,7 @@ logger = logging.getLogger(__name__)
 
 class EdgeEndoClient(BaseClient):
     VENDOR_SLUG = "edge_endo"
+    SESSION_CHECK_URL = "https://store.edgeendo.com/account.aspx"
 
     async def get_login_form(self):
         login_dom = await self.get_response_as_dom(
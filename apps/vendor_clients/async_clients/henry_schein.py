@@ -28,6 +28,7 @@ logger = logging.getLogger(__name__)
 class HenryScheinClient(BaseClient):
     aiohttp_mode = False
     VENDOR_SLUG = "henry_schein"
+    SESSION_CHECK_URL = "https://www.henryschein.com/us-en/Orders/OrderStatus.aspx"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
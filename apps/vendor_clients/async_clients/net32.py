@@ -25,6 +25,7 @@ from apps.vendor_clients.headers.net_32 import (
     REMOVE_PRODUCT_FROM_CART_HEADERS,
     REVIEW_ORDER_HEADERS,
 )
+from apps.vendor_clients.rate_controller import parse_retry_after
 import cloudscraper
 
 logger = logging.getLogger(__name__)
@@ -117,7 +118,7 @@ class Net32Client(BaseClient):
                 response = scraper.get(f"https://www.net32.com/rest/neo/pdp/{product_id}/vendor-options")
                 logger.debug(f"Status code for {product_id} is {response.status_code}")
                 if response.status_code == 429:
-                    raise TooManyRequests()
+                    raise TooManyRequests(parse_retry_after(response.headers.get("Retry-After")))
                 
                 vendor_options = response.json()
                 vendor_options = sorted(
@@ -148,7 +149,7 @@ class Net32Client(BaseClient):
             async with self.session.get(f"https://www.net32.com/rest/neo/pdp/{product_id}/vendor-options") as resp:
                 logger.debug(f"Status code for {product_id} is {resp.status}")
                 if resp.status == 429:
-                    raise TooManyRequests()
+                    raise TooManyRequests(parse_retry_after(resp.headers.get("Retry-After")))
                 vendor_options = await resp.json()
                 if len(vendor_options) == 0:
                     raise EmptyResults()
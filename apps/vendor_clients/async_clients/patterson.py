@@ -41,6 +41,7 @@ class PattersonClient(BaseClient):
     GET_PRODUCT_PAGE_HEADERS = GET_PRODUCT_PAGE_HEADERS
     aiohttp_mode = False
     BASE_URL = "https://www.pattersondental.com"
+    SESSION_CHECK_URL = "https://www.pattersondental.com/ShoppingCart"
 
     def gen_options(self, headless=True):
         language = "en-US"
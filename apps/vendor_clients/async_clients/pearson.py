@@ -16,6 +16,7 @@ logger = logging.getLogger(__name__)
 
 class PearsonClient(BaseClient):
     VENDOR_SLUG = "pearson"
+    SESSION_CHECK_URL = "https://www.pearsondental.com/order/c-olist.asp"
 
     async def get_login_data(self, *args, **kwargs) -> Optional[types.LoginInformation]:
         async with self.session.get(url="https://www.pearsondental.com/login.asp", headers=HOME_HEADERS):
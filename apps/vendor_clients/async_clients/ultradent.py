@@ -26,6 +26,7 @@ logger = logging.getLogger(__name__)
 
 class UltradentClient(BaseClient):
     VENDOR_SLUG = "ultradent"
+    SESSION_CHECK_URL = "https://www.ultradent.com/account"
 
     async def get_login_data(self, *args, **kwargs) -> Optional[types.LoginInformation]:
         """Provide login credentials and additional data along with headers"""
@@ -0,0 +1,173 @@
+import asyncio
+import datetime
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert `Retry-After` header value (either seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - timezone.now()).total_seconds())
+
+
+class RateController:
+    """
+    Request rate controller shared by everything talking to a single vendor.
+
+    Requests are paced with a token bucket refilled at `rate` tokens per second.
+    The rate follows AIMD: it grows by `additive_increase` after every `increase_interval`
+    seconds without throttling and is multiplied by `decrease_factor` on throttling.
+    `Retry-After` from vendor pauses all requests until the given time.
+
+    Learned rate and error history are persisted per vendor, so the next run
+    starts from the last good rate instead of the static default. Updater runs save it when they finish,
+    other callers (e.g. cart price checks) at most every `save_interval` seconds.
+    """
+
+    additive_increase = 0.1
+    decrease_factor = 0.5
+    increase_interval = 20
+    # throttling responses of requests which were already in-flight shouldn't decrease the rate again
+    decrease_cooldown = 5
+    min_rate = 0.1
+    max_rate = 50
+    save_interval = 5 * 60
+
+    _controllers: Dict[str, "RateController"] = {}
+
+    def __init__(self, vendor_slug: str, rate: float, burst: Optional[float] = None):
+        self.vendor_slug = vendor_slug
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = burst or max(1.0, self.rate)
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self.successes = 0
+        self.errors = 0
+        self.throttled = 0
+        self.last_throttled_at: Optional[datetime.datetime] = None
+        now = time.monotonic()
+        self._last_refill = now
+        self._last_increase = now
+        self._last_decrease = 0.0
+        self._last_save = now
+
+    @classmethod
+    async def for_vendor(cls, vendor_slug: str, default_rate: float) -> "RateController":
+        """Return controller of the vendor shared in this process, loading persisted state for the first use"""
+        controller = cls._controllers.get(vendor_slug)
+        if controller is None:
+            controller = await cls.aload(vendor_slug, default_rate)
+            cls._controllers[vendor_slug] = controller
+        return controller
+
+    @classmethod
+    async def aload(cls, vendor_slug: str, default_rate: float) -> "RateController":
+        from apps.accounts.models import VendorRequestRate
+
+        state = await VendorRequestRate.objects.filter(vendor__slug=vendor_slug).afirst()
+        if state is None:
+            return cls(vendor_slug, default_rate)
+        logger.info("Starting %s from learned rate %.2f", vendor_slug, state.rate)
+        controller = cls(vendor_slug, state.rate)
+        controller.last_throttled_at = state.last_throttled_at
+        return controller
+
+    async def asave(self):
+        from apps.accounts.models import Vendor, VendorRequestRate
+
+        # counters are taken before querying, so requests recorded meanwhile are saved next time
+        successes, errors, throttled = self.successes, self.errors, self.throttled
+        self.successes -= successes
+        self.errors -= errors
+        self.throttled -= throttled
+        self._last_save = time.monotonic()
+        fields = {"rate": self.rate}
+        if self.last_throttled_at is not None:
+            fields["last_throttled_at"] = self.last_throttled_at
+        counts = {
+            "request_count": successes + errors + throttled,
+            "error_count": errors,
+            "throttled_count": throttled,
+        }
+        increments = {name: F(name) + count for name, count in counts.items()}
+        states = VendorRequestRate.objects.filter(vendor__slug=self.vendor_slug)
+        updated = await states.aupdate(**fields, **increments, updated_at=timezone.now())
+        if not updated:
+            vendor = await Vendor.objects.filter(slug=self.vendor_slug).afirst()
+            if vendor is None:
+                return
+            try:
+                await VendorRequestRate.objects.acreate(vendor=vendor, **fields, **counts)
+            except IntegrityError:
+                # created by another worker meanwhile
+                await states.aupdate(**fields, **increments)
+        logger.info("Saved %s request rate %.2f", self.vendor_slug, self.rate)
+
+    async def asave_if_due(self):
+        if time.monotonic() - self._last_save >= self.save_interval:
+            await self.asave()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Take tokens from the bucket, returning seconds to wait before the request can be made"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= tokens
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(delay, self.blocked_until - now)
+
+    async def acquire(self, tokens: float = 1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_success(self):
+        self.successes += 1
+        now = time.monotonic()
+        if now - max(self._last_increase, self._last_decrease) >= self.increase_interval:
+            self._set_rate(self.rate + self.additive_increase)
+            self._last_increase = now
+
+    def record_error(self):
+        self.errors += 1
+
+    def record_throttled(self, retry_after: Optional[float] = None):
+        self.throttled += 1
+        self.last_throttled_at = timezone.now()
+        now = time.monotonic()
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        if now - self._last_decrease >= self.decrease_cooldown:
+            self._set_rate(self.rate * self.decrease_factor)
+            self._last_decrease = now
+            # drop accumulated burst, so requests don't hit the vendor right after the backoff
+            self.tokens = min(self.tokens, 0)
+
+    def _set_rate(self, rate: float):
+        now = time.monotonic()
+        self._refill(now)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = max(1.0, self.rate)
+        logger.debug("New %s request rate: %.2f", self.vendor_slug, self.rate)
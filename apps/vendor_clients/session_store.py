@@ -0,0 +1,180 @@
+"""
+Vendor sessions shared across tasks and workers.
+
+Cookies of a successful login are persisted per office vendor, so the next scraper or client
+of the same office vendor restores them instead of logging in again (some logins drive Selenium).
+A restored session is validated lazily with the client `check_session` only when it is taken from the store,
+usually by requesting a page served only to logged in users. Sessions of clients which can't check them
+are shared only for a short while, enough for concurrent logins of the same office vendor.
+
+Logins are single-flight: within a process concurrent callers wait on a lock,
+across workers the first one takes a lease on the stored session and the others poll until it is released.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import weakref
+from http.cookies import SimpleCookie
+from typing import Dict, List
+
+import requests
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils import timezone
+from yarl import URL
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL = 30 * 60
+UNVERIFIED_SESSION_TTL = 60
+# captcha and Selenium backed logins may take minutes, after that the lease is considered abandoned
+LOGIN_LEASE = 5 * 60
+LOGIN_POLL_INTERVAL = 1
+
+_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[int, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+
+def _get_lock(office_vendor_id: int) -> asyncio.Lock:
+    # celery tasks run every coroutine in a new event loop, locks can't be shared between them
+    locks = _locks.setdefault(asyncio.get_running_loop(), {})
+    return locks.setdefault(office_vendor_id, asyncio.Lock())
+
+
+def get_credentials_hash(username, password) -> str:
+    return hashlib.sha256(f"{username}:{password}".encode()).hexdigest()
+
+
+def dump_cookies(session) -> List[dict]:
+    if isinstance(session, requests.Session):
+        return [
+            {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path}
+            for cookie in session.cookies
+        ]
+    return [
+        {"name": morsel.key, "value": morsel.value, "domain": morsel["domain"], "path": morsel["path"] or "/"}
+        for morsel in session.cookie_jar
+    ]
+
+
+def load_cookies(session, cookies: List[dict]):
+    for cookie in cookies:
+        if isinstance(session, requests.Session):
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+            continue
+        simple_cookie = SimpleCookie()
+        simple_cookie[cookie["name"]] = cookie["value"]
+        simple_cookie[cookie["name"]]["domain"] = cookie["domain"]
+        simple_cookie[cookie["name"]]["path"] = cookie["path"]
+        session.cookie_jar.update_cookies(simple_cookie, URL(f"https://{cookie['domain'].lstrip('.')}"))
+
+
+async def is_authenticated_page(session, url: str, headers=None) -> bool:
+    """Check that a page of logged in users is served instead of a redirect to the login page"""
+    if isinstance(session, requests.Session):
+        resp = await sync_to_async(session.get, thread_sensitive=False)(url, headers=headers, allow_redirects=False)
+        return resp.status_code == 200
+    async with session.get(url, headers=headers, allow_redirects=False) as resp:
+        return resp.status == 200
+
+
+def get_session_ttl(client) -> int:
+    if not client.can_check_session():
+        return UNVERIFIED_SESSION_TTL
+    return getattr(client, "SESSION_TTL", SESSION_TTL)
+
+
+def _login_succeeded(result) -> bool:
+    # logins raise or return False when they fail, scrapers already logged in return None or empty cookies
+    return result is not False
+
+
+async def _get_state(office_vendor_id: int):
+    from apps.accounts.models import VendorSession
+
+    state, _ = await VendorSession.objects.aget_or_create(office_vendor_id=office_vendor_id)
+    return state
+
+
+async def _acquire_lease(office_vendor_id: int) -> bool:
+    from apps.accounts.models import VendorSession
+
+    now = timezone.now()
+    acquired = (
+        await VendorSession.objects.filter(office_vendor_id=office_vendor_id)
+        .filter(
+            Q(login_started_at__isnull=True) | Q(login_started_at__lt=now - datetime.timedelta(seconds=LOGIN_LEASE))
+        )
+        .aupdate(login_started_at=now)
+    )
+    return acquired == 1
+
+
+async def _restore(client, state, credentials_hash: str) -> bool:
+    if not state.cookies or state.credentials_hash != credentials_hash:
+        return False
+    if state.expires_at is None or state.expires_at <= timezone.now():
+        return False
+    load_cookies(client.session, state.cookies)
+    try:
+        is_authenticated = await client.check_session()
+    except Exception as e:
+        logger.warning("Failed to check stored session of office vendor %s: %s", state.office_vendor_id, e)
+        is_authenticated = False
+    if is_authenticated:
+        return True
+    logger.info("Stored session of office vendor %s is not authenticated anymore", state.office_vendor_id)
+    await invalidate(state.office_vendor_id, state.expires_at)
+    return False
+
+
+async def invalidate(office_vendor_id: int, expires_at=None):
+    """Drop stored session, when `expires_at` is given only if it wasn't replaced meanwhile"""
+    from apps.accounts.models import VendorSession
+
+    sessions = VendorSession.objects.filter(office_vendor_id=office_vendor_id)
+    if expires_at is not None:
+        sessions = sessions.filter(expires_at=expires_at)
+    await sessions.aupdate(cookies=[], expires_at=None)
+
+
+async def login(client, office_vendor_id: int, force: bool = False):
+    """
+    Authenticate client session with stored cookies of the office vendor, logging in only when needed.
+    With `force` the stored session is skipped and replaced, e.g. to verify credentials with the vendor.
+    """
+    from apps.accounts.models import VendorSession
+
+    credentials_hash = get_credentials_hash(client.username, client.password)
+    async with _get_lock(office_vendor_id):
+        while True:
+            state = await _get_state(office_vendor_id)
+            if not force and await _restore(client, state, credentials_hash):
+                logger.debug("Restored session of office vendor %s", office_vendor_id)
+                return True
+            if await _acquire_lease(office_vendor_id):
+                break
+            logger.debug("Waiting for another worker logging into office vendor %s", office_vendor_id)
+            await asyncio.sleep(LOGIN_POLL_INTERVAL)
+
+        sessions = VendorSession.objects.filter(office_vendor_id=office_vendor_id)
+        try:
+            result = await client.login()
+        except BaseException:
+            await sessions.aupdate(login_started_at=None)
+            raise
+
+        if not _login_succeeded(result):
+            await sessions.aupdate(cookies=[], expires_at=None, login_started_at=None)
+            return result
+
+        ttl = get_session_ttl(client)
+        await sessions.aupdate(
+            cookies=dump_cookies(client.session),
+            credentials_hash=credentials_hash,
+            expires_at=timezone.now() + datetime.timedelta(seconds=ttl),
+            login_started_at=None,
+        )
+        logger.info("Stored session of office vendor %s", office_vendor_id)
+        return result
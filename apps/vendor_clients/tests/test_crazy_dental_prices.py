@@ -0,0 +1,48 @@
+import asyncio
+from decimal import Decimal
+
+from aiohttp import ClientSession, web
+from django.core.cache import cache
+
+from apps.common.benchmark import fake_server
+from services.api_client.crazy_dental import CrazyDentalPriceClient
+
+
+def make_app(requests):
+    async def product(request):
+        requests.append(request.query["itemid"])
+        assert request.headers["Authorization"].startswith("OAuth")
+        await asyncio.sleep(0.05)
+        if request.query["itemid"] == "missing":
+            return web.json_response({"success": False, "result": []})
+        return web.json_response({"success": True, "result": [{"pricing_unitprice": "12.50"}]})
+
+    app = web.Application()
+    app.router.add_get("/restlet.nl", product)
+    return app
+
+
+def test_prices_are_fetched_concurrently_and_cached():
+    cache.clear()
+    requests = []
+    item_ids = [str(i) for i in range(20)] + ["missing"]
+
+    async def get_prices(base_url):
+        async with ClientSession() as session:
+            client = CrazyDentalPriceClient(session, concurrency=10, base_url=f"{base_url}/restlet.nl")
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            prices = await client.get_customer_prices("customer", item_ids)
+            elapsed = loop.time() - started
+            cached_prices = await client.get_customer_prices("customer", item_ids)
+            return prices, elapsed, cached_prices
+
+    with fake_server(make_app(requests)) as base_url:
+        prices, elapsed, cached_prices = asyncio.run(get_prices(base_url))
+
+    assert prices == {str(i): Decimal("12.50") for i in range(20)}
+    assert cached_prices == prices
+    # 21 lookups of 50ms with 10 at once, instead of one after another
+    assert elapsed < 0.5
+    # only the item without a price is looked up again
+    assert sorted(requests) == sorted(item_ids + ["missing"])
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+
+from apps.accounts.factories import VendorFactory
+from apps.accounts.models import VendorRequestRate
+from apps.vendor_clients.async_clients.base import BaseClient
+from apps.vendor_clients.rate_controller import RateController, parse_retry_after
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_reserve_paces_requests():
+    controller = RateController("test", rate=2)
+    assert controller.reserve() == 0
+    assert controller.reserve() == 0
+    # bucket is empty, next token comes in 1 / rate seconds
+    assert 0.4 < controller.reserve() <= 0.5
+
+
+def test_throttled_halves_rate_once_per_cooldown():
+    controller = RateController("test", rate=4)
+    controller.record_throttled()
+    controller.record_throttled()
+    assert controller.rate == 2
+    assert controller.throttled == 2
+
+
+def test_retry_after_blocks_requests():
+    controller = RateController("test", rate=10)
+    controller.record_throttled(retry_after=30)
+    assert controller.reserve() >= 29
+
+
+def test_additive_increase():
+    controller = RateController("test", rate=1)
+    controller._last_increase -= controller.increase_interval
+    controller.record_success()
+    assert controller.rate == 1 + controller.additive_increase
+    assert controller._last_increase <= time.monotonic()
+
+
+def test_rate_is_clamped():
+    assert RateController("test", rate=0).rate == RateController.min_rate
+    assert RateController("test", rate=1000).rate == RateController.max_rate
+
+
+def test_save_if_due_waits_for_save_interval():
+    controller = RateController("test", rate=1)
+    with patch.object(RateController, "asave", AsyncMock()) as asave:
+        asyncio.run(controller.asave_if_due())
+        asave.assert_not_called()
+        controller._last_save -= controller.save_interval
+        asyncio.run(controller.asave_if_due())
+        asave.assert_called_once()
+
+
+def test_prices_of_no_products_skip_rate_controller():
+    class PacedClient(BaseClient):
+        VENDOR_SLUG = "paced"
+
+        async def get_product_price(self, product):
+            raise NotImplementedError
+
+    assert asyncio.run(PacedClient().get_products_prices([], login_required=False)) == {}
+
+
+class SaveRateTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        VendorFactory(slug="henry_schein", name="Henry Schein")
+
+    async def test_counts_of_controllers_are_added_up(self):
+        controllers = [RateController("henry_schein", rate=2), RateController("henry_schein", rate=3)]
+        for controller in controllers:
+            controller.record_success()
+            controller.record_error()
+        controllers[1].record_throttled()
+
+        for controller in controllers:
+            await controller.asave()
+
+        state = await VendorRequestRate.objects.aget(vendor__slug="henry_schein")
+        self.assertEqual((state.request_count, state.error_count, state.throttled_count), (5, 2, 1))
+        self.assertEqual(controllers[0].successes + controllers[1].successes, 0)
@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import threading
+from http.cookies import SimpleCookie
+from unittest.mock import Mock, patch
+
+import requests
+from aiohttp import ClientSession
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.factories import OfficeVendorFactory
+from apps.accounts.models import VendorSession
+from apps.vendor_clients import session_store
+
+
+class FakeClient:
+    def __init__(self, username="user", password="pass", authenticated=True, checks_session=True, login_result=True):
+        self.session = requests.Session()
+        self.username = username
+        self.password = password
+        self.authenticated = authenticated
+        self.checks_session = checks_session
+        self.login_result = login_result
+        self.logins = 0
+
+    async def login(self):
+        self.logins += 1
+        await asyncio.sleep(0.01)
+        self.session.cookies.set("sid", f"session-{self.logins}", domain="vendor.com", path="/")
+        return self.login_result
+
+    def can_check_session(self) -> bool:
+        return self.checks_session
+
+    async def check_session(self) -> bool:
+        if isinstance(self.authenticated, Exception):
+            raise self.authenticated
+        return self.authenticated
+
+
+def test_requests_cookies_round_trip():
+    session = requests.Session()
+    session.cookies.set("sid", "1", domain=".vendor.com", path="/")
+    restored = requests.Session()
+    session_store.load_cookies(restored, session_store.dump_cookies(session))
+    assert restored.cookies.get("sid", domain=".vendor.com") == "1"
+
+
+def test_aiohttp_cookies_round_trip():
+    async def round_trip():
+        cookies = [{"name": "sid", "value": "1", "domain": "vendor.com", "path": "/"}]
+        async with ClientSession() as session:
+            session_store.load_cookies(session, cookies)
+            return session_store.dump_cookies(session)
+
+    assert asyncio.run(round_trip())[0]["value"] == "1"
+
+
+def test_requests_session_is_checked_off_the_event_loop():
+    async def check():
+        loop_thread = threading.get_ident()
+        get_threads = []
+
+        def get(*args, **kwargs):
+            get_threads.append(threading.get_ident())
+            return Mock(status_code=200)
+
+        with patch.object(requests.Session, "get", side_effect=get):
+            is_authenticated = await session_store.is_authenticated_page(requests.Session(), "https://vendor.com")
+        return is_authenticated, get_threads[0] != loop_thread
+
+    assert asyncio.run(check()) == (True, True)
+
+
+class SessionStoreTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office_vendor = OfficeVendorFactory()
+
+    async def test_concurrent_logins_are_single_flight(self):
+        clients = [FakeClient() for _ in range(5)]
+        await asyncio.gather(*(session_store.login(client, self.office_vendor.id) for client in clients))
+
+        self.assertEqual(sum(client.logins for client in clients), 1)
+        for client in clients:
+            self.assertEqual(client.session.cookies.get("sid"), "session-1")
+
+    async def test_changed_credentials_log_in_again(self):
+        await session_store.login(FakeClient(), self.office_vendor.id)
+        client = FakeClient(password="changed")
+        await session_store.login(client, self.office_vendor.id)
+
+        self.assertEqual(client.logins, 1)
+
+    async def test_unauthenticated_session_is_replaced(self):
+        await session_store.login(FakeClient(), self.office_vendor.id)
+        client = FakeClient(authenticated=False)
+        await session_store.login(client, self.office_vendor.id)
+
+        self.assertEqual(client.logins, 1)
+        state = await VendorSession.objects.aget(office_vendor=self.office_vendor)
+        self.assertIsNotNone(state.expires_at)
+        self.assertIsNone(state.login_started_at)
+
+    async def test_forced_login_skips_stored_session(self):
+        await session_store.login(FakeClient(), self.office_vendor.id)
+        client = FakeClient()
+        await session_store.login(client, self.office_vendor.id, force=True)
+
+        self.assertEqual(client.logins, 1)
+
+    async def test_failed_session_check_logs_in_again(self):
+        await session_store.login(FakeClient(), self.office_vendor.id)
+        client = FakeClient(authenticated=ConnectionError("timeout"))
+        await session_store.login(client, self.office_vendor.id)
+
+        self.assertEqual(client.logins, 1)
+
+    async def test_unchecked_sessions_are_stored_shortly(self):
+        await session_store.login(FakeClient(checks_session=False), self.office_vendor.id)
+
+        state = await VendorSession.objects.aget(office_vendor=self.office_vendor)
+        self.assertLessEqual(
+            state.expires_at, timezone.now() + datetime.timedelta(seconds=session_store.UNVERIFIED_SESSION_TTL)
+        )
+
+    async def test_scraper_login_results_without_cookies_are_stored(self):
+        for login_result in (None, SimpleCookie()):
+            await session_store.login(FakeClient(login_result=login_result), self.office_vendor.id, force=True)
+
+            state = await VendorSession.objects.aget(office_vendor=self.office_vendor)
+            self.assertIsNotNone(state.expires_at)
+
+    async def test_failed_login_is_not_stored(self):
+        client = FakeClient(login_result=False)
+
+        self.assertIs(await session_store.login(client, self.office_vendor.id), False)
+        state = await VendorSession.objects.aget(office_vendor=self.office_vendor)
+        self.assertEqual((state.cookies, state.expires_at), ([], None))
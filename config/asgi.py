@@ -16,6 +16,9 @@ import django
 import dotenv
 from django.core.handlers.asgi import ASGIHandler
 
+from apps.common import loop_monitor
+from config.utils import get_bool_config
+
 BASE_DIR = pathlib.Path(__file__).parent.parent
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
@@ -57,12 +60,18 @@ class OrdoASGIHandler(ASGIHandler):
                 message = await receive()
 
                 if message["type"] == "lifespan.startup":
+                    if get_bool_config("LOOP_MONITOR", default=True):
+                        loop_monitor.monitor()
+                        self.on_shutdown.append(loop_monitor.log_counters)
                     await send({"type": "lifespan.startup.complete"})
                 elif message["type"] == "lifespan.shutdown":
                     await self.shutdown()
                     await send({"type": "lifespan.shutdown.complete"})
                     return
         else:
+            if scope["type"] == "http":
+                # blocked calls are reported with the request they belong to
+                asyncio.current_task().set_name(f"{scope['method']} {scope['path']}")
             return await super().__call__(scope, receive, send)
 
     async def shutdown(self):
@@ -1,9 +1,16 @@
+import asyncio
 import logging
 import logging.handlers
 import os
 
 from celery import Celery
-from celery.signals import after_setup_logger, after_setup_task_logger
+from celery.signals import (
+    after_setup_logger,
+    after_setup_task_logger,
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+)
 from celery._state import get_current_task
 
 from ecs_logging import StdlibFormatter
@@ -40,6 +47,35 @@ def setup_task_logger(logger, *args, **kwargs):
         handler.setFormatter(formatter)
 
 
+@worker_process_init.connect
+def monitor_event_loops(**kwargs):
+    from apps.common import loop_monitor
+    from config.utils import get_bool_config
+
+    if get_bool_config("LOOP_MONITOR", default=True):
+        # every asyncio.run of the tasks gets a monitored loop
+        asyncio.set_event_loop_policy(loop_monitor.MonitoredEventLoopPolicy())
+
+
+@task_prerun.connect
+def set_loop_monitor_task(task=None, **kwargs):
+    from apps.common import loop_monitor
+
+    loop_monitor.current_task_name = task.name if task else None
+
+
+@task_postrun.connect
+def log_loop_monitor_counters(task=None, **kwargs):
+    from apps.common import loop_monitor
+
+    loop_monitor.current_task_name = None
+    policy = asyncio.get_event_loop_policy()
+    if isinstance(policy, loop_monitor.MonitoredEventLoopPolicy):
+        # loops of finished tasks are closed, keep only the ones still running
+        policy.monitors = [monitor for monitor in policy.monitors if not monitor.loop.is_closed()]
+        loop_monitor.log_counters()
+
+
 app = Celery("ordo-back")
 app.config_from_object("config.celeryconfig")
 app.autodiscover_tasks()
@@ -50,6 +50,11 @@ beat_schedule = {
         "task": "apps.accounts.tasks.update_office_budget",
         "schedule": crontab(hour=6, minute=15, day_of_month=1),
     },
+    "materialize_office_budgets": {
+        "task": "apps.accounts.tasks.materialize_office_budgets",
+        # after the first-of-month budget updates, which fill new budgets with production and collection
+        "schedule": crontab(hour=7, minute=0),
+    },
     "send_budget_update_notification": {
         "task": "apps.accounts.tasks.send_budget_update_notification",
         "schedule": crontab(hour=0, minute=0, day_of_month=1),
@@ -199,8 +204,13 @@ beat_schedule = {
         "task": "apps.accounts.tasks.generate_csv_for_salesforce",
         "schedule": crontab(hour=10, minute=0),
     },
-    "refresh_product_words": {"task": "apps.orders.tasks.refresh_product_words", "schedule": crontab(hour=2)},
-    "refresh_price_age": {"task": "apps.orders.tasks.refresh_price_age", "schedule": crontab(hour=3)},
+    "update_product_words": {
+        "task": "apps.orders.tasks.update_product_words",
+        "schedule": crontab(minute="*"),
+        # runs queued behind a busy worker are dropped, the next one picks up the queue
+        "options": {"expires": 50},
+    },
+    "shift_price_age": {"task": "apps.orders.tasks.shift_price_age", "schedule": crontab(minute=5)},
     "send_scheduled_invites": {
         "task": "apps.accounts.tasks.send_scheduled_invites",
         "schedule": crontab(hour="*", minute="0"),
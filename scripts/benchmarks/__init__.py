@@ -0,0 +1,37 @@
+"""
+Benchmarks of performance work, run from the project root, e.g.
+
+    python -m scripts.benchmarks.price_age --office-products 50000
+
+Each benchmark measures the previous flow against the current one with `apps.common.benchmark.measure`.
+Django is set up on import, so measured functions running in spawned processes have settings too.
+"""
+import os
+from contextlib import contextmanager
+from typing import List
+
+import django
+
+from apps.common.benchmark import BenchmarkResult
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+
+def print_results(results: List[BenchmarkResult], result_header: str = ""):
+    print(f"{'mode':<24} {'wall time':>11} {'peak RSS':>12}  {result_header}".rstrip())
+    for result in results:
+        print(result)
+
+
+@contextmanager
+def test_database():
+    """Run against a throwaway test database, benchmarks writing rows or replacing triggers never touch real data"""
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
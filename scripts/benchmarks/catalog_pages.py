@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import ClientSession, web
+
+from apps.common.benchmark import fake_server, measure
+from apps.orders.product_updater import BATCH_SIZE
+from scripts.benchmarks import print_results
+from services.api_client.dental_city import DentalCityAPIClient
+from services.api_client.pages import PAGE_CONCURRENCY
+
+WINDOW_SIZE = 10
+
+
+def make_app(products: int, latency: float) -> web.Application:
+    async def product_page(request):
+        page_size = int(request.query["page_size"])
+        page_number = int(request.query["page_number"])
+        start = (page_number - 1) * page_size
+        await asyncio.sleep(latency)
+        page = [
+            {
+                "product_sku": f"SKU-{i}",
+                "list_price": "12.00",
+                "partner_price": "10.00",
+                "web_price": "11.00",
+                "manufacturer": "Synthetic",
+                "manufacturer_part_number": f"MPN-{i}",
+                "manufacturer_special": "",
+                "product_desc": f"Synthetic dental product {i} " * 4,
+                "product_long_desc": f"Long description of synthetic dental product {i} " * 10,
+            }
+            for i in range(start, min(start + page_size, products))
+        ]
+        return web.Response(text=json.dumps(page), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/api/ProductPriceStockAvailability", product_page)
+    return app
+
+
+def write_products(products, write_seconds: float):
+    """Stands in for `update_products`, which writes a chunk of products in a thread"""
+    time.sleep(write_seconds * len(products) / BATCH_SIZE)
+
+
+def run_windowed(base_url: str, write_seconds: float) -> int:
+    """Previous flow: fetch the catalog in 10 page windows into one list, then write it in chunks"""
+
+    async def main():
+        async with ClientSession() as session:
+            client = DentalCityAPIClient(session, base_url=base_url)
+            products = []
+            start_page = 1
+            while True:
+                end_page = start_page + WINDOW_SIZE
+                pages = await asyncio.gather(*(client.get_page_products(page) for page in range(start_page, end_page)))
+                for page in pages:
+                    products.extend(page)
+                if len(products) < client.page_size * (end_page - 1):
+                    break
+                start_page = end_page
+            for i in range(0, len(products), BATCH_SIZE):
+                await asyncio.to_thread(write_products, products[i : i + BATCH_SIZE], write_seconds)
+            return len(products)
+
+    return asyncio.run(main())
+
+
+def run_streaming(base_url: str, write_seconds: float, concurrency: int) -> int:
+    async def main():
+        total = 0
+        async with ClientSession() as session:
+            client = DentalCityAPIClient(session, base_url=base_url)
+            async for page in client.iter_products(concurrency=concurrency):
+                await asyncio.to_thread(write_products, page, write_seconds)
+                total += len(page)
+        return total
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare peak RSS and wall time of loading the Dental City catalog at once vs streaming its pages"
+    )
+    parser.add_argument("--products", type=int, default=200000, help="number of products in fake catalog")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds the fake api takes per page")
+    parser.add_argument(
+        "--write-seconds", type=float, default=1.0, help=f"seconds to write {BATCH_SIZE} products to db"
+    )
+    parser.add_argument("--concurrency", type=int, default=PAGE_CONCURRENCY, help="pages in flight")
+    args = parser.parse_args()
+
+    app = make_app(args.products, args.latency)
+    with fake_server(app) as base_url:
+        results = [
+            measure("windowed (all at once)", run_windowed, base_url, args.write_seconds),
+            measure("streaming pages", run_streaming, base_url, args.write_seconds, args.concurrency),
+        ]
+
+    print_results(results, "products")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import time
+
+from apps.common.benchmark import measure
+from apps.reports.formatters.csv import export_to_csv, iter_csv
+from apps.reports.services.inventory_list import (
+    REPORT_CHUNK_SIZE,
+    InventoryItem,
+    inventory_list,
+    iter_inventory_list,
+)
+from scripts.benchmarks import print_results
+
+
+def run_buffered(office_id: int) -> str:
+    """Previous flow: fetch every row, build the whole CSV and only then send it"""
+    started = time.perf_counter()
+    rows = inventory_list(office_id)
+    content = export_to_csv(rows) if rows else ""
+    return f"first byte after {time.perf_counter() - started:.2f}s, {len(rows)} rows, {len(content)} chars"
+
+
+def run_streaming(office_id: int, chunk_size: int) -> str:
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    for piece in iter_csv(InventoryItem._fields, iter_inventory_list(office_id, chunk_size)):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(piece)
+    return f"first byte after {first_byte:.2f}s, {size} chars"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare time to first byte and peak RSS of the buffered and streamed inventory list report"
+    )
+    parser.add_argument("--office-id", type=int, required=True, help="office with a large inventory")
+    parser.add_argument(
+        "--chunk-size", type=int, default=REPORT_CHUNK_SIZE, help="rows fetched from the cursor at once"
+    )
+    args = parser.parse_args()
+
+    print_results(
+        [
+            measure("buffered", run_buffered, args.office_id),
+            measure("streaming cursor", run_streaming, args.office_id, args.chunk_size),
+        ]
+    )
+
+
+if __name__ == "__main__":
+    main()
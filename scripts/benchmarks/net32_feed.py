@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+
+from aiohttp import ClientSession, web
+
+from apps.common.benchmark import fake_server, measure
+from scripts.benchmarks import print_results
+from services.api_client.net_32 import FEED_BATCH_SIZE, Net32APIClient
+
+ENTRY_TEMPLATE = """<entry>
+<mp_id>{mp_id}</mp_id>
+<title>Synthetic dental product {mp_id}</title>
+<link>https://www.net32.com/ec/synthetic-{mp_id}</link>
+<price>${price:.2f}</price>
+<retail_price>${retail_price:.2f}</retail_price>
+<inventory_quantity>{quantity}</inventory_quantity>
+<mp_code>MC-{mp_id}</mp_code>
+<category>Synthetic</category>
+<availability>in stock</availability>
+</entry>
+"""
+
+
+def generate_feed(path: str, entries: int):
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<feed>\n')
+        for mp_id in range(1, entries + 1):
+            price = random.uniform(1, 500)
+            f.write(
+                ENTRY_TEMPLATE.format(
+                    mp_id=mp_id, price=price, retail_price=price * 1.2, quantity=random.randint(0, 100)
+                )
+            )
+        f.write("</feed>\n")
+
+
+def run_current(url: str) -> int:
+    async def main():
+        async with ClientSession() as session:
+            products = await Net32APIClient(session).get_full_products(url=url)
+            return len(products)
+
+    return asyncio.run(main())
+
+
+def run_streaming(url: str, batch_size: int) -> int:
+    async def main():
+        total = 0
+        async with ClientSession() as session:
+            async for batch in Net32APIClient(session).iter_full_products(batch_size=batch_size, url=url):
+                total += len(batch)
+        return total
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare peak RSS and wall time of loading the Net32 full product feed at once vs streaming it"
+    )
+    parser.add_argument("--entries", type=int, default=200000, help="number of entries in synthetic feed")
+    parser.add_argument("--batch-size", type=int, default=FEED_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dental_products.xml")
+        generate_feed(path, args.entries)
+        print(f"Feed size: {os.path.getsize(path) / 1024 / 1024:.1f}MB, {args.entries} entries")
+
+        app = web.Application()
+        app.router.add_get("/dental_products.xml", lambda request: web.FileResponse(path))
+        with fake_server(app) as base_url:
+            url = f"{base_url}/dental_products.xml"
+            results = [
+                measure("current (fromstring)", run_current, url),
+                measure("streaming (pull parser)", run_streaming, url, args.batch_size),
+            ]
+
+    print_results(results, "products")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+
+from apps.accounts.tests.fake_opendental import QUERY_PATH, FakeOpenDental
+from apps.common.benchmark import fake_server, measure
+from apps.common.month import Month
+from scripts.benchmarks import print_results
+from services.opendental import (
+    OFFICE_CONCURRENCY,
+    AsyncOpenDentalClient,
+    OpenDentalClient,
+    load_template,
+    make_session,
+)
+
+
+def periods(offices: int, months: int):
+    last_month = Month(2023, 12)
+    return [
+        (f"office-{i}", (last_month - m).first_day(), (last_month - m).last_day())
+        for i in range(offices)
+        for m in range(months)
+    ]
+
+
+def run_sequential(query_url: str, offices: int, months: int) -> str:
+    """Previous flow: one blocking request per office and month"""
+    for office_key, day_from, day_to in periods(offices, months):
+        client = OpenDentalClient(office_key, query_url=query_url)
+        client.query(load_template("production").format(day_from=day_from, day_to=day_to))
+    return f"{offices * months} queries"
+
+
+def run_async(query_url: str, offices: int, months: int, office_concurrency: int) -> str:
+    async def query_all(client):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(
+            *(
+                client.query_template(key, "production", day_from, day_to)
+                for key, day_from, day_to in periods(offices, months)
+            )
+        )
+        return loop.time() - started
+
+    async def run():
+        async with make_session() as session:
+            client = AsyncOpenDentalClient(session, office_concurrency=office_concurrency, query_url=query_url)
+            cold = await query_all(client)
+            warm = await query_all(client)
+        return f"{offices * months} queries, cold {cold:.2f}s, cached {warm:.3f}s"
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare OpenDental production queries run one by one with the pooled async client and its cache"
+    )
+    parser.add_argument("--offices", type=int, default=20)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds the fake api takes per query")
+    parser.add_argument("--office-concurrency", type=int, default=OFFICE_CONCURRENCY)
+    args = parser.parse_args()
+
+    fake = FakeOpenDental(latency=args.latency)
+    with fake_server(fake.make_app()) as base_url:
+        query_url = f"{base_url}{QUERY_PATH}"
+        results = [
+            measure("sequential", run_sequential, query_url, args.offices, args.months),
+            measure("async pooled", run_async, query_url, args.offices, args.months, args.office_concurrency),
+        ]
+
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import time
+
+from django.db import connection, transaction
+
+from apps.accounts.models import Vendor
+from apps.orders.models import Product
+from scripts.benchmarks import test_database
+
+# triggers recalculating parents once per changed child, as they were before statement level triggers
+ROW_TRIGGERS_SQL = """
+DROP TRIGGER after_update_record_dirty_parents ON orders_product;
+DROP TRIGGER after_update_flush_dirty_parents ON orders_product;
+DROP TRIGGER after_create_recalculate_children ON orders_product;
+DROP TRIGGER after_delete_recalculate_children ON orders_product;
+
+CREATE TRIGGER after_update_vendor_id_recalculate_children
+AFTER UPDATE ON orders_product
+FOR EACH ROW
+WHEN ((old.vendor_id IS DISTINCT FROM new.vendor_id) OR (old.parent_id IS DISTINCT FROM new.parent_id))
+EXECUTE FUNCTION tgf_parent_recalculate_children();
+"""
+
+
+def create_products(products_count: int, group_size: int):
+    vendors = [Vendor.objects.create(name=f"Benchmark {i}", slug=f"benchmark_{i}") for i in range(5)]
+    parents = Product.objects.bulk_create(
+        [
+            Product(name=f"Benchmark parent {i}", product_id=f"benchmark-parent-{i}")
+            for i in range(products_count // group_size * 2)
+        ]
+    )
+    children = Product.objects.bulk_create(
+        [
+            Product(
+                vendor=vendors[i % len(vendors)],
+                parent=parents[i // group_size],
+                name=f"Benchmark product {i}",
+                product_id=f"benchmark-{i}",
+            )
+            for i in range(products_count)
+        ],
+        batch_size=5000,
+    )
+    return parents, children
+
+
+def regroup(children, parent_ids) -> float:
+    """Move children to the given parents in a single statement like the grouping commands do"""
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE orders_product op
+            SET parent_id = m.parent_id
+            FROM unnest(%s::bigint[], %s::bigint[]) AS m(id, parent_id)
+            WHERE op.id = m.id
+            """,
+            [[child.id for child in children], parent_ids],
+        )
+    return time.perf_counter() - started
+
+
+def update_prices(children) -> float:
+    """Bulk price write which doesn't touch the hierarchy, it shouldn't pay for the triggers"""
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE orders_product SET price = 1 WHERE id = ANY(%s)", [[child.id for child in children]])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare regrouping products with statement level and row level parent recalculation triggers"
+    )
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--group-size", type=int, default=50, help="children per parent")
+    args = parser.parse_args()
+
+    timings = {}
+    with test_database(), transaction.atomic():
+        parents, children = create_products(args.products, args.group_size)
+        # first pass moves every child to the second half of parents, the second one moves them back
+        offset = len(parents) // 2
+        moved_parent_ids = [parents[offset + i // args.group_size].id for i in range(len(children))]
+        original_parent_ids = [child.parent_id for child in children]
+
+        timings["dirty parents"] = regroup(children, moved_parent_ids)
+        timings["price update"] = update_prices(children)
+        with connection.cursor() as cursor:
+            cursor.execute(ROW_TRIGGERS_SQL)
+        timings["row level"] = regroup(children, original_parent_ids)
+
+    print(f"regrouping {args.products} products, {args.group_size} per parent")
+    for mode, elapsed in timings.items():
+        print(f"{mode:<16} {elapsed:>10.2f}s")
+
+
+if __name__ == "__main__":
+    main()
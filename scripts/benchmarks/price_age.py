@@ -0,0 +1,78 @@
+import argparse
+import datetime
+import time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.accounts.models import Company, Office, Vendor
+from apps.orders.models import OfficeProduct
+from apps.orders.updater import BULK_SIZE
+from scripts.benchmarks import test_database
+
+UPDATE_FIELDS = ["price", "last_price_updated", "product_vendor_status", "price_expiration"]
+
+# update trigger with transition tables, as it was before price age deltas were filtered by WHEN
+STATEMENT_TRIGGER_SQL = """
+DROP TRIGGER after_update_record_price_age_day ON orders_officeproduct;
+DROP TRIGGER after_update_flush_price_age_day ON orders_officeproduct;
+
+CREATE TRIGGER after_update_price_age_day
+AFTER UPDATE ON orders_officeproduct
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION tgf_price_age_day_on_update();
+"""
+
+
+def create_office_products(office_products_count: int):
+    vendor = Vendor.objects.create(name="Benchmark", slug="benchmark")
+    office = Office.objects.create(company=Company.objects.create(name="Benchmark"), name="Benchmark")
+    stale = timezone.now() - datetime.timedelta(days=10)
+    return OfficeProduct.objects.bulk_create(
+        [
+            OfficeProduct(office=office, vendor=vendor, price=1, last_price_updated=stale)
+            for _ in range(office_products_count)
+        ],
+        batch_size=5000,
+    )
+
+
+def flush(office_products) -> float:
+    """Write refreshed prices in batches like `PriceWriteBuffer` does"""
+    now = timezone.now()
+    for office_product in office_products:
+        office_product.price += 1
+        office_product.last_price_updated = now
+        office_product.product_vendor_status = "Active"
+        office_product.price_expiration = now + datetime.timedelta(days=14)
+    started = time.perf_counter()
+    OfficeProduct.objects.bulk_update(office_products, UPDATE_FIELDS, batch_size=BULK_SIZE)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare price write flushes with WHEN filtered and transition table price age triggers"
+    )
+    parser.add_argument("--office-products", type=int, default=50000)
+    args = parser.parse_args()
+
+    timings = {}
+    with test_database(), transaction.atomic():
+        office_products = create_office_products(args.office_products)
+        half = len(office_products) // 2
+        timings["when filtered, stale"] = flush(office_products[:half])
+        timings["when filtered, today"] = flush(office_products[:half])
+        with connection.cursor() as cursor:
+            cursor.execute(STATEMENT_TRIGGER_SQL)
+        timings["statement, stale"] = flush(office_products[half:])
+        timings["statement, today"] = flush(office_products[half:])
+
+    print(f"flushing prices of {args.office_products // 2} office products per pass")
+    for mode, elapsed in timings.items():
+        print(f"{mode:<24} {elapsed:>10.2f}s")
+
+
+if __name__ == "__main__":
+    main()
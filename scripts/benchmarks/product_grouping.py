@@ -0,0 +1,117 @@
+import argparse
+import itertools
+import random
+import time
+
+from apps.common.benchmark import measure
+from apps.common.utils import get_similarity
+from apps.orders.services.similarity import group_similar_products
+from scripts.benchmarks import print_results
+
+THRESHOLD = 0.7
+PRODUCT_TYPES = [
+    "Nitrile Exam Gloves",
+    "Latex Gloves Powder Free",
+    "Composite Syringe",
+    "Flowable Composite",
+    "Diamond Bur",
+    "Carbide Bur FG",
+    "Prophy Angles",
+    "Saliva Ejectors",
+    "Impression Material Tray",
+    "Bonding Agent Bottle",
+    "Etchant Gel Syringe",
+    "Endo Files",
+    "Sterilization Pouches",
+    "Cotton Rolls",
+    "Face Masks Earloop",
+]
+SHADES = ["A1", "A2", "A3", "A3.5", "B1", "B2", "C2", "XL", "Small", "Medium", "Large", "Blue", "White"]
+BRANDS = ["Henry", "Darby", "Kerr", "Dentsply", "3M", "Ivoclar", "Premier", "Safco", "Septodont", "Ultradent"]
+
+
+def generate_catalog(products_count: int, vendors_count: int, seed: int = 0) -> dict:
+    """
+    Synthetic catalog where every vendor sells variations of the same base products,
+    names of the same base product differ in word order and extra words between vendors
+    """
+    rng = random.Random(seed)
+    vendors = [f"vendor_{i}" for i in range(vendors_count)]
+    products = {}
+    product_id = 0
+    while product_id < products_count:
+        base = [
+            rng.choice(BRANDS),
+            rng.choice(PRODUCT_TYPES),
+            rng.choice(SHADES),
+            f"{rng.randint(1, 999)}",
+            f"{rng.randint(1, 50)}{rng.choice(['g', 'ml', 'pk', 'bx'])}",
+        ]
+        for vendor in rng.sample(vendors, rng.randint(1, vendors_count)):
+            words = base[:]
+            rng.shuffle(words)
+            if rng.random() < 0.3:
+                words.append(rng.choice(["Refill", "Kit", "Pack", "Box"]))
+            products[product_id] = {"vendor": vendor, "name": " ".join(words)}
+            product_id += 1
+            if product_id >= products_count:
+                break
+    return products
+
+
+def run_pairwise(products_count: int, vendors_count: int) -> float:
+    """Score every cross-vendor pair like group_products_by_name used to, returning pairs per second"""
+    products = generate_catalog(products_count, vendors_count)
+    by_vendor = {}
+    for product in products.values():
+        by_vendor.setdefault(product["vendor"], []).append(product["name"])
+
+    pairs = 0
+    started = time.perf_counter()
+    for first_vendor, second_vendor in itertools.combinations(by_vendor.values(), 2):
+        for names in itertools.product(first_vendor, second_vendor):
+            get_similarity(*names)
+            pairs += 1
+    return pairs / (time.perf_counter() - started)
+
+
+def run_engine(products_count: int, vendors_count: int) -> int:
+    products = generate_catalog(products_count, vendors_count)
+    return len(group_similar_products(products, THRESHOLD))
+
+
+def cross_vendor_pairs(products_count: int, vendors_count: int) -> int:
+    sizes = {}
+    for product in generate_catalog(products_count, vendors_count).values():
+        sizes[product["vendor"]] = sizes.get(product["vendor"], 0) + 1
+    return sum(first * second for first, second in itertools.combinations(sizes.values(), 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare grouping similar products with the similarity engine against pairwise comparison"
+    )
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--vendors", type=int, default=5)
+    parser.add_argument(
+        "--pairwise-products",
+        type=int,
+        default=2000,
+        help="catalog size to time pairwise comparison on, full catalog time is extrapolated",
+    )
+    args = parser.parse_args()
+
+    pairwise = measure("pairwise (sample)", run_pairwise, args.pairwise_products, args.vendors)
+    engine = measure("similarity engine", run_engine, args.products, args.vendors)
+
+    pairs = cross_vendor_pairs(args.products, args.vendors)
+    print(f"{args.products} products of {args.vendors} vendors, {pairs} cross-vendor pairs")
+    print(
+        f"pairwise: {pairwise.result:.0f} pairs/s, estimated {pairs / pairwise.result / 3600:.1f}h "
+        f"for the 2-product stage alone"
+    )
+    print_results([engine], "groups")
+
+
+if __name__ == "__main__":
+    main()
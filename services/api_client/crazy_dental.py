@@ -2,7 +2,8 @@ import asyncio
 import datetime
 import logging
 import traceback
-from typing import List
+from decimal import Decimal
+from typing import Dict, List, Optional
 from urllib.parse import urlencode
 
 import oauthlib.oauth1
@@ -10,6 +11,7 @@ import requests
 from aiohttp import ClientError
 from aiohttp.client import ClientSession
 from asgiref.sync import sync_to_async
+from django.core.cache import cache
 from rest_framework import status
 
 from apps.accounts.views.crazy_dental_integration import (
@@ -32,6 +34,9 @@ from services.api_client.vendor_api_types import CrazyDentalProduct
 
 logger = logging.getLogger(__name__)
 
+PRICE_LOOKUP_CONCURRENCY = 8
+PRICE_CACHE_TIMEOUT = 5 * 60
+
 
 class CrazyDentalOauth:
     def __init__(self):
@@ -301,6 +306,78 @@ class CrazyDentalAPIClient:
         return [Order.from_dict(order) for order in orders if isinstance(order, dict)]
 
 
+class CrazyDentalPriceClient:
+    """
+    Looks up prices of Crazy Dental items for a customer.
+
+    The product RESTlet returns the price of a single item per call, so lookups run concurrently on the given
+    session with a bounded number of requests at once. Prices are cached per customer and item for a short time,
+    so building a cart or refreshing a product list doesn't query NetSuite for the same items again.
+    """
+
+    def __init__(self, session: ClientSession, concurrency: int = PRICE_LOOKUP_CONCURRENCY, base_url: str = None):
+        self.session = session
+        self.concurrency = concurrency
+        self.oauthclient = CrazyDentalOauth()
+        if base_url:
+            self.oauthclient.BASE_URL = base_url
+
+    @staticmethod
+    def cache_key(customer_id, item_id) -> str:
+        return f"crazy_dental:price:{customer_id}:{item_id}"
+
+    async def get_item_price(self, sem: asyncio.Semaphore, customer_id, item_id: str) -> Optional[Decimal]:
+        params = {
+            "script": "customscript_pri_rest_product",
+            "deploy": "customdeploy_pri_rest_product_ordo4837",
+            "itemid": item_id,
+        }
+        if customer_id:
+            params["customerid"] = customer_id
+        async with sem:
+            # every request needs its own nonce and timestamp
+            url, headers, _ = self.oauthclient.sign(
+                params=params, http_method="GET", headers={"Content-Type": "application/json"}
+            )
+            async with self.session.get(url, headers=headers) as resp:
+                if resp.status != status.HTTP_200_OK:
+                    logger.warning("Getting price of Crazy Dental item %s failed: %s", item_id, resp.status)
+                    return None
+                result = await resp.json(content_type=None)
+        if not result.get("success") or not result.get("result"):
+            return None
+        price = result["result"][0].get("pricing_unitprice")
+        return Decimal(str(price)) if price not in (None, "") else None
+
+    async def get_prices(self, office_id, item_ids: List[str]) -> Dict[str, Decimal]:
+        """Return prices of the items for the customer of the office, skipping items without a price"""
+        customer_id = await sync_to_async(get_vendor_customer_id)(office_id=office_id)
+        return await self.get_customer_prices(customer_id, item_ids)
+
+    async def get_customer_prices(self, customer_id, item_ids: List[str]) -> Dict[str, Decimal]:
+        item_ids = list(dict.fromkeys(item_ids))
+        keys = {item_id: self.cache_key(customer_id, item_id) for item_id in item_ids}
+        cached = await cache.aget_many(keys.values())
+        prices = {item_id: cached[key] for item_id, key in keys.items() if key in cached}
+
+        missing = [item_id for item_id in item_ids if item_id not in prices]
+        if missing:
+            sem = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(
+                *(self.get_item_price(sem, customer_id, item_id) for item_id in missing), return_exceptions=True
+            )
+            fetched = {}
+            for item_id, result in zip(missing, results):
+                if isinstance(result, BaseException):
+                    logger.warning("Getting price of Crazy Dental item %s failed: %r", item_id, result)
+                elif result is not None:
+                    fetched[item_id] = result
+            await cache.aset_many({keys[item_id]: price for item_id, price in fetched.items()}, PRICE_CACHE_TIMEOUT)
+            prices.update(fetched)
+        logger.debug("Crazy Dental prices: %s cached, %s fetched", len(item_ids) - len(missing), len(missing))
+        return prices
+
+
 async def main():
     async with ClientSession() as session:
         api_client = CrazyDentalAPIClient(session)
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 import os
-from typing import List
+from typing import AsyncIterator, List
 from urllib.parse import urlencode
 
 import oauthlib.oauth1
@@ -15,6 +15,8 @@ from aiohttp.client import ClientSession
 #     realm,
 #     token_secret,
 # )
+from services.api_client.errors import APIClientError
+from services.api_client.pages import PAGE_CONCURRENCY, iter_pages
 from services.api_client.vendor_api_types import DCDentalProduct
 from services.utils.secrets import get_secret_value
 
@@ -136,25 +138,15 @@ class DCDentalAPIClient:
 
     async def get_page_products(self, page_number: int = 1) -> List[DCDentalProduct]:
         products = await self.get_product_list(page_number, self.page_size)
-        if not products:
-            return []
+        if products is None:
+            raise APIClientError(f"DC Dental product list failed for page {page_number}")
         return [DCDentalProduct.from_dict(product) for product in products]
 
+    def iter_products(self, concurrency: int = PAGE_CONCURRENCY) -> AsyncIterator[List[DCDentalProduct]]:
+        return iter_pages(self.get_page_products, self.page_size, concurrency=concurrency)
+
     async def get_products(self) -> List[DCDentalProduct]:
-        products: List[DCDentalProduct] = []
-        start_page = 1
-        while True:
-            end_page = start_page + 10
-            tasks = (self.get_page_products(page) for page in range(start_page, end_page))
-            results = await asyncio.gather(*tasks)
-            for result in results:
-                if result is None:
-                    continue
-                products.extend(result)
-            if len(products) < self.page_size * (end_page - 1):
-                break
-            start_page = end_page
-        return products
+        return [product async for page in self.iter_products() for product in page]
 
     async def create_order_request(self, order_info):
         params = {
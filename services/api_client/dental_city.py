@@ -1,15 +1,16 @@
 import asyncio
 import logging
 import os
-import time
 from decimal import Decimal
 from enum import Enum
-from typing import List, Union
+from typing import AsyncIterator, List, Optional, Union
 
 import xmltodict
 from aiohttp.client import ClientSession
 from lxml import etree
 
+from services.api_client.errors import APIClientError
+from services.api_client.pages import PAGE_CONCURRENCY, iter_pages
 from services.api_client.vendor_api_types import (
     DentalCityInvoiceDetail,
     DentalCityInvoiceProduct,
@@ -204,44 +205,35 @@ class DentalCityOrderRequestBuilder:
 
 
 class DentalCityAPIClient:
-    def __init__(self, session: ClientSession, stage: Stage = Stage.PROD, auth_key: str = ""):
+    def __init__(
+        self, session: ClientSession, stage: Stage = Stage.PROD, auth_key: str = "", base_url: Optional[str] = None
+    ):
         self.session = session
         self.stage = stage
+        self.base_url = base_url or stage.value
         self.page_size = 5000
         self.session.headers.update({"x-functions-key": auth_key})
 
     async def get_page_products(self, page_number: int = 1) -> List[DentalCityProduct]:
-        url = f"{self.stage.value}/api/ProductPriceStockAvailability"
+        url = f"{self.base_url}/api/ProductPriceStockAvailability"
         params = {
             "page_size": self.page_size,
             "page_number": page_number,
         }
         async with self.session.get(url, params=params) as resp:
-            if resp.status == 200:
-                products = await resp.json()
-                if products:
-                    return [DentalCityProduct.from_dict(product) for product in products]
+            if resp.status != 200:
+                raise APIClientError(f"Dental City returned {resp.status} for page {page_number}")
+            products = await resp.json()
+        return [DentalCityProduct.from_dict(product) for product in products or []]
+
+    def iter_products(self, concurrency: int = PAGE_CONCURRENCY) -> AsyncIterator[List[DentalCityProduct]]:
+        return iter_pages(self.get_page_products, self.page_size, concurrency=concurrency)
 
     async def get_products(self) -> List[DentalCityProduct]:
-        products: List[DentalCityProduct] = []
-        start_page = 1
-        while True:
-            end_page = start_page + 10
-            tasks = (self.get_page_products(page) for page in range(start_page, end_page))
-            results = await asyncio.gather(*tasks)
-            for result in results:
-                if result is None:
-                    continue
-                products.extend(result)
-            if len(products) < self.page_size * (end_page - 1):
-                break
-            start_page = end_page
-            # TODO: asyncio.sleep(10)
-            time.sleep(10)
-        return products
+        return [product async for page in self.iter_products() for product in page]
 
     async def create_order_request(self, partner_info: DentalCityPartnerInfo, order_info: DentalCityOrderInfo) -> bool:
-        url = f"{self.stage.value}/api/OrderRequest"
+        url = f"{self.base_url}/api/OrderRequest"
         builder = DentalCityOrderRequestBuilder(partner_info, order_info)
         body = builder.build()
         logger.debug("Sending requst to %s: %s", url, body)
@@ -1,15 +1,16 @@
 import asyncio
+import logging
 import re
 from decimal import Decimal
-from typing import List
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 
+import aiohttp
 from aiohttp.client import ClientSession
 from lxml import etree
 
 from services.api_client.vendor_api_types import Net32Product, Net32ProductInfo
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-import json
+
+logger = logging.getLogger(__name__)
 
 
 def convert_string_to_price(price_string: str) -> Decimal:
@@ -21,37 +22,17 @@ def convert_string_to_price(price_string: str) -> Decimal:
         return Decimal("0")
 
 
+FULL_PRODUCTS_URL = "https://www.net32.com/feeds/searchspring_windfall/dental_products.xml"
+FEED_CHUNK_SIZE = 64 * 1024
+FEED_BATCH_SIZE = 1000
+VENDOR_OPTIONS_URL = "https://www.net32.com/rest/neo/pdp/{mp_id}/vendor-options"
+STATUS_CONCURRENCY = 10
+
+
 class Net32APIClient:
     def __init__(self, session: ClientSession):
         self.session = session
 
-        # Setup Chrome options
-        self.chrome_options = Options()
-        
-        user_agent = (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        language = "en-US"
-        
-        self.chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
-        self.chrome_options.add_argument("--disable-logging")
-        self.chrome_options.add_argument("--log-level=3")
-        self.chrome_options.add_argument("--disable-infobars")
-        self.chrome_options.add_argument("--disable-extensions")
-        self.chrome_options.add_argument("--window-size=1366,768")
-        self.chrome_options.add_argument(f"--lang={language}")
-        self.chrome_options.add_argument("--ignore-ssl-errors=yes")
-        self.chrome_options.add_argument("--ignore-certificate-errors")
-        self.chrome_options.add_argument("--disable-notifications")
-        self.chrome_options.add_argument(f"--user-agent={user_agent}")
-        self.chrome_options.add_argument("--mute-audio")
-        self.chrome_options.add_argument("--disable-dev-shm-usage")
-        self.chrome_options.add_argument("--headless")
-        self.chrome_options.add_experimental_option(
-            "prefs", {"profile.default_content_setting_values.notifications": 2}
-        )
-
     async def get_products(self) -> List[Net32Product]:
         url = "https://www.net32.com/feeds/feedonomics/dental_delta_products.xml"
         products = []
@@ -69,60 +50,80 @@ class Net32APIClient:
                 )
             return products
 
+    @staticmethod
+    def parse_entry(product_element) -> Net32ProductInfo:
+        return Net32ProductInfo(
+            mp_id=product_element.findtext(".//mp_id"),
+            price=convert_string_to_price(product_element.findtext(".//price")),
+            inventory_quantity=int(product_element.findtext(".//inventory_quantity")),
+            name=product_element.findtext(".//title"),
+            manufacturer_number=product_element.findtext(".//mp_code"),
+            category=product_element.findtext(".//category"),
+            url=product_element.findtext(".//link"),
+            retail_price=convert_string_to_price(product_element.findtext(".//retail_price")),
+            availability=product_element.findtext(".//availability"),
+        )
+
     def parse_content(self, content: bytes):
         tree = etree.fromstring(content)
         product_elements = tree.findall(".//entry")
-        return [
-            Net32ProductInfo(
-                mp_id=product_element.findtext(".//mp_id"),
-                price=convert_string_to_price(product_element.findtext(".//price")),
-                inventory_quantity=int(product_element.findtext(".//inventory_quantity")),
-                name=product_element.findtext(".//title"),
-                manufacturer_number=product_element.findtext(".//mp_code"),
-                category=product_element.findtext(".//category"),
-                url=product_element.findtext(".//link"),
-                retail_price=convert_string_to_price(product_element.findtext(".//retail_price")),
-                availability=product_element.findtext(".//availability"),
-            )
-            for product_element in product_elements
-        ]
-
-    async def get_full_products(self) -> List[Net32ProductInfo]:
-        url = "https://www.net32.com/feeds/searchspring_windfall/dental_products.xml"
+        return [self.parse_entry(product_element) for product_element in product_elements]
+
+    async def get_full_products(self, url: str = FULL_PRODUCTS_URL) -> List[Net32ProductInfo]:
         async with self.session.get(url) as resp:
             content = await resp.read()
         return self.parse_content(content)
-    
-    async def get_product_status(self, mp_id):
-        loop = asyncio.get_running_loop()
-        url = f"https://www.net32.com/rest/neo/pdp/{mp_id}/vendor-options"
-        page_source = await loop.run_in_executor(None, lambda: self.get_page_source(url))
-
-        match = re.search(r'<pre style="[^"]*">(.+?)</pre>', page_source, re.DOTALL)
-
-        if match:
-            try:
-                json_str = match.group(1)
-                data = json.loads(json_str)
-
-                if len(data):
-                    print("Item found!")
-                    return "Active"
-            except Exception as e:
-                pass
-        else:
-            print("Item not found")
-            return "Discontinued"
-
-        return page_source
-        
-    def get_page_source(self, url):
-        driver = webdriver.Chrome(options=self.chrome_options)
+
+    async def iter_full_products(
+        self, batch_size: int = FEED_BATCH_SIZE, url: str = FULL_PRODUCTS_URL
+    ) -> AsyncIterator[List[Net32ProductInfo]]:
+        """
+        Stream the full product feed, yielding batches of products as the body arrives.
+        Parsed entries are released right away, so memory doesn't depend on the feed size.
+        """
+        parser = etree.XMLPullParser(events=("end",), tag="entry")
+        batch: List[Net32ProductInfo] = []
+        async with self.session.get(url) as resp:
+            async for chunk in resp.content.iter_chunked(FEED_CHUNK_SIZE):
+                parser.feed(chunk)
+                for _, product_element in parser.read_events():
+                    batch.append(self.parse_entry(product_element))
+                    product_element.clear()
+                    while product_element.getprevious() is not None:
+                        del product_element.getparent()[0]
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        parser.close()
+        if batch:
+            yield batch
+
+    async def fetch_product_status(self, mp_id: str) -> Optional[str]:
+        """Resolve product status from the vendor-options JSON, None when it can't be determined"""
         try:
-            driver.get(url)
-            return driver.page_source
-        finally:
-            driver.quit()
+            async with self.session.get(VENDOR_OPTIONS_URL.format(mp_id=mp_id)) as resp:
+                if resp.status != 200:
+                    logger.warning("Got status %s for Net32 vendor options of %s", resp.status, mp_id)
+                    return None
+                vendor_options = await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning("Failed to get Net32 vendor options of %s: %s", mp_id, e)
+            return None
+        return "Active" if vendor_options else "Discontinued"
+
+    async def get_products_statuses(
+        self, mp_ids: Iterable[str], concurrency: int = STATUS_CONCURRENCY
+    ) -> Dict[str, str]:
+        """Resolve statuses of many products concurrently over the shared session"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(mp_id):
+            async with semaphore:
+                return mp_id, await self.fetch_product_status(mp_id)
+
+        results = await asyncio.gather(*(fetch(mp_id) for mp_id in set(mp_ids)))
+        return {mp_id: status for mp_id, status in results if status is not None}
+
 
 async def main():
     async with ClientSession() as session:
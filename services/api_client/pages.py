@@ -0,0 +1,76 @@
+"""
+Streaming of paginated vendor catalog APIs.
+
+A few pages are fetched ahead while the caller processes the current one, so database writes overlap
+with network fetches without holding the whole catalog in memory. Failed pages are retried with backoff
+that doesn't block the event loop.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, List, TypeVar
+
+from services.api_client.errors import APIClientError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PAGE_CONCURRENCY = 4
+PAGE_MAX_ATTEMPTS = 3
+PAGE_RETRY_WAIT = 5
+
+
+async def fetch_page_with_retry(
+    fetch_page: Callable[[int], Awaitable[List[T]]],
+    page_number: int,
+    max_attempts: int = PAGE_MAX_ATTEMPTS,
+    wait: float = PAGE_RETRY_WAIT,
+) -> List[T]:
+    attempts = 0
+    while True:
+        try:
+            return await fetch_page(page_number)
+        except (APIClientError, asyncio.TimeoutError) as e:
+            attempts += 1
+            if attempts >= max_attempts:
+                raise
+            logger.warning("Fetching page %s failed (attempt %s): %r", page_number, attempts, e)
+            await asyncio.sleep(wait * 2 ** (attempts - 1))
+
+
+async def iter_pages(
+    fetch_page: Callable[[int], Awaitable[List[T]]],
+    page_size: int,
+    concurrency: int = PAGE_CONCURRENCY,
+    max_attempts: int = PAGE_MAX_ATTEMPTS,
+    wait: float = PAGE_RETRY_WAIT,
+) -> AsyncIterator[List[T]]:
+    """
+    Yield pages returned by `fetch_page(page_number)` in order, starting from the first page,
+    with at most `concurrency` pages in flight. The first page shorter than `page_size` is the last one.
+    """
+    in_flight: Deque[asyncio.Task] = deque()
+    next_page = 1
+
+    def schedule():
+        nonlocal next_page
+        while len(in_flight) < concurrency:
+            in_flight.append(asyncio.create_task(fetch_page_with_retry(fetch_page, next_page, max_attempts, wait)))
+            next_page += 1
+
+    try:
+        schedule()
+        while in_flight:
+            page = await in_flight.popleft()
+            if len(page) < page_size:
+                if page:
+                    yield page
+                return
+            schedule()
+            yield page
+    finally:
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
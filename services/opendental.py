@@ -1,20 +1,164 @@
+"""
+OpenDental query API clients.
+
+`AsyncOpenDentalClient` shares one pooled session between offices and limits the number of queries in flight
+per office, so many offices and periods are queried in parallel without piling up on a single office's server.
+Results of `query/*.sql` templates are cached by office key, template and parameters: for long once the period
+is closed, shortly while it's still open.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
 import requests
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.utils import timezone
 
 from services.utils.secrets import get_secret_value
 
+logger = logging.getLogger(__name__)
+
 QUERY_URL = "https://api.opendental.com/api/v1/queries/ShortQuery"
+QUERY_DIR = Path(__file__).resolve().parent.parent / "query"
+# ShortQuery returns at most that many rows, the rest is fetched with Offset
+PAGE_SIZE = 100
+
+OFFICE_CONCURRENCY = 2
+POOL_SIZE = 20
+QUERY_TIMEOUT = 120
+OPEN_PERIOD_CACHE_TIMEOUT = 5 * 60
+CLOSED_PERIOD_CACHE_TIMEOUT = 24 * 60 * 60
+
+QueryResult = Tuple[Any, int]
 
 
 class OpenDentalClient:
-    def __init__(self, office_key):
+    def __init__(self, office_key, query_url=QUERY_URL):
         self.session = requests.Session()
+        self.query_url = query_url
         developer_key = get_secret_value("OPENDENTAL_DEVELOPER_KEY")
         self.session.headers = {"Authorization": f"{developer_key}/{office_key}"}
 
     def query(self, query, offset=None):
         params = {"Offset": offset} if offset else None
-        resp = self.session.put(QUERY_URL, params=params, json={"SqlCommand": query})
+        resp = self.session.put(self.query_url, params=params, json={"SqlCommand": query})
         try:
             return resp.json(), resp.status_code
         except Exception:
             return f"Open dental API response: {resp.text}", resp.status_code
+
+
+@lru_cache
+def load_template(template: str) -> str:
+    with open(QUERY_DIR / f"{template}.sql") as f:
+        return f.read()
+
+
+def cache_timeout(day_to: datetime.date, today: Optional[datetime.date] = None) -> int:
+    """Rows of a period which ended before today rarely change, unlike the ones of the current period"""
+    if today is None:
+        today = timezone.localdate()
+    if isinstance(day_to, datetime.datetime):
+        day_to = day_to.date()
+    return CLOSED_PERIOD_CACHE_TIMEOUT if day_to < today else OPEN_PERIOD_CACHE_TIMEOUT
+
+
+def make_session(pool_size: int = POOL_SIZE) -> ClientSession:
+    return ClientSession(connector=TCPConnector(limit=pool_size), timeout=ClientTimeout(total=QUERY_TIMEOUT))
+
+
+class AsyncOpenDentalClient:
+    def __init__(
+        self,
+        session: ClientSession,
+        office_concurrency: int = OFFICE_CONCURRENCY,
+        query_url: str = QUERY_URL,
+        developer_key: Optional[str] = None,
+    ):
+        self.session = session
+        self.office_concurrency = office_concurrency
+        self.query_url = query_url
+        self.developer_key = developer_key or get_secret_value("OPENDENTAL_DEVELOPER_KEY")
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def semaphore(self, office_key: str) -> asyncio.Semaphore:
+        if office_key not in self.semaphores:
+            self.semaphores[office_key] = asyncio.Semaphore(self.office_concurrency)
+        return self.semaphores[office_key]
+
+    async def query(self, office_key: str, query: str, offset: Optional[int] = None) -> QueryResult:
+        params = {"Offset": offset} if offset else None
+        headers = {"Authorization": f"{self.developer_key}/{office_key}"}
+        async with self.semaphore(office_key):
+            async with self.session.put(
+                self.query_url, params=params, json={"SqlCommand": query}, headers=headers
+            ) as resp:
+                text = await resp.text()
+        try:
+            return json.loads(text), resp.status
+        except ValueError:
+            return f"Open dental API response: {text}", resp.status
+
+    @staticmethod
+    def cache_key(office_key: str, template: str, params: dict, offset: Optional[int]) -> str:
+        # office keys are credentials, keep them out of cache keys
+        digest = hashlib.sha256(
+            json.dumps([office_key, params, offset], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"opendental:{template}:{digest}"
+
+    async def query_template(
+        self,
+        office_key: str,
+        template: str,
+        day_from: datetime.date,
+        day_to: datetime.date,
+        offset: Optional[int] = None,
+        **params,
+    ) -> QueryResult:
+        """Run `query/<template>.sql` formatted with the period and `params`, caching successful results"""
+        params = {"day_from": day_from, "day_to": day_to, **params}
+        key = self.cache_key(office_key, template, params, offset)
+        result = await cache.aget(key)
+        if result is not None:
+            return result, 200
+        result, status = await self.query(office_key, load_template(template).format(**params), offset)
+        if status == 200:
+            await cache.aset(key, result, cache_timeout(day_to))
+        return result, status
+
+    async def query_template_all(
+        self, office_key: str, template: str, day_from: datetime.date, day_to: datetime.date, **params
+    ) -> QueryResult:
+        """Like `query_template`, but fetches all pages of the result"""
+        rows: List[dict] = []
+        offset = 0
+        while True:
+            page, status = await self.query_template(office_key, template, day_from, day_to, offset, **params)
+            if status != 200:
+                return page, status
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows, status
+            offset += PAGE_SIZE
+
+
+async def aquery_template(
+    office_key: str, template: str, day_from: datetime.date, day_to: datetime.date, **params
+) -> QueryResult:
+    async with make_session() as session:
+        client = AsyncOpenDentalClient(session)
+        return await client.query_template(office_key, template, day_from, day_to, **params)
+
+
+def query_template(office_key: str, template: str, day_from: datetime.date, day_to: datetime.date, **params):
+    """Run a single cached template query from sync code"""
+    return async_to_sync(aquery_template)(office_key, template, day_from, day_to, **params)